@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Агрегаты статистики для итогов tracker_bot.py
+Обновляются при каждой записи дня, а не пересчитываются при каждом итоге:
+- индекс префиксных сумм (единственное хранилище процентов по дням): среднее /
+  количество дней / дни ≥70/80/90% за любой диапазон дат за O(log n) -
+  неделя и месяц - это тоже диапазоны
+- серии дней подряд ≥70/80/90% (без ограничения в 30 дней)
+Дни без сохранённого прогресса (только задачи/манифест от notifier.py) не учитываются
+"""
+
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+def to_date(day):
+    """'2026-02-28' или date → date"""
+    return day if isinstance(day, date) else date.fromisoformat(day)
+
+
+def has_progress(data):
+    """Сохранён ли за день прогресс (save_progress), а не только задачи дня"""
+    return 'percentage' in data
+
+
+class PrefixSumIndex:
+    """
+    Дни по возрастанию даты + префиксные суммы процентов, очков и счётчиков ≥порогов
+    range() - два бинарных поиска и разность префиксов
+    Новый день в конец - O(1), правка старого дня - O(дней после него)
+    """
+
+    THRESHOLDS = (70, 80, 90)
+
+    def __init__(self):
+        self.days = []  # ordinal дат по возрастанию
+        self.values = []  # (процент, очки) для каждого дня
+        # prefix[k][i] - сумма по первым i дням
+        self.prefix = {key: [0] for key in self._keys()}
+
+    def _keys(self):
+        return ('percentage', 'points') + self.THRESHOLDS
+
+    def _contribution(self, percentage, points):
+        contribution = {'percentage': percentage, 'points': points}
+        for threshold in self.THRESHOLDS:
+            contribution[threshold] = 1 if percentage >= threshold else 0
+        return contribution
+
+    def build(self, items):
+        """Полная сборка из {date: (процент, очки)}"""
+        self.days = []
+        self.values = []
+        self.prefix = {key: [0] for key in self._keys()}
+        for day in sorted(items):
+            self._append(day.toordinal(), *items[day])
+
+    def _append(self, ordinal, percentage, points):
+        self.days.append(ordinal)
+        self.values.append((percentage, points))
+        contribution = self._contribution(percentage, points)
+        for key, prefix in self.prefix.items():
+            prefix.append(prefix[-1] + contribution[key])
+
+    def update(self, day, percentage, points=0):
+        ordinal = day.toordinal()
+        if not self.days or ordinal > self.days[-1]:
+            self._append(ordinal, percentage, points)
+            return
+
+        i = bisect_left(self.days, ordinal)
+        if i < len(self.days) and self.days[i] == ordinal:
+            # Правка существующего дня - сдвигаем префиксы правее на дельту
+            old = self._contribution(*self.values[i])
+            self.values[i] = (percentage, points)
+        else:
+            # Дозаливка пропущенного дня в середину
+            self.days.insert(i, ordinal)
+            self.values.insert(i, (percentage, points))
+            old = self._contribution(0, 0)
+            for prefix in self.prefix.values():
+                prefix.insert(i + 1, prefix[i])
+
+        new = self._contribution(percentage, points)
+        for key, prefix in self.prefix.items():
+            delta = new[key] - old[key]
+            if delta:
+                for j in range(i + 1, len(prefix)):
+                    prefix[j] += delta
+
+    def get(self, day):
+        """(процент, очки) за день или None"""
+        ordinal = day.toordinal()
+        i = bisect_left(self.days, ordinal)
+        if i < len(self.days) and self.days[i] == ordinal:
+            return self.values[i]
+        return None
+
+    def range(self, from_day, to_day):
+        """Агрегаты за [from_day, to_day] включительно"""
+        lo = bisect_left(self.days, from_day.toordinal())
+        hi = bisect_right(self.days, to_day.toordinal())
+        count = max(0, hi - lo)
+        total = self.prefix['percentage'][hi] - self.prefix['percentage'][lo] if count else 0
+        return {
+            'avg': int(total / count) if count > 0 else 0,
+            'days': count,
+            'sum': total,
+            'points': self.prefix['points'][hi] - self.prefix['points'][lo] if count else 0,
+            'above': {
+                threshold: (self.prefix[threshold][hi] - self.prefix[threshold][lo]) if count else 0
+                for threshold in self.THRESHOLDS
+            }
+        }
+
+
+class StatsAggregates:
+    THRESHOLDS = PrefixSumIndex.THRESHOLDS
+
+    def __init__(self):
+        self.index = PrefixSumIndex()
+        # {порог: {date: длина серии ≥порога, заканчивающейся в этот день}}
+        self.runs = {threshold: {} for threshold in self.THRESHOLDS}
+
+    # === Обновление ===
+
+    def recompute(self, stats):
+        """Полный пересчёт (старт, дозаливка истории, внешние изменения)"""
+        items = {
+            to_date(day_key): (data.get('percentage', 0), data.get('points', 0))
+            for day_key, data in stats.items() if has_progress(data)
+        }
+        self.index.build(items)
+        self.runs = {threshold: {} for threshold in self.THRESHOLDS}
+        for day in sorted(items):
+            for threshold in self.THRESHOLDS:
+                self._set_run(threshold, day)
+        logger.info(f"📈 Агрегаты пересчитаны: {len(items)} дней")
+
+    def update(self, day_key, percentage, points=0):
+        """Инкрементальное обновление одного дня"""
+        day = to_date(day_key)
+        self.index.update(day, percentage, points)
+
+        # Серии: пересчитываем день и протягиваем вперёд, пока значения меняются
+        for threshold in self.THRESHOLDS:
+            self._set_run(threshold, day)
+            following = day + timedelta(days=1)
+            while self.index.get(following) is not None:
+                if not self._set_run(threshold, following):
+                    break
+                following += timedelta(days=1)
+
+    # Интерфейс подписчика StatsCache
+    def day_changed(self, day_key, data):
+        if has_progress(data):
+            self.update(day_key, data['percentage'], data.get('points', 0))
+
+    def reloaded(self, stats):
+        self.recompute(stats)
+
+    def _set_run(self, threshold, day):
+        """Длина серии для дня по предыдущему дню; True если значение изменилось"""
+        runs = self.runs[threshold]
+        if self.percentage(day) >= threshold:
+            value = runs.get(day - timedelta(days=1), 0) + 1
+        else:
+            value = 0
+        changed = runs.get(day) != value
+        runs[day] = value
+        return changed
+
+    # === Чтение ===
+
+    def percentage(self, day):
+        """Процент за день (None если данных нет)"""
+        value = self.index.get(to_date(day))
+        return value[0] if value is not None else None
+
+    def streak(self, threshold=90, as_of=None):
+        """Текущая серия дней подряд ≥threshold, заканчивающаяся сегодня"""
+        as_of = to_date(as_of) if as_of else date.today()
+        return self.runs[threshold].get(as_of, 0)
+
+    def range(self, from_day, to_day):
+        """Агрегаты за произвольный диапазон дат включительно"""
+        return self.index.range(to_date(from_day), to_date(to_day))
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Бюджеты времени и circuit breaker для внешних источников notifier.py
+(погода, файлы событий, штраф)
+- каждый вызов ограничен своим бюджетом времени
+- после failure_threshold ошибок подряд источник пропускается reset_timeout секунд,
+  вместо него сразу берётся fallback (последние удачные значения хранят сами
+  источники - weather_cache.py, http_cache.py)
+- состояние брейкеров хранится в JSON между запусками
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=900, state=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        state = state or {}
+        self.state = state.get('state', self.CLOSED)
+        self.failures = state.get('failures', 0)
+        self.opened_at = state.get('opened_at')
+
+    def to_dict(self):
+        return {'state': self.state, 'failures': self.failures, 'opened_at': self.opened_at}
+
+    def allow(self, now=None):
+        """Можно ли сейчас обращаться к источнику"""
+        if self.state != self.OPEN:
+            return True
+        now = time.time() if now is None else now
+        if now - (self.opened_at or 0) >= self.reset_timeout:
+            # Пробный запрос: удачный закроет брейкер, неудачный откроет снова
+            self.state = self.HALF_OPEN
+            logger.info(f"🔌 Источник {self.name}: пробный запрос после паузы")
+            return True
+        return False
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"✅ Источник {self.name} снова доступен")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self, now=None):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.time() if now is None else now
+            logger.warning(f"🚫 Источник {self.name} отключен на {self.reset_timeout}с ({self.failures} ошибок подряд)")
+
+
+class SourceGuard:
+    """Реестр брейкеров по источникам"""
+
+    def __init__(self, state_file='sources_state.json', failure_threshold=3, reset_timeout=900):
+        self.state_file = state_file
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.breakers = {}
+        self._load()
+
+    def _load(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Не удалось прочитать {self.state_file}: {e}")
+            return
+        for name, state in data.get('breakers', {}).items():
+            self.breakers[name] = self._make_breaker(name, state)
+
+    def save(self):
+        """Атомарно сохраняет состояние (временный файл + os.replace)"""
+        if not self.state_file:
+            return
+        data = {'breakers': {name: breaker.to_dict() for name, breaker in self.breakers.items()}}
+        tmp_file = f"{self.state_file}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            logger.warning(f"⚠️ Не удалось сохранить {self.state_file}: {e}")
+
+    def _make_breaker(self, name, state=None):
+        return CircuitBreaker(name, self.failure_threshold, self.reset_timeout, state)
+
+    def breaker(self, source):
+        if source not in self.breakers:
+            self.breakers[source] = self._make_breaker(source)
+        return self.breakers[source]
+
+    async def call(self, source, fetch, budget, fallback=None):
+        """
+        Вызывает fetch() (корутину без аргументов) в пределах budget секунд
+        Ошибка, таймаут или открытый брейкер → fallback (значение или функция
+        без аргументов - она вызывается только в этом случае)
+        fetch сообщает об ошибке исключением
+        """
+        breaker = self.breaker(source)
+        if not breaker.allow():
+            logger.info(f"⏭️ Источник {source} пропущен (брейкер открыт)")
+            return fallback() if callable(fallback) else fallback
+
+        try:
+            value = await asyncio.wait_for(fetch(), timeout=budget)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            reason = f"не уложился в {budget}с" if isinstance(e, asyncio.TimeoutError) else f"ошибка {e!r}"
+            logger.warning(f"⏱️ Источник {source} {reason}")
+            breaker.record_failure()
+            self.save()
+            return fallback() if callable(fallback) else fallback
+
+        breaker.record_success()
+        self.save()
+        return value
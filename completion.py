@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Отметки выполненных задач как битовые маски: бит i = задача i секции выполнена
+В памяти, в message_states и в статистике хранится одно int на секцию:
+переключение - xor, объединение - or, количество - popcount
+
+Старые записи со списками индексов ('completed': [0, 2]) читаются так же
+"""
+
+SECTIONS = ('morning', 'day', 'cant_do', 'evening')
+
+
+def to_mask(value):
+    """Маска из int или из старого списка индексов"""
+    if value is None:
+        return 0
+    if isinstance(value, int):
+        return value
+    mask = 0
+    for idx in value:
+        mask |= 1 << int(idx)
+    return mask
+
+
+def indices(mask):
+    """Индексы выполненных задач по возрастанию"""
+    result = []
+    idx = 0
+    while mask:
+        if mask & 1:
+            result.append(idx)
+        mask >>= 1
+        idx += 1
+    return result
+
+
+def count(mask):
+    return mask.bit_count()
+
+
+def is_done(mask, idx):
+    return bool(mask >> idx & 1)
+
+
+def toggle(mask, idx):
+    return mask ^ (1 << idx)
+
+
+def empty():
+    """Пустые отметки по всем секциям"""
+    return {section: 0 for section in SECTIONS}
+
+
+def normalize(completed):
+    """{секция: маска или список} → {секция: маска} для всех секций"""
+    completed = completed or {}
+    return {section: to_mask(completed.get(section)) for section in SECTIONS}
+
+
+def section_mask(section_stats):
+    """Маска секции из записи дня: {'mask': 5, 'total': 8} или старое {'completed': [0, 2]}"""
+    section_stats = section_stats or {}
+    if 'mask' in section_stats:
+        return section_stats['mask']
+    return to_mask(section_stats.get('completed'))
+
+
+def section_count(section_stats):
+    """Сколько задач секции выполнено по записи дня"""
+    return count(section_mask(section_stats))
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Контент notifier.py в файлах данных (content/) вместо литералов в коде:
+- wisdoms.txt - мудрости, по одной на строку
+- schedule.json - задачи по дням недели
+- kids_schedule.json - занятия детей
+- recurring_events.json - повторяющиеся события
+Каждый файл при первом обращении разбирается, проверяется и сохраняется
+в кэш (pickle) с хэшем исходника; пока исходник не изменился - грузится готовый кэш
+
+Проверка без запуска бота: python content_store.py
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sys
+
+from event_calendar import parse_rule, WEEKDAYS
+
+logger = logging.getLogger(__name__)
+
+CONTENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'content')
+CACHE_FORMAT = 1  # увеличить при изменении разбора/проверки - старый кэш станет недействительным
+
+
+class ContentError(ValueError):
+    """Файл контента не прошёл проверку"""
+
+
+def _require(condition, message):
+    if not condition:
+        raise ContentError(message)
+
+
+def _is_text_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) and item.strip() for item in value)
+
+
+# === Разбор ===
+
+def parse_lines(raw):
+    """Одна запись на строку, пустые строки и # - комментарии; повторы убираются"""
+    items = []
+    seen = set()
+    for line in raw.decode('utf-8').splitlines():
+        line = line.strip()
+        if not line or line.startswith('#') or line in seen:
+            continue
+        seen.add(line)
+        items.append(line)
+    return items
+
+
+def parse_json(raw):
+    return json.loads(raw.decode('utf-8'))
+
+
+# === Проверка ===
+
+def validate_wisdoms(wisdoms):
+    _require(wisdoms, "нет ни одной мудрости")
+
+
+def validate_schedule(schedule):
+    _require(isinstance(schedule, dict), "ожидается объект {день недели: задачи}")
+    for day, sections in schedule.items():
+        _require(day in WEEKDAYS, f"неизвестный день недели: {day}")
+        _require(isinstance(sections, dict), f"{day}: ожидается объект {{секция: [задачи]}}")
+        for section, tasks in sections.items():
+            _require(_is_text_list(tasks), f"{day}.{section}: ожидается список строк")
+
+
+def validate_kids_schedule(kids_schedule):
+    _require(isinstance(kids_schedule, dict), "ожидается объект {день: [занятия]}")
+    for day, activities in kids_schedule.items():
+        _require(isinstance(activities, list), f"{day}: ожидается список занятий")
+        for idx, item in enumerate(activities):
+            for key in ('child', 'activity', 'time'):
+                _require(isinstance(item, dict) and isinstance(item.get(key), str),
+                         f"{day}[{idx}]: нет поля {key}")
+
+
+def validate_recurring_events(events):
+    _require(isinstance(events, dict), "ожидается объект {ключ: событие}")
+    for key, event in events.items():
+        for field in ('name', 'file', 'rule'):
+            _require(isinstance(event, dict) and field in event, f"{key}: нет поля {field}")
+        try:
+            parse_rule(event['rule'])
+        except (ValueError, AttributeError) as e:
+            raise ContentError(f"{key}: {e}")
+
+
+# {имя: (файл, разбор, проверка)}
+SOURCES = {
+    'wisdoms': ('wisdoms.txt', parse_lines, validate_wisdoms),
+    'schedule': ('schedule.json', parse_json, validate_schedule),
+    'kids_schedule': ('kids_schedule.json', parse_json, validate_kids_schedule),
+    'recurring_events': ('recurring_events.json', parse_json, validate_recurring_events)
+}
+
+
+class ContentStore:
+    def __init__(self, content_dir=CONTENT_DIR, cache_dir='.content_cache'):
+        self.content_dir = content_dir
+        self.cache_dir = cache_dir
+        self._loaded = {}  # {имя: ((mtime_ns, size), данные)}
+
+    def source_path(self, name):
+        return os.path.join(self.content_dir, SOURCES[name][0])
+
+    def get(self, name):
+        """
+        Данные по имени; файл читается при первом обращении
+        и заново только если изменился (правка без передеплоя)
+        """
+        stat = os.stat(self.source_path(name))
+        signature = (stat.st_mtime_ns, stat.st_size)
+        loaded = self._loaded.get(name)
+        if loaded is None or loaded[0] != signature:
+            self._loaded[name] = (signature, self._load(name))
+        return self._loaded[name][1]
+
+    def _load(self, name):
+        with open(self.source_path(name), 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+
+        cached = self._read_cache(name)
+        if cached and cached.get('format') == CACHE_FORMAT and cached.get('hash') == digest:
+            return cached['data']
+
+        data = self.compile(name, raw)
+        self._write_cache(name, {'format': CACHE_FORMAT, 'hash': digest, 'data': data})
+        logger.info(f"📦 Контент {name} скомпилирован ({SOURCES[name][0]})")
+        return data
+
+    @staticmethod
+    def compile(name, raw):
+        """Разбор и проверка исходника; ContentError при ошибке"""
+        _, parse, validate = SOURCES[name]
+        try:
+            data = parse(raw)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ContentError(f"{SOURCES[name][0]}: не разобран: {e}")
+        try:
+            validate(data)
+        except ContentError as e:
+            raise ContentError(f"{SOURCES[name][0]}: {e}")
+        return data
+
+    def _cache_path(self, name):
+        return os.path.join(self.cache_dir, f"{name}.pickle")
+
+    def _read_cache(self, name):
+        try:
+            with open(self._cache_path(name), 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ Кэш контента {name} повреждён, пересобираю: {e}")
+            return None
+
+    def _write_cache(self, name, payload):
+        tmp_file = f"{self._cache_path(name)}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, self._cache_path(name))
+        except OSError as e:
+            logger.warning(f"⚠️ Не удалось сохранить кэш контента {name}: {e}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store = ContentStore()
+    failed = False
+    for source in SOURCES:
+        try:
+            with open(store.source_path(source), 'rb') as f:
+                ContentStore.compile(source, f.read())
+            print(f"✅ {SOURCES[source][0]}")
+        except (OSError, ContentError) as e:
+            print(f"❌ {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Календарь повторяющихся событий для notifier.py
+Правила событий компилируются в отсортированный индекс дат на months месяцев вперёд,
+"какие напоминания сегодня" - один поиск в словаре
+
+Правила:
+- строкой: 'last_saturday', 'second_saturday', 'first_monday', ... (n-й / последний день недели месяца)
+- {'type': 'nth_weekday', 'n': 3, 'weekday': 'saturday'}  (n=-1 - последний)
+- {'type': 'interval', 'start': '2026-01-03', 'days': 14}  (или 'weeks': 2)
+- {'type': 'dates', 'dates': ['2026-12-31', '2027-03-08']}
+"""
+
+import logging
+from bisect import bisect_left, bisect_right
+from calendar import monthrange
+from datetime import date, timedelta
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+ORDINALS = {'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5, 'last': -1}
+
+# За сколько дней напоминать → тип напоминания
+REMINDER_OFFSETS = {7: 'week_before', 3: 'three_days_before', 0: 'event_day'}
+
+
+def parse_rule(rule):
+    """Строковое правило ('last_saturday') → словарь правила"""
+    if isinstance(rule, dict):
+        return rule
+    ordinal, _, weekday = rule.partition('_')
+    if ordinal not in ORDINALS or weekday not in WEEKDAYS:
+        raise ValueError(f"Неизвестное правило: {rule}")
+    return {'type': 'nth_weekday', 'n': ORDINALS[ordinal], 'weekday': weekday}
+
+
+def nth_weekday(year, month, weekday, n):
+    """n-й (n=-1 - последний) день недели weekday (0=пн) в месяце; None если такого нет"""
+    days_in_month = monthrange(year, month)[1]
+    if n > 0:
+        first = date(year, month, 1)
+        day = 1 + (weekday - first.weekday()) % 7 + (n - 1) * 7
+    else:
+        last = date(year, month, days_in_month)
+        day = days_in_month - (last.weekday() - weekday) % 7 + (n + 1) * 7
+    if 1 <= day <= days_in_month:
+        return date(year, month, day)
+    return None
+
+
+def occurrences(rule, start, end):
+    """Даты события по правилу в [start, end]"""
+    rule = parse_rule(rule)
+    kind = rule['type']
+
+    if kind == 'nth_weekday':
+        weekday = WEEKDAYS.index(rule['weekday'])
+        year, month = start.year, start.month
+        while date(year, month, 1) <= end:
+            day = nth_weekday(year, month, weekday, rule['n'])
+            if day and start <= day <= end:
+                yield day
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    elif kind == 'interval':
+        first = date.fromisoformat(rule['start'])
+        step = rule.get('days') or rule.get('weeks', 0) * 7
+        if step <= 0:
+            raise ValueError(f"Интервал должен быть положительным: {rule}")
+        # Первое вхождение не раньше start - без перебора с начала серии
+        skip = max(0, -(-(start - first).days // step))
+        day = first + timedelta(days=skip * step)
+        while day <= end:
+            yield day
+            day += timedelta(days=step)
+
+    elif kind == 'dates':
+        for value in sorted(rule['dates']):
+            day = date.fromisoformat(value)
+            if start <= day <= end:
+                yield day
+
+    else:
+        raise ValueError(f"Неизвестный тип правила: {kind}")
+
+
+class EventCalendar:
+    """
+    Индекс на [start, start + months):
+    occurrences - [(дата, ключ события)] по возрастанию даты
+    reminders - {дата напоминания: [(ключ события, тип напоминания)]}
+    """
+
+    def __init__(self, events, months=12):
+        self.events = events
+        self.months = months
+        self.start = None
+        self.end = None
+        self.occurrences = []
+        self.dates = []  # даты из occurrences - для бинарного поиска
+        self.reminders = {}
+
+    def build(self, start):
+        self.start = start
+        year, month = start.year, start.month + self.months
+        year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+        self.end = date(year, month, 1) - timedelta(days=1)
+
+        index = []
+        reminders = {}
+        for key, event in self.events.items():
+            try:
+                dates = list(occurrences(event['rule'], start, self.end))
+            except (ValueError, KeyError) as e:
+                logger.error(f"❌ Событие {key}: некорректное правило {event.get('rule')}: {e}")
+                continue
+            for day in dates:
+                index.append((day, key))
+                for offset, reminder_type in REMINDER_OFFSETS.items():
+                    remind_on = day - timedelta(days=offset)
+                    if remind_on >= start:
+                        reminders.setdefault(remind_on, []).append((key, reminder_type))
+
+        index.sort()
+        self.occurrences = index
+        self.dates = [day for day, _ in index]
+        self.reminders = reminders
+        logger.info(f"📅 Календарь событий: {len(index)} дат, {len(self.events)} событий, до {self.end}")
+
+    def _ensure(self, day):
+        # Индекс перестраивается, если день вышел за горизонт (минус самое дальнее напоминание)
+        horizon = self.end - timedelta(days=max(REMINDER_OFFSETS)) if self.end else None
+        if self.start is None or not (self.start <= day <= horizon):
+            self.build(day)
+
+    def reminders_for(self, day):
+        """Напоминания на день: [{'key', 'event', 'type'}]"""
+        self._ensure(day)
+        return [
+            {'key': key, 'event': self.events[key], 'type': reminder_type}
+            for key, reminder_type in self.reminders.get(day, ())
+        ]
+
+    def upcoming(self, from_day, to_day):
+        """События в [from_day, to_day]: [(дата, ключ)]"""
+        self._ensure(from_day)
+        lo = bisect_left(self.dates, from_day)
+        hi = bisect_right(self.dates, to_day)
+        return self.occurrences[lo:hi]
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Локальный кэш файлов по URL с условными запросами (ETag / Last-Modified)
+Используется notifier.py для файлов событий с GitHub:
+- повторная загрузка - If-None-Match / If-Modified-Since, при 304 тело берётся с диска
+- 404 - файла нет (None), сохранённая копия удаляется
+- без сети - последняя сохранённая копия
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ConditionalCache:
+    def __init__(self, cache_dir='.http_cache'):
+        self.cache_dir = cache_dir
+        self.index_file = os.path.join(cache_dir, 'index.json')
+        self.index = {}  # {url: {'file', 'etag', 'last_modified', 'fetched_at'}}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Не удалось прочитать {self.index_file}: {e}")
+            self.index = {}
+
+    def _write(self, path, text):
+        """Атомарная запись (временный файл + os.replace)"""
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_file, path)
+
+    def _body_path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest())
+
+    def cached(self, url):
+        """Сохранённое тело по URL (None если копии нет)"""
+        entry = self.index.get(url)
+        if not entry:
+            return None
+        try:
+            with open(os.path.join(self.cache_dir, entry['file']), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def has_copy(self, url):
+        entry = self.index.get(url)
+        return bool(entry) and os.path.exists(os.path.join(self.cache_dir, entry['file']))
+
+    def forget(self, url):
+        entry = self.index.pop(url, None)
+        if not entry:
+            return
+        try:
+            os.remove(os.path.join(self.cache_dir, entry['file']))
+        except OSError:
+            pass
+        self._write(self.index_file, json.dumps(self.index, ensure_ascii=False, indent=2))
+
+    def store(self, url, text, etag=None, last_modified=None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        body_path = self._body_path(url)
+        self._write(body_path, text)
+        self.index[url] = {
+            'file': os.path.basename(body_path),
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': time.time()
+        }
+        self._write(self.index_file, json.dumps(self.index, ensure_ascii=False, indent=2))
+
+    def validators(self, url):
+        """Заголовки условного запроса для URL"""
+        entry = self.index.get(url)
+        headers = {}
+        if entry and self.has_copy(url):
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    async def fetch(self, session, url):
+        """
+        GET с ревалидацией: 304 → копия с диска, 200 → новая копия, 404 → None (файла нет)
+        Остальные статусы и сетевые ошибки пробрасываются исключением
+        """
+        async with session.get(url, headers=self.validators(url)) as response:
+            if response.status == 304:
+                logger.info(f"📦 {url}: не изменился (304)")
+                return self.cached(url)
+            if response.status == 404:
+                # Отсутствие файла - это ответ, а не сбой источника
+                self.forget(url)
+                return None
+            response.raise_for_status()
+            text = await response.text()
+            self.store(url, text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return text
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Тексты сообщений Telegram для tracker_bot.py: каждый текст хранится в хранилище
+один раз, сжатым (zlib), под ключом - хэшем текста
+В состоянии сообщения только ссылки ('original_ref', 'clean_ref'),
+распаковка - только когда текст действительно нужен (save_progress, cancel_update)
+
+Тексты, на которые больше ничего не ссылается, удаляются prune();
+сегодняшние не трогаются - notifier.py мог записать текст, но ещё не день со ссылкой
+"""
+
+import hashlib
+import logging
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def body_ref(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+class MessageBodies:
+    def __init__(self, storage, cache_size=8):
+        self.storage = storage
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # {ref: текст} - последние распакованные
+
+    def put(self, text):
+        """Сохраняет текст (если его ещё нет) и возвращает ссылку"""
+        ref = body_ref(text)
+        if ref not in self._cache:
+            self.storage.put_body(ref, zlib.compress(text.encode('utf-8'), 9), datetime.now().strftime("%Y-%m-%d"))
+            self._remember(ref, text)
+        return ref
+
+    async def get(self, ref):
+        """Текст по ссылке; None, если его нет (хранилище читается вне event loop)"""
+        if ref in self._cache:
+            self._cache.move_to_end(ref)
+            return self._cache[ref]
+        data = await self.storage.run('get_body', ref)
+        if data is None:
+            logger.warning(f"⚠️ Текст сообщения {ref} не найден")
+            return None
+        text = zlib.decompress(data).decode('utf-8')
+        self._remember(ref, text)
+        return text
+
+    def _remember(self, ref, text):
+        self._cache[ref] = text
+        self._cache.move_to_end(ref)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def prune(self, live_refs):
+        """Удаляет тексты до сегодняшнего дня, на которые нет ссылок из live_refs"""
+        removed = await self.storage.run('prune_bodies', set(live_refs), datetime.now().strftime("%Y-%m-%d"))
+        if removed:
+            for ref in [ref for ref in self._cache if ref not in live_refs]:
+                del self._cache[ref]
+            logger.info(f"🧹 Удалено неиспользуемых текстов сообщений: {removed}")
+        return removed
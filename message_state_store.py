@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Состояния сообщений чек-листа для tracker_bot.py
+- в памяти не больше max_entries последних состояний (LRU), остальные
+  читаются из хранилища по запросу
+- состояния, не обновлявшиеся ttl_days дней ('updated' - день последней записи),
+  удаляются и из памяти, и из хранилища (expire); восстановленное из статистики
+  состояние старого сообщения живёт с момента восстановления
+- день каждого сообщения пишется в небольшой индекс message_id → день, который
+  переживает удаление состояния: по нему состояние восстанавливается из статистики того дня
+- хранилище читается только через load()/day_of()/values()/expire() (storage.run,
+  вне event loop); get(), `in` и [] смотрят только в память - перед ними нужен load()
+"""
+
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+class MessageStateStore:
+    def __init__(self, storage, decode=None, encode=None, max_entries=100, ttl_days=7):
+        self.storage = storage
+        # decode(message_id, сохранённое) → состояние или None; encode(состояние) → для записи
+        self.decode = decode or (lambda message_id, state: state)
+        self.encode = encode or (lambda state: state)
+        self.max_entries = max_entries
+        self.ttl_days = ttl_days
+        self._states = OrderedDict()  # {message_id: состояние} - последние использованные
+
+    def _cutoff(self):
+        return (datetime.now() - timedelta(days=self.ttl_days)).strftime("%Y-%m-%d")
+
+    def _expired(self, state):
+        # Старые состояния без 'updated' - по дню сообщения
+        return (state.get('updated') or state.get('day') or self._cutoff()) < self._cutoff()
+
+    def _remember(self, message_id, state):
+        self._states[message_id] = state
+        self._states.move_to_end(message_id)
+        while len(self._states) > self.max_entries:
+            # Вытесненное остаётся в хранилище и читается заново при обращении
+            self._states.popitem(last=False)
+
+    def _decode(self, message_id, stored, day):
+        if 'day' not in stored and day:
+            # Старые состояния без дня - день из индекса
+            stored = {**stored, 'day': day}
+        return self.decode(message_id, stored)
+
+    def _found(self, message_id, state, default):
+        if state is None:
+            return default
+        if self._expired(state):
+            self._states.pop(message_id, None)
+            return default
+        self._remember(message_id, state)
+        return state
+
+    def get(self, message_id, default=None):
+        """Состояние из памяти (из хранилища его подгружает load())"""
+        message_id = int(message_id)
+        return self._found(message_id, self._states.get(message_id), default)
+
+    async def load(self, message_id, default=None):
+        """Состояние из памяти или из хранилища (читается вне event loop) - и в память"""
+        message_id = int(message_id)
+        state = self._states.get(message_id)
+        if state is None:
+            stored = await self.storage.run('get_message_state', message_id)
+            if stored is not None:
+                day = await self.storage.run('get_message_day', message_id) if 'day' not in stored else None
+                # Пока читали, состояние могли создать - оно новее
+                state = self._states.get(message_id) or self._decode(message_id, stored, day)
+        return self._found(message_id, state, default)
+
+    def __contains__(self, message_id):
+        return self.get(message_id) is not None
+
+    def __getitem__(self, message_id):
+        state = self.get(message_id)
+        if state is None:
+            raise KeyError(message_id)
+        return state
+
+    def __setitem__(self, message_id, state):
+        message_id = int(message_id)
+        today = datetime.now().strftime("%Y-%m-%d")
+        state.setdefault('day', today)
+        state['updated'] = today
+        self._remember(message_id, state)
+        self.storage.put_message_day(message_id, state['day'])
+
+    def __delitem__(self, message_id):
+        self._states.pop(int(message_id), None)
+        self.storage.delete_message_state(int(message_id))
+
+    def save(self, message_id):
+        """Записывает состояние сообщения (вытесненное из памяти уже записано)"""
+        message_id = int(message_id)
+        if message_id in self._states:
+            state = self._states[message_id]
+            state['updated'] = datetime.now().strftime("%Y-%m-%d")
+            self.storage.put_message_state(message_id, self.encode(state))
+
+    async def day_of(self, message_id):
+        """День сообщения: из состояния или из индекса (None - неизвестен)"""
+        state = self._states.get(int(message_id))
+        if state is not None and 'day' in state:
+            return state['day']
+        return await self.storage.run('get_message_day', int(message_id))
+
+    async def values(self):
+        """Все живые состояния (в памяти - как есть, остальные - в записанном виде)"""
+        states = await self.storage.run('load_message_states')
+        states.update(self._states)
+        return states.values()
+
+    async def expire(self):
+        """Удаляет состояния, не обновлявшиеся ttl_days дней; возвращает их число"""
+        cutoff = self._cutoff()
+        for message_id in [k for k, state in self._states.items() if self._expired(state)]:
+            del self._states[message_id]
+        removed = await self.storage.run('prune_message_states', cutoff)
+        if removed:
+            logger.info(f"🧹 Удалено устаревших состояний сообщений: {removed} (старше {cutoff})")
+        return removed
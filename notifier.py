@@ -1,14 +1,25 @@
 #!/usr/bin/env python3
 import asyncio
 import aiohttp
-from datetime import datetime
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 from calendar import monthcalendar
 import logging
 import random
 import sys
 import os
-import json
-import re
+
+from telegram_client import TelegramClient, MessageDispatcher
+from storage import open_storage
+from circuit_breaker import SourceGuard
+from weather_cache import WeatherCache
+from http_cache import ConditionalCache
+from event_calendar import EventCalendar
+from content_store import ContentStore, CONTENT_DIR
+from task_manifest import build_manifest, manifest_tasks, SECTIONS
+import completion
+from task_catalog import intern_tasks, pack_manifest
+from message_bodies import MessageBodies
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -25,7 +36,9 @@ class PersonalScheduleNotifier:
         'sunday': 'воскресенье'
     }
     
-    def __init__(self):
+    def __init__(self, telegram=None, dispatcher=None, storage=None):
+        # telegram/dispatcher/storage передаются при встраивании в tracker_bot.py,
+        # тогда они общие с ботом и закрывает их он
         self.telegram_token = os.getenv('TELEGRAM_TOKEN', '')
         if not self.telegram_token:
             raise ValueError("❌ TELEGRAM_TOKEN не найден в переменных окружения!")
@@ -34,425 +47,97 @@ class PersonalScheduleNotifier:
         if not self.chat_id:
             raise ValueError("❌ TELEGRAM_CHAT_ID не найден в переменных окружения!")
         
-        self.prayer_url = "https://brkme.github.io/My_Day_Shedule/prayer.html"
-        self.ss_url = "https://brkme.github.io/My_Day_Shedule/ss.html"
-        self.career_url = "https://brkme.github.io/My_Day_Shedule/career.html"
+        # Общий HTTP-клиент Telegram (одна сессия на весь запуск)
+        self.owns_resources = telegram is None
+        self.telegram = telegram or TelegramClient(self.telegram_token)
+        self.dispatcher = dispatcher or MessageDispatcher(self.telegram)
         
-        self.wisdoms = [
-    "Лучший способ начать — перестать говорить и начать делать. — Уолт Дисней",
-    "Не ждите. Время никогда не будет подходящим. — Наполеон Хилл",
-    "Начало — самая важная часть работы. — Платон",
-    "Путь в тысячу миль начинается с одного шага. — Лао-цзы",
-    "Делай сегодня то, что другие не хотят, завтра будешь жить так, как другие не могут. — Джаред Лето",
-    "Успех — это сумма маленьких усилий, повторяемых день за днём. — Роберт Кольер",
-    "Я твердо верю в удачу, и чем больше я работаю — тем я удачливее. — Томас Джефферсон",
-    "Неудача — это просто возможность начать снова, но уже более мудро. — Генри Форд",
-    "Единственный способ сделать великую работу — любить то, что ты делаешь. — Стив Джобс",
-    "Успех обычно приходит к тем, кто слишком занят, чтобы его искать. — Генри Дэвид Торо",
-    "Дисциплина — это мост между целями и достижениями. — Джим Рон",
-    "Мы есть то, что мы постоянно делаем. Совершенство — не действие, а привычка. — Аристотель",
-    "Неважно, как медленно ты продвигаешься, главное, что ты не останавливаешься. — Конфуций",
-    "Мотивация — это то, что заставляет вас начать. Привычка — это то, что заставляет продолжать. — Джим Рюн",
-    "Каждое утро у нас есть два выбора: продолжать спать со своими мечтами или встать и осуществлять их. — Неизвестный автор",
-    "Потерянное утро остается потерянным на весь день. — Ричард Уэйтли",
-    "Каждый день даёт шанс стать лучше. — Неизвестный автор",
-    "Самый верный способ добиться успеха — просто попробовать ещё раз. — Томас Эдисон",
-    "Если вы можете мечтать об этом, вы можете это сделать. — Уолт Дисней",
-    "Ваше время ограничено, не тратьте его, живя чужой жизнью. — Стив Джобс",
-    "Я благодарен всем, кто сказал мне 'нет'. Благодаря им я делаю всё сам. — Альберт Эйнштейн",
-    "В центре каждой трудности — возможность. — Альберт Эйнштейн",
-    "Сила не приходит от физических способностей. Она приходит от непреклонной воли. — Махатма Ганди",
-    "Препятствия — это те страшные вещи, которые вы видите, когда отводите взгляд от цели. — Генри Форд",
-    "Жизнь достаточно длинна, если ею хорошо распорядиться. — Сенека",
-    "Если это неправильно — не делай, если это не правда — не говори. — Марк Аврелий",
-    "Окружай себя теми, кто делает тебя лучше. — Сенека",
-    "Когда что-то не в твоей власти — не волнуйся об этом. — Эпиктет",
-    "Знание без действия бесполезно. — Томас Фуллер",
-    "Действие — основной ключ к успеху. — Пабло Пикассо",
-    "Никогда не путайте движение с действием. — Эрнест Хемингуэй",
-    "Цель без плана — это просто желание. — Антуан де Сент-Экзюпери",
-    "Установите свои цели достаточно высоко, и не останавливайтесь, пока не достигнете их. — Бо Джексон",
-    "Люди с целями преуспевают, потому что знают, куда идут. — Эрл Найтингейл",
-    "Воображение важнее, чем знания. Знания ограничены, тогда как воображение охватывает целый мир. — Альберт Эйнштейн",
-    "Логика доставит вас из пункта А в пункт Б. Воображение доставит вас куда угодно. — Альберт Эйнштейн",
-    "Мы сами должны стать теми переменами, которые хотим видеть в мире. — Махатма Ганди",
-    "Лучший способ предсказать свое будущее — создать его самому. — Питер Друкер",
-    "Инвестиция в знания всегда даёт наибольшую прибыль. — Бенджамин Франклин",
-    "Счастье — это не нечто готовое. Оно зависит от ваших собственных действий. — Далай-лама",
-    "Радость не в вещах, а в нас самих. — Рихард Вагнер",
-    "Успех — это способность идти от одной неудачи к другой, не теряя энтузиазма. — Уинстон Черчилль",
-    "Большие деньги делаются не на покупке и не на продаже, а на ожидании. — Чарли Мангер",
-    "Это не должно быть легко. Тот, кому легко, — глуп. — Чарли Мангер",
-    "Риск возникает из-за того, что вы не понимаете, что делаете. — Уоррен Баффет",
-    "Цена — это то, что вы платите. Ценность — это то, что вы получаете. — Уоррен Баффет",
-    "Гений — это один процент вдохновения и девяносто девять процентов пота. — Томас Эдисон",
-    "Думаете ли вы, что можете, или думаете, что не можете — в обоих случаях вы правы. — Генри Форд",
-    "Инновации отличают лидера от последователя. — Стив Джобс",
-    "Оставайтесь голодными. Оставайтесь безрассудными. — Стив Джобс",
-    "Боль + рефлексия = прогресс. — Рэй Далио",
-    "Если вы не терпите неудач, значит, вы не расширяете свои границы. — Рэй Далио",
-    "Лучший способ найти идею для стартапа — не пытаться придумать идею для стартапа. — Пол Грэм",
-    "Лучше иметь небольшое количество людей, которые вас любят, чем большое количество тех, кому вы безразличны. — Пол Грэм",
-    "Если вы не понимаете детали своего бизнеса, вы потерпите неудачу. — Джефф Безос",
-    "Ваш бренд — это то, что говорят о вас, когда вас нет в комнате. — Джефф Безос",
-    "Когда что-то действительно важно, ты делаешь это, даже если шансы не в твою пользу. — Илон Маск",
-    "Настойчивость крайне важна. Не следует сдаваться, если только вас не вынуждают сдаться. — Илон Маск",
-    "Сравнение — вор радости. — Теодор Рузвельт",
-    "Всё, что разум может представить и во что он может поверить, он способен достичь. — Наполеон Хилл",
-    "Не готовясь, вы готовитесь к провалу. — Бенджамин Франклин",
-    "Пока вы не осознаете бессознательное, оно будет управлять вашей жизнью, а вы будете называть это судьбой. — Карл Юнг",
-    "Там, где находится ваш страх, там находится и ваша задача. — Карл Юнг",
-    "Ты имеешь власть над своим умом — но не над внешними событиями. Осознай это, и ты обретёшь силу. — Марк Аврелий",
-    "Перестань тратить время на споры о том, каким должен быть хороший человек. Будь им. — Марк Аврелий",
-    "Удача — это то, что происходит, когда подготовка встречается с возможностью. — Сенека",
-    "Дело не в том, что у нас мало времени, а в том, что мы много его теряем. — Сенека",
-    "Тот, у кого есть зачем жить, выдержит почти любое как. — Фридрих Ницше",
-    "Конкуренция — для проигравших. — Питер Тиль",
-    "Гениальное мышление встречается редко, но смелость — ещё реже. — Питер Тиль",
-    "Человек, который научился полностью владеть своим разумом, может овладеть всем остальным. — Эндрю Карнеги",
-    "Вы не поднимаетесь до уровня своих целей. Вы опускаетесь до уровня своих систем. — Джеймс Клир",
-    "Каждое ваше действие — это голос за того человека, которым вы хотите стать. — Джеймс Клир",
-    "Знайте, чем вы владеете, и почему вы этим владеете. — Питер Линч",
-    "У каждого есть умственные способности зарабатывать деньги на рынке. Но не у каждого есть выдержка. — Питер Линч",
-    "Будущее принадлежит тем, кто осваивает больше навыков и объединяет их творческим образом. — Роберт Грин",
-    "Ваша потребность в одобрении может сделать вас невидимым в этом мире. — Роберт Грин",
-    "Чтобы быть успешным, не нужно быть гением или визионером. Нужны лишь система и мечта. — Майкл Делл",
-    "Дисциплина записывать что-то на бумаге — первый шаг к тому, чтобы это произошло. — Ли Якокка",
-    "Важно не то, правы вы или нет, а сколько вы зарабатываете, когда правы, и сколько теряете, когда ошибаетесь. — Джордж Сорос",
-    "Ветер гасит свечу, но разжигает огонь. — Нассим Николас Талеб",
-    "Три самые вредные зависимости — героин, углеводы и ежемесячная зарплата. — Нассим Николас Талеб",
-    "Хорошее — враг великого. — Джим Коллинз",
-    "Великое видение без великих людей не имеет значения. — Джим Коллинз",
-    "Если мы во всём согласны, значит, кто-то из нас не думает. — Альфред Слоун",
-    "Важно не то, сколько денег вы зарабатываете, а то, сколько вы сохраняете. — Роберт Кийосаки",
-    "Простота — это высшая форма изысканности. — Леонардо да Винчи",
-    "Старайтесь стать не человеком успеха, а человеком ценности. — Альберт Эйнштейн",
-    # Талеб (Nassim Nicholas Taleb)
-    "Ветер задувает свечу, но разжигает огонь. — Талеб",
-    "Если видишь мошенничество и не говоришь о нём — ты мошенник. — Талеб",
-    "Три самых вредных зависимости — героин, углеводы и ежемесячная зарплата. — Талеб",
-    "Успех — это стать в среднем возрасте тем, кем мечтал быть в позднем детстве. — Талеб",
-    "Герой ставит интересы других выше собственных. Противоположность герою — не трус, а эгоист. — Талеб",
-    "Проблема не в ошибках, а в попытках скрыть их. — Талеб",
-    "Сложность с людьми не в том, что они глупы. Проблема в том, что они умны, но не мудры. — Талеб",
-    "Курица — это способ яйца произвести ещё одно яйцо. — Талеб",
-    "Разница между технологией и рабством: раб осознаёт, что он не свободен. — Талеб",
-    "Образование делает мудрого мудрее, а глупого — опаснее. — Талеб",
-    # Марк Аврелий (дополнительные)
-    "Лучшая месть — не быть похожим на того, кто причинил тебе боль. — Марк Аврелий",
-    "Очень мало нужно для счастливой жизни; всё это в тебе самом. — Марк Аврелий",
-    "Потеря — это не что иное, как изменение. — Марк Аврелий",
-    "Не действуй так, будто тебе жить тысячу лет. — Марк Аврелий",
-    "Душа окрашивается в цвет своих мыслей. — Марк Аврелий",
-    "То, что ты делаешь, делает тебя. — Марк Аврелий",
-    "Препятствие на пути становится путём. — Марк Аврелий",
-    "Единственное богатство, которое ты сохранишь навечно — то, которое отдал. — Марк Аврелий",
-    # Сенека (дополнительные)
-    "Мы страдаем чаще в воображении, чем в реальности. — Сенека",
-    "Не потому трудно, что мы не решаемся, а потому не решаемся, что трудно. — Сенека",
-    "Если хочешь, чтобы тебя любили — люби. — Сенека",
-    "Мы учимся не для школы, а для жизни. — Сенека",
-    "Истинное счастье — наслаждаться настоящим без тревоги о будущем. — Сенека",
-    "Гнев — это кислота, которая больше вредит сосуду, в котором хранится. — Сенека",
-    # Эпиктет
-    "Не вещи расстраивают нас, а наши суждения о вещах. — Эпиктет",
-    "Человек не может научиться тому, что, как он думает, уже знает. — Эпиктет",
-    "Не требуй, чтобы события происходили как ты хочешь. Желай, чтобы они происходили как происходят. — Эпиктет",
-    "Богатство состоит не в обладании, а в умении обходиться малым. — Эпиктет",
-    "Есть только один путь к счастью — перестать беспокоиться о том, что вне твоей власти. — Эпиктет",
-    "Ты раб того, от чего хочешь освободиться. — Эпиктет",
-    "Если хочешь улучшить что-то — начни с себя. — Эпиктет",
-    "Мудрый человек требует всего только от себя; ничтожный — от других. — Эпиктет",
-    # Далай-лама
-    "Если проблему можно решить — нет смысла беспокоиться. Если нельзя — тем более. — Далай-лама"
-]
-        
-        self.recurring_events = {
-            'tarelka': {'name': 'Семейная традиция - Путещевствие на тарелке', 'file': 'tarelka.txt', 'rule': 'last_saturday'},
-            'chronos': {'name': 'Семейная традиция - Вечер воспоминаний. Хранители времени', 'file': 'chronos.txt', 'rule': 'third_saturday'},
-            'new': {'name': 'Семейная традиция - День нового', 'file': 'new.txt', 'rule': 'second_saturday'}
-        }
+        # Общее с tracker_bot.py хранилище статистики (STORAGE_BACKEND=json|journal|sqlite)
+        self.storage = storage or open_storage()
+        self.message_bodies = MessageBodies(self.storage)
         
-        # Расписание занятий детей
-        self.kids_schedule = {
-            'понедельник': [
-                {'child': '👧 Марта', 'activity': '🇬🇧 Английский', 'time': '16:00-17:00'},
-                {'child': '👦 Аркаша', 'activity': '📐 Математика', 'time': '19:00-20:00'}
-            ],
-            'вторник': [
-                {'child': '👧 Марта', 'activity': '💃 Танцы', 'time': '17:30-19:00'},
-                {'child': '👦 Аркаша', 'activity': '⚽ Футбол', 'time': '17:00-18:00'}
-            ],
-            'среда': [
-                {'child': '👧 Марта', 'activity': '🤺 Фехтование', 'time': '15:00-16:30'},
-                {'child': '👦 Аркаша', 'activity': '🤺 Фехтование', 'time': '16:00-18:00'},
-                {'child': '👧 Марта', 'activity': '🇬🇧 Английский', 'time': '17:00-18:00'}
-            ],
-            'четверг': [
-                {'child': '👧 Марта', 'activity': '💃 Танцы', 'time': '17:30-19:00'},
-                {'child': '👦 Аркаша', 'activity': '⚽ Футбол', 'time': '17:00-18:00'}
-            ],
-            'пятница': [
-                {'child': '👧 Марта', 'activity': '🤺 Фехтование', 'time': '15:00-16:30'},
-                {'child': '👦 Аркаша', 'activity': '🤺 Фехтование', 'time': '16:00-18:00'},
-                {'child': '👦 Аркаша', 'activity': '📐 Математика', 'time': '19:00-20:00'}
-            ],
-            'суббота': [
-                {'child': '👧 Марта', 'activity': '🤺 Фехтование', 'time': '15:00-17:00'}
-            ],
-            'воскресенье': [
-                {'child': '👧 Марта', 'activity': '🤺 Фехтование', 'time': '12:00-14:00'},
-                {'child': '👦 Аркаша', 'activity': '🤺 Фехтование', 'time': '14:00-16:00'}
-            ]
+        # Режим демона: время отправки по периодам в часовом поясе NOTIFY_TIMEZONE
+        self.notify_times = {
+            'morning': os.getenv('NOTIFY_MORNING', '07:00'),
+            'evening': os.getenv('NOTIFY_EVENING', '19:00')
         }
+        self.notify_timezone = ZoneInfo(os.getenv('NOTIFY_TIMEZONE', 'Europe/Moscow'))
+        self.daemon_task = None
         
-        self.schedule = {
-            'monday': {
-        'день': [
-            'Прими 💊 Витамины <i>(Топливо для мозга)</i>',
-            'Взвесится ⚖️ <i>(Цель 85 кг)</i>',
-            'Зарядка 🤸 <i>(Старт для твоей энергии)</i>',
-            'Дать 💝 3 поглаживания семье: (комплимент, внимание, объятия, искренний интерес)',
-            'Занятия 🇬🇧 English на YouTube <i>(20 min)</i>',
-            'Читать 📖 в дороге <i>(25 min это Спорт для мозга)</i>',
-            'Включи 🧠 Мозг Выбери 1 самое важное дело на сегодня',
-            'Прочитай 📚 задания от психолога',
-            'Проверь 🎯 Цели <i>(10 min Цели — твой навигатор)</i>',
-            'Подтянуться 💪 min 15 раз  <i>(5 min Силы для побед)</i>',
-            'Подтянуться 💪 min 15 раз  <i>(5 min Силы для побед)</i>',
-            'Упражнение 🦾 на пресс min 17 раз <i>(5 min Крепкий корпус)</i>',
-            'Упражнение 🦾 на пресс min 17 раз <i>(5 min Крепкий корпус)</i>'
-        ],
-        'нельзя_день': [
-            'Не 🤫 Перебивай <i>(Молчание строит доверие)</i>',
-            'Не 🙅 Извиняйся <i>(автоматическое принятие вины + эрозия авторитета)</i>',
-            'Не 🤬 Ругайся <i>(Мат это мусор и 👅 гнева и бессилия)</i>',
-            'Не ⚡ Делай Д <i>(Слил энергию = слил фокус)</i>',
-            'Не ⚡ Есть после 22-00 <i>( Цель 85 кг. )</i>',
-            'Не 🍷 Пей Алкоголь <i>(Даже вино. Он крадет твою энергию, деньги и внешность)</i>'
-        ],
-        'вечер': [
-            'Читать 📖 в дороге <i>(30 min это Спорт для мозга)</i>',
-            'Семейный 🍽️ ужин <i>(30 min)</i>',
-            'Проверить 📝 оценки детей <i>(Контроль учёбы)</i>',
-            'Отдых 😌 <i>(60 min Ментальная перезагрузка)</i>',
-            'CRPT 📊 LP <i>(30 min)</i>',
-            'Pet 💻 Project <i>(120 min)</i>',
-            'Читать 📚 с Мартой без телефона <i>(20 min)</i>',
-            'GROK 🤖 сессия с психологом <i>(15 min)</i>',
-            'Эмоциональный 📔 дневник <i>(10 min управляешь эмоциями и счастьем)</i>',
-            'Включи 💨 увлажнитель <i>(Здоровье лёгких)</i>',
-            'Прими 💊 Магний перед сном <i>(Выключи стресс)</i>',
-            'Вечерняя 🙏 благодарность <i>(Семейная традиция)</i>'
-        ]
-    },
-    'tuesday': {
-        'день': [
-            'Прими 💊 Витамины <i>(Топливо для мозга)</i>',
-            'Взвесится ⚖️ <i>(Цель 85 кг)</i>',
-            'Зарядка 🤸 <i>(Старт для твоей энергии)</i>',
-            'Дать 💝 3 поглаживания семье: (комплимент, внимание, объятия, искренний интерес)',
-            'Занятия 🇬🇧 English на YouTube <i>(20 min)</i>',
-            'Читать 📖 в дороге <i>(25 min это Спорт для мозга)</i>',
-            'Включи 🧠 Мозг Выбери 1 самое важное дело на сегодня',
-            'Прочитай 📚 задания от психолога',
-            'Проверь 🎯 Цели <i>(10 min Цели — твой навигатор)</i>',
-            'Подтянуться 💪 min 15 раз  <i>(5 min Силы для побед)</i>',
-            'Подтянуться 💪 min 15 раз  <i>(5 min Силы для побед)</i>',
-            'Упражнение 🦾 на пресс min 17 раз <i>(5 min Крепкий корпус)</i>',
-            'Упражнение 🦾 на пресс min 17 раз <i>(5 min Крепкий корпус)</i>'
-        ],
-        'нельзя_день': [
-            'Не 🤫 Перебивай <i>(Молчание строит доверие)</i>',
-            'Не 🙅 Извиняйся <i>(автоматическое принятие вины + эрозия авторитета)</i>',
-            'Не 🤬 Ругайся <i>(Мат это мусор и 👅 гнева и бессилия)</i>',
-            'Не ⚡ Делай Д <i>(Слил энергию = слил фокус)</i>',
-            'Не ⚡ Есть после 22-00 <i>( Цель 85 кг. )</i>',
-            'Не 🍷 Пей Алкоголь <i>(Даже вино. Он крадет твою энергию, деньги и внешность)</i>'
-        ],
-        'вечер': [
-            'Читать 📖 в дороге <i>(30 min это Спорт для мозга)</i>',
-            'Семейный 🍽️ ужин <i>(30 min)</i>',
-            'Проверить 📝 оценки детей <i>(5 min Контроль учёбы)</i>',
-            'Отдых 😌 <i>(60 min Ментальная перезагрузка)</i>',
-            'CRPT 📊 LP <i>(30 min)</i>',
-            'Pet 💻 Project <i>(120 min)</i>',
-            'Читать 📚 с Мартой <i>(20 min)</i>',
-            'GROK 🤖 сессия с психологом <i>(15 min)</i>',
-            'Эмоциональный 📔 дневник <i>(10 min управляешь эмоциями и счастьем)</i>',
-            'Включи 💨 увлажнитель <i>(1 min Здоровье лёгких)</i>',
-            'Прими 💊 Магний перед сном <i>(1 min Выключи стресс)</i>',
-            'Вечерняя 🙏 благодарность <i>(5 min Семейная традиция)</i>'
-        ]
-    },
-    'wednesday': {
-        'день': [
-            'Прими 💊 Витамины <i>(Топливо для мозга)</i>',
-            'Взвесится ⚖️ <i>(Цель 85 кг)</i>',
-            'Зарядка 🤸 <i>(Старт для твоей энергии)</i>',
-            'Дать 💝 3 поглаживания семье: (комплимент, внимание, объятия, искренний интерес)',
-            'Занятия 🇬🇧 English на YouTube <i>(20 min)</i>',
-            'Читать 📖 в дороге <i>(25 min это Спорт для мозга)</i>',
-            'Включи 🧠 Мозг Выбери 1 самое важное дело на сегодня',
-            'Прочитай 📚 задания от психолога',
-            'Проверь 🎯 Цели <i>(10 min Цели — твой навигатор)</i>',
-            'Подтянуться 💪 min 15 раз  <i>(5 min Силы для побед)</i>',
-            'Подтянуться 💪 min 15 раз  <i>(5 min Силы для побед)</i>',
-            'Упражнение 🦾 на пресс min 17 раз <i>(5 min Крепкий корпус)</i>',
-            'Упражнение 🦾 на пресс min 17 раз <i>(5 min Крепкий корпус)</i>'
-        ],
-        'нельзя_день': [
-            'Не 🤫 Перебивай <i>(Молчание строит доверие)</i>',
-            'Не 🙅 Извиняйся <i>(автоматическое принятие вины + эрозия авторитета)</i>',
-            'Не 🤬 Ругайся <i>(Мат это мусор и 👅 гнева и бессилия)</i>',
-            'Не ⚡ Делай Д <i>(Слил энергию = слил фокус)</i>',
-            'Не ⚡ Есть после 22-00 <i>( Цель 85 кг. )</i>',
-            'Не 🍷 Пей Алкоголь <i>(Даже вино. Он крадет твою энергию, деньги и внешность)</i>'
-        ],
-        'вечер': [
-            'Читать 📖 в дороге <i>(30 min это Спорт для мозга)</i>',
-            'Семейный 🍽️ ужин <i>(30 min)</i>',
-            'Проверить 📝 оценки детей <i>(5 min Контроль учёбы)</i>',
-            'Отдых 😌 <i>(60 min Ментальная перезагрузка)</i>',
-            'CRPT 📊 LP <i>(30 min)</i>',
-            'Pet 💻 Project <i>(120 min)</i>',
-            'Читать 📚 с Мартой <i>(20 min)</i>',
-            'GROK 🤖 сессия с психологом <i>(15 min)</i>',
-            'Эмоциональный 📔 дневник <i>(10 min управляешь эмоциями и счастьем)</i>',
-            'Включи 💨 увлажнитель <i>(1 min Здоровье лёгких)</i>',
-            'Прими 💊 Магний перед сном <i>(1 min Выключи стресс)</i>',
-            'Вечерняя 🙏 благодарность <i>(5 min Семейная традиция)</i>'
-        ]
-    },
-    'thursday': {
-        'день': [
-            'Прими 💊 Витамины <i>(Топливо для мозга)</i>',
-            'Взвесится ⚖️ <i>(Цель 85 кг)</i>',
-            'Зарядка 🤸 <i>(Старт для твоей энергии)</i>',
-            'Дать 💝 3 поглаживания семье: (комплимент, внимание, объятия, искренний интерес)',
-            'Занятия 🇬🇧 English на YouTube <i>(20 min)</i>',
-            'Читать 📖 в дороге <i>(25 min это Спорт для мозга)</i>',
-            'Включи 🧠 Мозг Выбери 1 самое важное дело на сегодня',
-            'Прочитай 📚 задания от психолога',
-            'Проверь 🎯 Цели <i>(10 min Цели — твой навигатор)</i>',
-            'Подтянуться 💪 min 15 раз  <i>(5 min Силы для побед)</i>',
-            'Подтянуться 💪 min 15 раз  <i>(5 min Силы для побед)</i>',
-            'Упражнение 🦾 на пресс min 17 раз <i>(5 min Крепкий корпус)</i>',
-            'Упражнение 🦾 на пресс min 17 раз <i>(5 min Крепкий корпус)</i>'
-        ],
-        'нельзя_день': [
-            'Не 🤫 Перебивай <i>(Молчание строит доверие)</i>',
-            'Не 🙅 Извиняйся <i>(автоматическое принятие вины + эрозия авторитета)</i>',
-            'Не 🤬 Ругайся <i>(Мат это мусор и 👅 гнева и бессилия)</i>',
-            'Не ⚡ Делай Д <i>(Слил энергию = слил фокус)</i>',
-            'Не ⚡ Есть после 22-00 <i>( Цель 85 кг. )</i>',
-            'Не 🍷 Пей Алкоголь <i>(Даже вино. Он крадет твою энергию, деньги и внешность)</i>'
-        ],
-        'вечер': [
-            'Читать 📖 в дороге <i>(30 min это Спорт для мозга)</i>',
-            'Семейный 🍽️ ужин <i>(30 min)</i>',
-            'Проверить 📝 оценки детей <i>(5 min Контроль учёбы)</i>',
-            'Отдых 😌 <i>(60 min Ментальная перезагрузка)</i>',
-            'CRPT 📊 LP <i>(30 min)</i>',
-            'Pet 💻 Project <i>(120 min)</i>',
-            'Читать 📚 с Мартой <i>(20 min)</i>',
-            'GROK 🤖 сессия с психологом <i>(15 min)</i>',
-            'Эмоциональный 📔 дневник <i>(10 min управляешь эмоциями и счастьем)</i>',
-            'Включи 💨 увлажнитель <i>(1 min Здоровье лёгких)</i>',
-            'Прими 💊 Магний перед сном <i>(1 min Выключи стресс)</i>',
-            'Вечерняя 🙏 благодарность <i>(5 min Семейная традиция)</i>'
-        ]
-    },
-    'friday': {
-        'день': [
-            'Прими 💊 Витамины <i>(Топливо для мозга)</i>',
-            'Взвесится ⚖️ <i>(Цель 85 кг)</i>',
-            'Зарядка 🤸 <i>(Старт для твоей энергии)</i>',
-            'Дать 💝 3 поглаживания семье: (комплимент, внимание, объятия, искренний интерес)',
-            'Занятия 🇬🇧 English на YouTube <i>(20 min)</i>',
-            'Читать 📖 в дороге <i>(25 min это Спорт для мозга)</i>',
-            'Включи 🧠 Мозг Выбери 1 самое важное дело на сегодня',
-            'Прочитай 📚 задания от психолога',
-            'Проверь 🎯 Цели <i>(10 min Цели — твой навигатор)</i>',
-            'Подтянуться 💪 min 15 раз  <i>(5 min Силы для побед)</i>',
-            'Подтянуться 💪 min 15 раз  <i>(5 min Силы для побед)</i>',
-            'Упражнение 🦾 на пресс min 17 раз <i>(5 min Крепкий корпус)</i>',
-            'Упражнение 🦾 на пресс min 17 раз <i>(5 min Крепкий корпус)</i>'
-        ],
-        'нельзя_день': [
-            'Не 🤫 Перебивай <i>(Молчание строит доверие)</i>',
-            'Не 🙅 Извиняйся <i>(автоматическое принятие вины + эрозия авторитета)</i>',
-            'Не 🤬 Ругайся <i>(Мат это мусор и 👅 гнева и бессилия)</i>',
-            'Не ⚡ Делай Д <i>(Слил энергию = слил фокус)</i>',
-            'Не ⚡ Есть после 22-00 <i>( Цель 85 кг. )</i>',
-            'Не 🍷 Пей Алкоголь <i>(Даже вино. Он крадет твою энергию, деньги и внешность)</i>'
-        ],
-        'вечер': [
-            'Читать 📖 в дороге <i>(30 min это Спорт для мозга)</i>',
-            'Семейный 🍽️ ужин <i>(30 min)</i>',
-            'Проверить 📝 оценки детей <i>(5 min Контроль учёбы)</i>',
-            'Отдых 😌 <i>(60 min Ментальная перезагрузка)</i>',
-            'CRPT 📊 LP <i>(30 min)</i>',
-            'Pet 💻 Project <i>(120 min)</i>',
-            'Читать 📚 с Мартой <i>(20 min)</i>',
-            'GROK 🤖 сессия с психологом <i>(15 min)</i>',
-            'Эмоциональный 📔 дневник <i>(10 min управляешь эмоциями и счастьем)</i>',
-            'Включи 💨 увлажнитель <i>(1 min Здоровье лёгких)</i>',
-            'Прими 💊 Магний перед сном <i>(1 min Выключи стресс)</i>',
-            'Вечерняя 🙏 благодарность <i>(5 min Семейная традиция)</i>',
-            'Зачёт 🧹 по чистоте комнаты в пятницу. Семейная традиция <i>(20 min Порядок в доме)</i>'
-        ]
-    },
-    'saturday': {
-        'день': [
-            'Прими 💊 витамины <i>(«Топливо» для мозга)</i>',
-            'Взвесится ⚖️ <i>(Цель 85 кг)</i>',
-            'Зарядка 🤸 <i>(«Старт» для твоей энергии)</i>',
-            'Дать 💝 3 поглаживания семье: (комплимент, внимание, объятия, искренний интерес)',
-            'Включи 🧠 Мозг Выбери 1 самое важное дело на сегодня',
-            'Полить 🌸 Цветы <i>(10 min Забота о доме)</i>',
-            'Проверь 🎯 Цели <i>(10 min Цели — твой навигатор)</i>',
-            'LP 📈 % <i>(30 min Анализ портфеля детей)</i>'
-        ],
-        'нельзя_день': [
-            'Не 🙅 Извиняйся <i>(автоматическое принятие вины + эрозия авторитета)</i>',
-            'Не 🤬 Ругайся <i>(Мат это мусор и 👅 гнева и бессилия)</i>',
-            'Не ⚡ Есть после 22-00 <i>( Цель 85 кг. )</i>',
-            'Не ⚡ Делай Д <i>(Слил энергию = слил фокус)</i>',
-        ],
-        'вечер': [
-            'Pet 💻 Project <i>(120 +120 +120 min)</i>',
-            'Читать 📚 с Мартой <i>(20 min)</i>',
-            'GROK 🤖 сессия с психологом <i>(15 min)</i>',
-            'Эмоциональный 📔 дневник <i>(10 min управляешь эмоциями и счастьем)</i>',
-            'Включи 💨 увлажнитель <i>(1 min Здоровье лёгких)</i>',
-            'Прими 💊 Магний перед сном <i>(1 min Выключи стресс)</i>',
-            'Вечерняя 🙏 благодарность <i>(5 min Семейная традиция)</i>',
-            'Семейный 🎬 просмотр фильма <i>(120 min Время вместе)</i>'
-        ]
-    },
-    'sunday': {
-        'день': [
-            'День 📵 без гаджетов <i>(Весь день живое общение)</i>',
-            'День 🧹 семейной уборки',
-            'Дать 💝 3 поглаживания семье: (комплимент, внимание, объятия, искренний интерес)',
-            'Включи 🧠 Мозг Выбери 1 самое важное дело на сегодня',
-            'Семейный 🍳 завтрак <i>(30 min Начало дня вместе)</i>',
-            '😊 Д <i>(Сегодня мо-о-о-жно)</i>',
-            'Семейная 🚶 прогулка <i>(60 min Свежий воздух)</i>'
-        ],
-        'нельзя_день': [
-            'Не 🙅 Извиняйся <i>(автоматическое принятие вины + эрозия авторитета)</i>',
-            'Не 🤬 Ругайся <i>(Мат это мусор и 👅 гнева и бессилия)</i>',
-            'Не ⚡ Есть после 22-00 <i>( Цель 85 кг. )</i>',
-            'Не 🍷 Пей Алкоголь <i>(Даже вино. Он крадет твою энергию, деньги и внешность)</i>'
-        ],
-        'вечер': [
-            'Прими 💊 Магний перед сном <i>(1 min Выключи стресс)</i>',
-            'Вечерняя 🙏 благодарность <i>(5 min Семейная традиция)</i>'
-                ]
-            }
+        # Общий дедлайн на загрузку погоды/штрафа/событий для утреннего сообщения
+        self.prefetch_deadline = float(os.getenv('PREFETCH_DEADLINE', 12))
+        
+        # Бюджеты времени по источникам и брейкеры (состояние переживает перезапуск)
+        self.source_budgets = {
+            'weather': float(os.getenv('WEATHER_BUDGET', 5)),
+            'events': float(os.getenv('EVENTS_BUDGET', 6)),
+            'penalty': float(os.getenv('PENALTY_BUDGET', 2))
         }
+        self.sources = SourceGuard(
+            state_file=os.getenv('SOURCES_STATE_FILE', 'sources_state.json'),
+            failure_threshold=int(os.getenv('BREAKER_FAILURES', 3)),
+            reset_timeout=int(os.getenv('BREAKER_RESET_TIMEOUT', 900))
+        )
+        
+        # Погода: точка по умолчанию - Москва, кэш на диске по координатам и часу
+        self.weather_location = (
+            float(os.getenv('WEATHER_LATITUDE', 55.7558)),
+            float(os.getenv('WEATHER_LONGITUDE', 37.6173)),
+            os.getenv('WEATHER_PLACE', 'Москве')
+        )
+        self.weather_cache = WeatherCache(
+            cache_file=os.getenv('WEATHER_CACHE_FILE', 'weather_cache.json'),
+            ttl=int(os.getenv('WEATHER_CACHE_TTL', 1800)),
+            stale_ttl=int(os.getenv('WEATHER_STALE_TTL', 6 * 3600))
+        )
+        
+        # Файлы событий: локальные копии + ETag/Last-Modified для условных запросов
+        self.events_url = "https://raw.githubusercontent.com/BRKME/Day/main/{filename}"
+        self.event_cache = ConditionalCache(os.getenv('EVENT_CACHE_DIR', '.event_cache'))
+        
+        # Передача манифеста задач в tracker_bot.py на Render (POST /tasks)
+        # Таймаут с запасом на пробуждение бесплатного инстанса
+        self.tracker_url = os.getenv('TRACKER_URL', '').rstrip('/')
+        self.tasks_ingest_token = os.getenv('TASKS_INGEST_TOKEN', '')
+        self.tracker_timeout = float(os.getenv('TRACKER_INGEST_TIMEOUT', 60))
+        
+        self.prayer_url = "https://brkme.github.io/My_Day_Shedule/prayer.html"
+        self.ss_url = "https://brkme.github.io/My_Day_Shedule/ss.html"
+        self.career_url = "https://brkme.github.io/My_Day_Shedule/career.html"
+        
+        # Мудрости, расписания и события - в content/, грузятся лениво при первом обращении
+        self.content = ContentStore(
+            content_dir=os.getenv('CONTENT_DIR', CONTENT_DIR),
+            cache_dir=os.getenv('CONTENT_CACHE_DIR', '.content_cache')
+        )
+        
+        # Правила событий компилируются в индекс дат на EVENTS_HORIZON_MONTHS месяцев вперёд
+        self.events_horizon_months = int(os.getenv('EVENTS_HORIZON_MONTHS', 12))
+        self._event_calendar = None
+
+    @property
+    def wisdoms(self):
+        return self.content.get('wisdoms')
+
+    @property
+    def schedule(self):
+        return self.content.get('schedule')
+
+    @property
+    def kids_schedule(self):
+        return self.content.get('kids_schedule')
+
+    @property
+    def recurring_events(self):
+        return self.content.get('recurring_events')
+
+    @property
+    def event_calendar(self):
+        """Календарь пересобирается, если файл событий изменился"""
+        events = self.recurring_events
+        if self._event_calendar is None or self._event_calendar.events is not events:
+            self._event_calendar = EventCalendar(events, months=self.events_horizon_months)
+        return self._event_calendar
 
     def get_random_wisdom(self):
         return random.choice(self.wisdoms)
@@ -464,45 +149,64 @@ class PersonalScheduleNotifier:
         schedule = self.schedule.get(day_of_week, {})
         return date_str, day_of_week, schedule
 
-    async def get_weather_forecast(self):
-        """Получение погоды через Open-Meteo API (стабильный, без ключа)"""
-        try:
-            # Москва: 55.7558, 37.6173
-            url = "https://api.open-meteo.com/v1/forecast?latitude=55.7558&longitude=37.6173&current_weather=true&temperature_unit=celsius&timezone=Europe/Moscow"
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        current = data.get('current_weather', {})
-                        
-                        temp = current.get('temperature', 'N/A')
-                        windspeed = current.get('windspeed', 'N/A')
-                        
-                        weather_codes = {
-                            0: 'Ясно', 1: 'Малооблачно', 2: 'Переменная облачность', 3: 'Облачно',
-                            45: 'Туман', 48: 'Изморозь',
-                            51: 'Морось', 53: 'Морось', 55: 'Сильная морось',
-                            61: 'Слабый дождь', 63: 'Дождь', 65: 'Сильный дождь',
-                            71: 'Слабый снег', 73: 'Снег', 75: 'Сильный снег',
-                            80: 'Ливень', 81: 'Сильный ливень', 82: 'Очень сильный ливень',
-                            95: 'Гроза', 96: 'Гроза с градом', 99: 'Сильная гроза'
-                        }
-                        
-                        weather_code = current.get('weathercode', 0)
-                        condition = weather_codes.get(weather_code, 'Неизвестно')
-                        
-                        logger.info(f"✅ Погода получена: {temp}°C, {condition}")
-                        
-                        return (
-                            f"🌤️ <b>Погода в Москве:</b>\n"
-                            f"🌡️ {temp}°C • {condition}\n"
-                            f"💨 Ветер: {windspeed} км/ч\n"
-                        )
-                    return "🌤️ <b>Погода:</b> Ошибка получения\n"
-        except Exception as e:
-            logger.error(f"❌ Ошибка погоды: {e}")
+    async def get_weather_forecast(self, location=None):
+        """
+        Погода для точки (широта, долгота, название) - по умолчанию self.weather_location
+        Сначала кэш; при сбое API - последнее удачное значение (до WEATHER_STALE_TTL) или заглушка
+        """
+        latitude, longitude, place = location or self.weather_location
+        data = await self.weather_cache.get(
+            latitude, longitude,
+            lambda: self.sources.call(
+                'weather', lambda: self.fetch_weather_data(latitude, longitude),
+                budget=self.source_budgets['weather']
+            )
+        )
+        if data is None:
             return "🌤️ <b>Погода:</b> Ошибка подключения\n"
+        return self.format_weather(data, place)
+
+    async def fetch_weather_data(self, latitude, longitude):
+        """Текущая погода через Open-Meteo API (стабильный, без ключа), ошибки пробрасываются"""
+        url = "https://api.open-meteo.com/v1/forecast"
+        params = {
+            'latitude': latitude,
+            'longitude': longitude,
+            'current_weather': 'true',
+            'temperature_unit': 'celsius',
+            'timezone': 'auto'
+        }
+        
+        session = await self.telegram.get_session()
+        async with session.get(url, params=params) as response:
+            response.raise_for_status()
+            data = await response.json()
+            return data.get('current_weather', {})
+
+    def format_weather(self, current, place):
+        temp = current.get('temperature', 'N/A')
+        windspeed = current.get('windspeed', 'N/A')
+        
+        weather_codes = {
+            0: 'Ясно', 1: 'Малооблачно', 2: 'Переменная облачность', 3: 'Облачно',
+            45: 'Туман', 48: 'Изморозь',
+            51: 'Морось', 53: 'Морось', 55: 'Сильная морось',
+            61: 'Слабый дождь', 63: 'Дождь', 65: 'Сильный дождь',
+            71: 'Слабый снег', 73: 'Снег', 75: 'Сильный снег',
+            80: 'Ливень', 81: 'Сильный ливень', 82: 'Очень сильный ливень',
+            95: 'Гроза', 96: 'Гроза с градом', 99: 'Сильная гроза'
+        }
+        
+        weather_code = current.get('weathercode', 0)
+        condition = weather_codes.get(weather_code, 'Неизвестно')
+        
+        logger.info(f"✅ Погода: {temp}°C, {condition}")
+        
+        return (
+            f"🌤️ <b>Погода в {place}:</b>\n"
+            f"🌡️ {temp}°C • {condition}\n"
+            f"💨 Ветер: {windspeed} км/ч\n"
+        )
 
     async def get_weekend_forecast(self):
         """Не используется, возвращает пустую строку"""
@@ -516,60 +220,36 @@ class PersonalScheduleNotifier:
                 return day
         return None
 
-    def get_event_date_by_rule(self, rule, year, month):
-        if rule == 'last_saturday':
-            day = self.get_last_day_of_month(year, month, 5)
-            return (year, month, day) if day else None
-        elif rule == 'third_saturday':
-            calendar = monthcalendar(year, month)
-            saturdays = [week[5] for week in calendar if week[5] != 0]
-            if len(saturdays) >= 3:
-                return (year, month, saturdays[2])
-        elif rule == 'second_saturday':
-            calendar = monthcalendar(year, month)
-            saturdays = [week[5] for week in calendar if week[5] != 0]
-            if len(saturdays) >= 2:
-                return (year, month, saturdays[1])
-        return None
-
     async def check_yesterday_penalty(self):
-        """Проверяет штраф за вчера из stats.json"""
-        try:
-            from datetime import timedelta
-            
-            # Получаем вчерашнюю дату
-            yesterday = datetime.now() - timedelta(days=1)
-            yesterday_key = yesterday.strftime("%Y-%m-%d")
-            
-            # Читаем stats.json
-            stats_file = "stats.json"
-            if not os.path.exists(stats_file):
-                logger.info("📊 stats.json не найден, штрафа нет")
-                return None
-            
-            with open(stats_file, 'r', encoding='utf-8') as f:
-                stats = json.load(f)
-            
-            # Проверяем есть ли данные за вчера
-            if yesterday_key not in stats:
-                logger.info(f"📊 Нет данных за {yesterday_key}, штрафа нет")
-                return None
-            
-            yesterday_data = stats[yesterday_key]
-            
-            # Проверяем penalty_pushups
-            penalty_pushups = yesterday_data.get('penalty_pushups', 0)
-            
-            if penalty_pushups > 0:
-                cant_do_fails = len(yesterday_data.get('cant_do', {}).get('completed', []))
-                logger.info(f"⚠️ Найден штраф за {yesterday_key}: {penalty_pushups} отжиманий ({cant_do_fails} срывов)")
-                return f"🏋️ Отжимания {penalty_pushups} раз <i>(Штраф за {cant_do_fails} срыв{'а' if cant_do_fails > 1 else ''})</i>"
-            else:
-                logger.info(f"✅ Штрафа за {yesterday_key} нет")
-                return None
-                
-        except Exception as e:
-            logger.error(f"❌ Ошибка проверки штрафа: {e}")
+        """Штраф за вчера в пределах бюджета (None при ошибке или открытом брейкере)"""
+        return await self.sources.call(
+            'penalty', self.read_yesterday_penalty,
+            budget=self.source_budgets['penalty']
+        )
+
+    async def read_yesterday_penalty(self):
+        """Проверяет штраф за вчера из stats.json, ошибки пробрасываются"""
+        # Получаем вчерашнюю дату
+        yesterday = datetime.now() - timedelta(days=1)
+        yesterday_key = yesterday.strftime("%Y-%m-%d")
+        
+        # Читаем статистику только за вчера
+        yesterday_data = self.storage.get_day(yesterday_key)
+        
+        # Проверяем есть ли данные за вчера
+        if not yesterday_data:
+            logger.info(f"📊 Нет данных за {yesterday_key}, штрафа нет")
+            return None
+        
+        # Проверяем penalty_pushups
+        penalty_pushups = yesterday_data.get('penalty_pushups', 0)
+        
+        if penalty_pushups > 0:
+            cant_do_fails = completion.section_count(yesterday_data.get('cant_do'))
+            logger.info(f"⚠️ Найден штраф за {yesterday_key}: {penalty_pushups} отжиманий ({cant_do_fails} срывов)")
+            return f"🏋️ Отжимания {penalty_pushups} раз <i>(Штраф за {cant_do_fails} срыв{'а' if cant_do_fails > 1 else ''})</i>"
+        else:
+            logger.info(f"✅ Штрафа за {yesterday_key} нет")
             return None
 
     def get_kids_schedule(self, day_of_week):
@@ -631,14 +311,54 @@ class PersonalScheduleNotifier:
         logger.info(f"✅ Расписание сформировано: {successful_items}/{len(activities)} занятий")
         return schedule_text
 
-    async def format_morning_day_message(self, date_str, day_of_week, schedule):
+    async def prefetch_morning_inputs(self, reminders=()):
+        """
+        Параллельно загружает всё внешнее для утреннего сообщения:
+        погоду, штраф за вчера и файлы событий
+        Общий дедлайн - не успевший или упавший источник заменяется запасным значением
+        """
+        sources = {
+            'weather': self.get_weather_forecast(),
+            'penalty': self.check_yesterday_penalty()
+        }
+        for reminder in reminders:
+            filename = reminder['event']['file']
+            if f"event:{filename}" not in sources:
+                sources[f"event:{filename}"] = self.fetch_event_file(filename)
+        
+        fallbacks = {'weather': "🌤️ <b>Погода:</b> Ошибка подключения\n"}
+        
+        tasks = {name: asyncio.create_task(coro) for name, coro in sources.items()}
+        done, pending = await asyncio.wait(tasks.values(), timeout=self.prefetch_deadline)
+        for task in pending:
+            task.cancel()
+        # Отменённые должны завершиться здесь, а не висеть до конца event loop
+        await asyncio.gather(*pending, return_exceptions=True)
+        
+        results = {}
+        for name, task in tasks.items():
+            if task in done and task.exception() is None:
+                results[name] = task.result()
+            else:
+                reason = f"не успел за {self.prefetch_deadline}с" if task in pending else f"ошибка {task.exception()!r}"
+                logger.warning(f"⏱️ Источник {name} {reason}, используем запасное значение")
+                results[name] = fallbacks.get(name)
+        
+        logger.info(f"✅ Данные для утреннего сообщения загружены: {', '.join(results)}")
+        return results
+
+    async def format_morning_day_message(self, date_str, day_of_week, schedule, prefetched=None):
         day_names = {'monday': 'Понедельник', 'tuesday': 'Вторник', 'wednesday': 'Среда', 'thursday': 'Четверг', 'friday': 'Пятница', 'saturday': 'Суббота', 'sunday': 'Воскресенье'}
         day_ru = day_names.get(day_of_week, day_of_week)
         wisdom = self.get_random_wisdom()
         
         content = f"🌅 <b>План на {day_ru} {date_str}</b>\n\n"
         
-        weather = await self.get_weather_forecast()
+        # Погода и штраф - из предзагрузки, если она была
+        if prefetched is None:
+            prefetched = await self.prefetch_morning_inputs()
+        
+        weather = prefetched['weather']
         content += weather
         
         if day_of_week in ['monday', 'wednesday', 'friday']:
@@ -648,25 +368,19 @@ class PersonalScheduleNotifier:
         
         content += "\n"
         
-        penalty_task = await self.check_yesterday_penalty()
+        penalty_task = prefetched['penalty']
         if penalty_task:
             content += f"<b>⚠️ ШТРАФ ЗА ВЧЕРА:</b>\n"
             content += f"• {penalty_task}\n\n"
         
-        if schedule.get('день'):
+        tasks = self.get_task_lists(day_of_week, schedule, 'morning')
+        if tasks['day']:
             content += "<b>📋 Дневные задачи:</b>\n"
-            
-            if day_of_week == 'saturday':
-                today = datetime.now()
-                last_saturday_day = self.get_last_day_of_month(today.year, today.month, 5)
-                if today.day == last_saturday_day:
-                    content += "• Сделать фото-презентацию по итогам месяца\n"
-            
-            for task in schedule['день']:
+            for task in tasks['day']:
                 content += f"• {task}\n"
-        if schedule.get('нельзя_день'):
+        if tasks['cant_do']:
             content += "\n<b>⛔ Нельзя делать:</b>\n"
-            for task in schedule['нельзя_день']:
+            for task in tasks['cant_do']:
                 content += f"• {task}\n"
         
         # Добавляем расписание детей
@@ -690,80 +404,58 @@ class PersonalScheduleNotifier:
             ]
         }
     
-    def save_today_tasks(self, message):
+    def get_task_lists(self, day_of_week, schedule, period):
         """
-        Сохраняет задачи из сообщения в stats.json для tracker_bot.py
+        Задачи сообщения по секциям {'day', 'cant_do', 'evening'}
+        Из них строится и текст сообщения, и манифест для tracker_bot.py
+        """
+        if period == 'evening':
+            return {'day': [], 'cant_do': [], 'evening': list(schedule.get('вечер', []))}
+        
+        day_tasks = []
+        if schedule.get('день'):
+            if day_of_week == 'saturday':
+                today = datetime.now()
+                last_saturday_day = self.get_last_day_of_month(today.year, today.month, 5)
+                if today.day == last_saturday_day:
+                    day_tasks.append("Сделать фото-презентацию по итогам месяца")
+            day_tasks.extend(schedule['день'])
+        return {'day': day_tasks, 'cant_do': list(schedule.get('нельзя_день', [])), 'evening': []}
+
+    def save_today_tasks(self, message, manifest):
+        """
+        Сохраняет задачи сообщения в stats.json для tracker_bot.py
         Это решает проблему timeout кнопок при перезапуске Render
         """
         try:
-            stats_file = "stats.json"
             today = datetime.now().strftime("%Y-%m-%d")
             
-            # Парсим задачи из сообщения
-            tasks = self.parse_tasks_from_message(message)
-            
-            # Загружаем существующую статистику
-            stats = {}
-            if os.path.exists(stats_file):
-                with open(stats_file, 'r', encoding='utf-8') as f:
-                    stats = json.load(f)
-                    # Фильтруем служебные ключи
-                    stats = {k: v for k, v in stats.items() if not k.startswith('_')}
-            
-            # Создаём или обновляем запись за сегодня
-            if today not in stats:
-                stats[today] = {}
+            tasks = manifest_tasks(manifest)
+            tasks = {section: tasks[section] for section in SECTIONS}
             
             # Сохраняем задачи (не перезаписываем completed если уже есть)
-            stats[today]['_tasks'] = tasks
-            stats[today]['_message'] = message[:1000]  # Сохраняем первые 1000 символов
-            stats[today]['_updated'] = datetime.now().isoformat()
-            
-            # Сохраняем
-            with open(stats_file, 'w', encoding='utf-8') as f:
-                json.dump(stats, f, ensure_ascii=False, indent=2)
+            # Тексты - в каталог задач, в записи дня только их id
+            self.storage.update_day(today, {
+                '_task_refs': intern_tasks(self.storage, tasks),
+                '_message_ref': self.message_bodies.put(message),  # Текст сообщения - сжатым, по ссылке
+                '_updated': datetime.now().isoformat()
+            })
             
             logger.info(f"✅ Задачи сохранены в stats.json: day={len(tasks.get('day', []))}, evening={len(tasks.get('evening', []))}")
             
         except Exception as e:
             logger.error(f"❌ Ошибка сохранения задач: {e}")
     
-    def parse_tasks_from_message(self, message):
-        """Парсит задачи из сообщения (аналог parse_tasks в tracker_bot.py)"""
-        tasks = {
-            'day': [],
-            'cant_do': [],
-            'evening': []
-        }
-        
-        lines = message.split('\n')
-        current_section = None
-        
-        for line in lines:
-            line = line.strip()
-            clean_line = line.replace('<b>', '').replace('</b>', '').replace('<i>', '').replace('</i>', '')
-            
-            # Определяем секцию
-            if ('📋' in clean_line or '☀️' in clean_line) and 'Дневн' in clean_line:
-                current_section = 'day'
-                continue
-            elif any(marker in clean_line for marker in ['⛔', '⛔️', 'Нельзя делать']):
-                current_section = 'cant_do'
-                continue
-            elif ('🌙' in clean_line and 'Вечерн' in clean_line) or 'Вечерние задачи' in clean_line:
-                current_section = 'evening'
-                continue
-            elif any(marker in clean_line for marker in ['Мудрость дня', '🙏 Утренняя', '🎉 СЕГОДНЯ', 'Занятия детей']):
-                current_section = None
-                continue
-            
-            # Собираем задачи
-            if current_section and line.startswith('•'):
-                task_text = line[1:].strip()
-                if task_text:
-                    tasks[current_section].append(task_text)
-        
-        return tasks
+    def save_task_manifest(self, message_id, manifest):
+        """Манифест задач по message_id - tracker_bot.py берёт задачи отсюда, а не из текста"""
+        try:
+            # Тексты задач - в каталог, в манифесте только их id
+            self.storage.put_manifest(message_id, pack_manifest(self.storage, manifest))
+            # Индекс message_id → день: по нему tracker_bot.py восстанавливает потерянное состояние
+            self.storage.put_message_day(message_id, manifest['day'])
+            logger.info(f"✅ Манифест задач сохранён для сообщения {message_id}")
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения манифеста: {e}")
 
     async def format_evening_message(self, date_str, day_of_week, schedule):
         day_names = {'monday': 'Понедельник', 'tuesday': 'Вторник', 'wednesday': 'Среда', 'thursday': 'Четверг', 'friday': 'Пятница', 'saturday': 'Суббота', 'sunday': 'Воскресенье'}
@@ -772,9 +464,10 @@ class PersonalScheduleNotifier:
         
         content = f"🌙 <b>Вечерний план на {day_ru} {date_str}</b>\n\n"
         
-        if schedule.get('вечер'):
+        tasks = self.get_task_lists(day_of_week, schedule, 'evening')
+        if tasks['evening']:
             content += "<b>📋 Вечерние задачи:</b>\n"
-            for task in schedule['вечер']:
+            for task in tasks['evening']:
                 content += f"• {task}\n"
         content += f"\n<b>Мудрость дня:</b>\n{wisdom}"
         
@@ -784,48 +477,55 @@ class PersonalScheduleNotifier:
         return content
 
     async def fetch_event_file(self, filename):
+        """Файл события в пределах бюджета; без сети - сохранённая копия"""
+        url = self.events_url.format(filename=filename)
+        return await self.sources.call(
+            'events', lambda: self.download_event_file(url),
+            budget=self.source_budgets['events'],
+            fallback=lambda: self.event_cache.cached(url)
+        )
+
+    async def download_event_file(self, url):
+        """Условный GET: неизменившийся файл стоит один ответ 304"""
+        session = await self.telegram.get_session()
+        content = await self.event_cache.fetch(session, url)
+        if content is None:
+            logger.info(f"ℹ️ Файла {url.rsplit('/', 1)[-1]} нет")
+        else:
+            logger.info(f"✅ Файл {url.rsplit('/', 1)[-1]} загружен")
+        return content
+
+    def check_recurring_events(self):
+        """Напоминания на сегодня из индекса календаря (за 7 и 3 дня, в день события)"""
+        return self.event_calendar.reminders_for(datetime.now().date())
+
+    async def push_task_manifest(self, message_id, manifest, message):
+        """Отправляет манифест в tracker_bot.py - у GitHub Actions и Render разные файловые системы"""
+        if not self.tracker_url or not self.tasks_ingest_token:
+            return False
         try:
-            url = f"https://raw.githubusercontent.com/BRKME/Day/main/{filename}"
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=10) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        logger.info(f"✅ Файл {filename} загружен")
-                        return content
-                    else:
-                        logger.error(f"❌ Ошибка загрузки {filename}")
-                        return None
+            session = await self.telegram.get_session()
+            async with session.post(
+                f"{self.tracker_url}/tasks",
+                json={'message_id': message_id, 'manifest': manifest, 'message': message[:1000]},
+                headers={'Authorization': f"Bearer {self.tasks_ingest_token}"},
+                timeout=aiohttp.ClientTimeout(total=self.tracker_timeout)
+            ) as response:
+                if response.status == 200:
+                    logger.info(f"✅ Манифест передан в tracker_bot ({message_id})")
+                    return True
+                logger.error(f"❌ tracker_bot не принял манифест: {response.status} {await response.text()}")
+                return False
         except Exception as e:
-            logger.error(f"❌ Ошибка: {e}")
-            return None
+            logger.error(f"❌ Ошибка передачи манифеста в tracker_bot: {e!r}")
+            return False
 
-    def check_recurring_events(self):
-        from datetime import date as dt
-        today = datetime.now()
-        year, month, day = today.year, today.month, today.day
-        reminders = []
-        for event_key, event in self.recurring_events.items():
-            event_date = self.get_event_date_by_rule(event['rule'], year, month)
-            if not event_date:
-                continue
-            event_year, event_month, event_day = event_date
-            event_dt = dt(event_year, event_month, event_day)
-            today_dt = dt(year, month, day)
-            days_until = (event_dt - today_dt).days
-            if days_until == 7:
-                reminders.append({'key': event_key, 'event': event, 'type': 'week_before'})
-            elif days_until == 3:
-                reminders.append({'key': event_key, 'event': event, 'type': 'three_days_before'})
-            elif days_until == 0:
-                reminders.append({'key': event_key, 'event': event, 'type': 'event_day'})
-        return reminders
-
-    async def send_telegram_message(self, message, ss_content=None, add_progress_button=False):
+    async def send_telegram_message(self, message, ss_content=None, add_progress_button=False, manifest=None):
         try:
             # НОВОЕ: Сохраняем задачи для tracker_bot.py
-            self.save_today_tasks(message)
+            if manifest is not None:
+                self.save_today_tasks(message, manifest)
             
-            url = f"https://api.telegram.org/bot{self.telegram_token}/sendMessage"
             payload = {
                 'chat_id': self.chat_id, 
                 'text': message, 
@@ -837,22 +537,24 @@ class PersonalScheduleNotifier:
                 payload['reply_markup'] = self.create_message_keyboard()
             
             logger.info("📤 Отправка сообщения в Telegram...")
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload, timeout=10) as response:
-                    if response.status != 200:
-                        logger.error(f"❌ Ошибка API")
-                        return False
+            status, data = await self.dispatcher.send('sendMessage', payload)
+            if status != 200:
+                logger.error(f"❌ Ошибка API")
+                return False
+            message_id = data.get('result', {}).get('message_id')
+            if manifest is not None and message_id:
+                self.save_task_manifest(message_id, manifest)
+                await self.push_task_manifest(message_id, manifest, message)
             if ss_content:
                 family_msg = f"<b>📋 Семейный совет:</b>\n\n🔗 <a href='{self.ss_url}'>Открыть структуру Семейного Совета</a>"
                 payload_council = {'chat_id': self.chat_id, 'text': family_msg, 'parse_mode': 'HTML', 'disable_web_page_preview': False}
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(url, json=payload_council, timeout=10) as response:
-                        if response.status == 200:
-                            logger.info("✅ Сообщения отправлены!")
-                            return True
-                        else:
-                            logger.error(f"❌ Ошибка отправки")
-                            return False
+                status, data = await self.dispatcher.send('sendMessage', payload_council)
+                if status == 200:
+                    logger.info("✅ Сообщения отправлены!")
+                    return True
+                else:
+                    logger.error(f"❌ Ошибка отправки")
+                    return False
             else:
                 logger.info("✅ Сообщение отправлено!")
                 return True
@@ -866,16 +568,19 @@ class PersonalScheduleNotifier:
         add_button = False
         
         if period == 'morning':
-            message = await self.format_morning_day_message(date_str, day_of_week, schedule)
+            # Погода, штраф и все файлы событий грузятся одновременно
+            reminders = self.check_recurring_events()
+            prefetched = await self.prefetch_morning_inputs(reminders)
+            
+            message = await self.format_morning_day_message(date_str, day_of_week, schedule, prefetched)
             add_button = True
             
             if day_of_week == 'sunday':
                 ss_content = True
-            reminders = self.check_recurring_events()
             if reminders:
                 for reminder in reminders:
                     event = reminder['event']
-                    event_content = await self.fetch_event_file(event['file'])
+                    event_content = prefetched.get(f"event:{event['file']}")
                     if reminder['type'] == 'week_before':
                         message += f"\n\n🔔 <b>НАПОМИНАНИЕ (За 7 дней):</b>\n<b>{event['name']}</b>\n"
                         if event_content:
@@ -897,20 +602,96 @@ class PersonalScheduleNotifier:
         else:
             logger.error(f"❌ Неизвестный период: {period}")
             return False
-        return await self.send_telegram_message(message, ss_content, add_progress_button=add_button)
+        manifest = build_manifest(
+            self.get_task_lists(day_of_week, schedule, period),
+            datetime.now().strftime("%Y-%m-%d"), period
+        )
+        return await self.send_telegram_message(message, ss_content, add_progress_button=add_button, manifest=manifest)
+
+    # === Режим демона ===
+
+    def next_notification(self, now=None):
+        """Ближайшая отправка: (время, период)"""
+        now = now or datetime.now(self.notify_timezone)
+        upcoming = []
+        for period, at in self.notify_times.items():
+            hour, minute = map(int, at.split(':'))
+            run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if run_at <= now:
+                run_at += timedelta(days=1)
+            upcoming.append((run_at, period))
+        return min(upcoming)
+
+    async def run_daemon(self):
+        """
+        Долгоживущий режим: процесс, HTTP-сессия и расписание остаются в памяти,
+        сообщения отправляются по self.notify_times
+        """
+        logger.info(f"🕰️ Режим демона: {self.notify_times} ({self.notify_timezone.key})")
+        while True:
+            run_at, period = self.next_notification()
+            logger.info(f"⏰ Следующая отправка: {period} в {run_at:%d.%m.%Y %H:%M}")
+            
+            # Спим порциями не больше часа - переживаем перевод и коррекцию часов
+            while True:
+                delay = (run_at - datetime.now(self.notify_timezone)).total_seconds()
+                if delay <= 0:
+                    break
+                await asyncio.sleep(min(delay, 3600))
+            
+            try:
+                if not await self.send_message_for_period(period):
+                    logger.error(f"💥 Ошибка при отправке ({period})")
+            except Exception as e:
+                logger.error(f"❌ Ошибка в режиме демона ({period}): {e}", exc_info=True)
+
+    def start(self):
+        """Запускает демон фоновой задачей (для встраивания в чужой event loop)"""
+        if self.daemon_task is None:
+            self.daemon_task = asyncio.create_task(self.run_daemon())
+        return self.daemon_task
+
+    async def stop(self):
+        """Останавливает демон и освобождает ресурсы"""
+        if self.daemon_task is not None:
+            self.daemon_task.cancel()
+            await asyncio.gather(self.daemon_task, return_exceptions=True)
+            self.daemon_task = None
+        await self.close()
+
+    async def close(self):
+        """Дожидается фоновых задач; свои клиент и хранилище закрывает"""
+        await self.weather_cache.join(timeout=10)
+        if self.owns_resources:
+            await self.dispatcher.join(timeout=60)
+            await self.telegram.close()
+            self.storage.close()
 
 async def main(period):
     logger.info(f"🚀 Запуск для периода: {period}")
     notifier = PersonalScheduleNotifier()
-    success = await notifier.send_message_for_period(period)
+    try:
+        success = await notifier.send_message_for_period(period)
+    finally:
+        await notifier.close()
     if success:
         logger.info("🎉 Успешно завершено!")
     else:
         logger.error("💥 Ошибка при отправке")
         sys.exit(1)
 
+async def run_daemon():
+    notifier = PersonalScheduleNotifier()
+    try:
+        await notifier.run_daemon()
+    finally:
+        await notifier.close()
+
 if __name__ == "__main__":
-    if len(sys.argv) != 2 or sys.argv[1] not in ('morning', 'day', 'evening'):
-        print("❌ Использование: python notifier.py <morning|day|evening>")
+    if len(sys.argv) != 2 or sys.argv[1] not in ('morning', 'day', 'evening', 'daemon'):
+        print("❌ Использование: python notifier.py <morning|day|evening|daemon>")
         sys.exit(1)
-    asyncio.run(main(sys.argv[1]))
+    if sys.argv[1] == 'daemon':
+        asyncio.run(run_daemon())
+    else:
+        asyncio.run(main(sys.argv[1]))
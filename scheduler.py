@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Планировщик по таймерам для tracker_bot.py
+- куча (heapq) ближайших запусков: цикл спит ровно до следующей задачи, без опроса раз в минуту
+- время задачи задаётся в часовом поясе её чата (по умолчанию - пояс сервера, ZoneInfo)
+- задачи, пропущенные пока сервис спал (Render free plan), догоняются при старте;
+  выполнен ли запуск, задача решает сама по своим данным (done), а без done -
+  по state_file (который на Render при перезапуске может пропасть)
+- каждая задача запускается отдельным asyncio.Task и не блокирует остальные
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+from datetime import datetime, time as dt_time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+logger = logging.getLogger(__name__)
+
+
+def local_timezone():
+    """
+    Часовой пояс сервера с переходами на летнее время: TZ или /etc/localtime
+    Текущее фиксированное смещение - только если ни того, ни другого нет
+    """
+    name = os.getenv('TZ', '').lstrip(':')
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            logger.warning(f"⚠️ Неизвестный часовой пояс TZ={name}")
+    try:
+        with open('/etc/localtime', 'rb') as f:
+            return ZoneInfo.from_file(f, key='localtime')
+    except (OSError, ValueError):
+        return datetime.now().astimezone().tzinfo
+
+
+class ScheduledJob:
+    """
+    Ежедневная задача в момент at ('ЧЧ:ММ') по часовому поясу tz
+    when(date) -> bool - фильтр дней (воскресенье, 1-е число...)
+    callback(due) - корутина, due - плановое время запуска (aware datetime)
+    done(due) -> bool - выполнен ли запуск due, по данным, которые переживают
+    перезапуск (например, записанные итоги в хранилище); по нему догоняются пропуски
+    """
+
+    MAX_LOOKUP_DAYS = 400
+
+    def __init__(self, name, at, callback, tz=None, when=None, done=None):
+        self.name = name
+        hour, minute = map(int, at.split(':'))
+        self.at = dt_time(hour, minute)
+        self.callback = callback
+        self.tz = tz or local_timezone()
+        self.when = when
+        self.done = done
+
+    def _occurrence(self, day):
+        if self.when is not None and not self.when(day):
+            return None
+        return datetime.combine(day, self.at, tzinfo=self.tz)
+
+    def next_run(self, after):
+        """Первый запуск строго после after"""
+        day = after.astimezone(self.tz).date()
+        for _ in range(self.MAX_LOOKUP_DAYS):
+            run_at = self._occurrence(day)
+            if run_at is not None and run_at > after:
+                return run_at
+            day += timedelta(days=1)
+        return None
+
+    def last_run(self, before):
+        """Последний плановый запуск не позже before"""
+        day = before.astimezone(self.tz).date()
+        for _ in range(self.MAX_LOOKUP_DAYS):
+            run_at = self._occurrence(day)
+            if run_at is not None and run_at <= before:
+                return run_at
+            day -= timedelta(days=1)
+        return None
+
+
+class TimerScheduler:
+    def __init__(self, state_file='scheduler_state.json', catch_up_window=24 * 3600):
+        self.state_file = state_file
+        # Пропущенный запуск старше окна не догоняется
+        self.catch_up_window = catch_up_window
+
+        self.jobs = {}
+        self._heap = []                # [(timestamp, seq, job_name, due)]
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._loop_task = None
+        self._running = set()
+        self.last_runs = self._load_state()  # {job_name: ISO планового времени последнего запуска}
+
+    def _load_state(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Не удалось прочитать {self.state_file}: {e}")
+            return {}
+
+    def _save_state(self):
+        if not self.state_file:
+            return
+        tmp_file = f"{self.state_file}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.last_runs, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            logger.warning(f"⚠️ Не удалось сохранить {self.state_file}: {e}")
+
+    def add(self, job):
+        """Регистрирует задачу (можно и после start())"""
+        self.jobs[job.name] = job
+        if self._loop_task is not None:
+            self._push(job, datetime.now(job.tz))
+            self._wakeup.set()
+
+    def _push(self, job, after):
+        due = job.next_run(after)
+        if due is not None:
+            heapq.heappush(self._heap, (due.timestamp(), next(self._seq), job.name, due))
+
+    def start(self):
+        """Догоняет пропущенное и запускает цикл таймеров"""
+        if self._loop_task is not None:
+            return self._loop_task
+        for job in self.jobs.values():
+            now = datetime.now(job.tz)
+            self._catch_up(job, now)
+            self._push(job, now)
+        self._loop_task = asyncio.create_task(self._loop())
+        logger.info(f"⏰ Планировщик запущен: {', '.join(self.jobs) or 'нет задач'}")
+        return self._loop_task
+
+    def _catch_up(self, job, now):
+        """Запускает последний пропущенный запуск, если сервис проспал его"""
+        due = job.last_run(now)
+        if due is None:
+            return
+        if job.done is not None:
+            # Решают данные задачи: им не страшны первый старт и пропавший state_file
+            if job.done(due):
+                return
+        else:
+            last_run = self.last_runs.get(job.name)
+            if last_run is None:
+                # Первый старт - отмечаем точку отсчёта, историю не догоняем
+                self.last_runs[job.name] = due.isoformat()
+                self._save_state()
+                return
+            if due <= datetime.fromisoformat(last_run):
+                return
+        if (now - due).total_seconds() > self.catch_up_window:
+            logger.warning(f"⏭️ {job.name}: пропущен запуск {due:%d.%m %H:%M}, слишком давно")
+            return
+        logger.info(f"🔁 {job.name}: догоняю пропущенный запуск {due:%d.%m %H:%M}")
+        self._launch(job, due)
+
+    async def _loop(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            timestamp, _, name, due = self._heap[0]
+            delay = timestamp - datetime.now().timestamp()
+            if delay > 0:
+                # Спим до ближайшей задачи (не дольше часа - на случай перевода часов)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay, 3600))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            job = self.jobs[name]
+            now = datetime.now(job.tz)
+            if (now - due).total_seconds() > self.catch_up_window:
+                logger.warning(f"⏭️ {name}: запуск {due:%d.%m %H:%M} пропущен, слишком давно")
+            else:
+                self._launch(job, due)
+            # Следующий запуск - после текущего момента (пропущенные не копятся)
+            self._push(job, max(due, now))
+
+    def _launch(self, job, due):
+        task = asyncio.create_task(self._run(job, due))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, job, due):
+        logger.info(f"⏰ {job.name}: запуск ({due:%d.%m.%Y %H:%M %Z})")
+        try:
+            await job.callback(due)
+        except Exception as e:
+            logger.error(f"❌ {job.name}: ошибка {e}", exc_info=True)
+        finally:
+            previous = self.last_runs.get(job.name)
+            if previous is None or datetime.fromisoformat(previous) < due:
+                self.last_runs[job.name] = due.isoformat()
+                self._save_state()
+
+    def pending(self):
+        """Ближайшие запуски: [(job_name, due)]"""
+        return [(name, due) for _, _, name, due in sorted(self._heap)]
+
+    async def stop(self, timeout=None):
+        """Останавливает цикл и дожидается выполняющихся задач"""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+        if self._running:
+            await asyncio.wait(list(self._running), timeout=timeout)
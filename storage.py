@@ -0,0 +1,1217 @@
+#!/usr/bin/env python3
+"""
+Хранилище статистики и состояний сообщений для tracker_bot.py и notifier.py
+
+JsonStorage   - прежний формат (stats.json + message_states.json + task_manifests.json
+                + task_catalog.json + message_bodies.json + message_index.json)
+JournalStorage - stats.json как снимок + append-only журнал изменений (NDJSON)
+SqliteStorage - SQLite (WAL): запись по дню / по сообщению, выборки по диапазону дат
+
+Бэкенд выбирается переменной STORAGE_BACKEND (json|journal|sqlite)
+Файлы пишутся атомарно (временный файл + rename), fsync - по STORAGE_FSYNC:
+  off    - без fsync
+  normal - fsync временного файла перед заменой (по умолчанию)
+  full   - ещё и fsync каталога после замены и каждой записи журнала
+Для SQLite - PRAGMA synchronous=OFF|NORMAL|FULL
+Перенос stats.json в SQLite: python storage.py import [stats.json] [tracker.db]
+"""
+
+import asyncio
+import base64
+import copy
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows - без блокировки журнала между процессами
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATS_FILE = "stats.json"
+DEFAULT_MESSAGE_STATE_FILE = "message_states.json"
+DEFAULT_MANIFEST_FILE = "task_manifests.json"
+DEFAULT_CATALOG_FILE = "task_catalog.json"
+DEFAULT_BODIES_FILE = "message_bodies.json"
+DEFAULT_MESSAGE_INDEX_FILE = "message_index.json"
+DEFAULT_DB_FILE = "tracker.db"
+DEFAULT_JOURNAL_FILE = "stats.journal.ndjson"
+DEFAULT_JOURNAL_ARCHIVE_FILE = "stats.journal.archive.ndjson"
+
+FSYNC_POLICY = os.getenv('STORAGE_FSYNC', 'normal')
+SQLITE_SYNCHRONOUS = {'off': 'OFF', 'normal': 'NORMAL', 'full': 'FULL'}
+
+
+def write_json(path, data, **dump_kwargs):
+    """Атомарная запись JSON: временный файл + os.replace (fsync по FSYNC_POLICY)"""
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, **dump_kwargs)
+        if FSYNC_POLICY != 'off':
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+    if FSYNC_POLICY == 'full':
+        # Сама замена (запись в каталоге) - тоже на диск
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def is_day_key(key):
+    """Ключ дня вида 2026-02-28 (служебные _info/_format пропускаем)"""
+    return '-' in key and not key.startswith('_')
+
+
+class Storage:
+    """Интерфейс хранилища"""
+
+    # === Статистика по дням ===
+
+    def get_day(self, day_key):
+        """Запись за день или None"""
+        raise NotImplementedError
+
+    def get_days(self, from_key=None, to_key=None):
+        """Записи за диапазон дат [from_key, to_key] по возрастанию"""
+        raise NotImplementedError
+
+    def put_day(self, day_key, data):
+        """Полностью заменяет запись за день"""
+        raise NotImplementedError
+
+    def update_day(self, day_key, fields):
+        """Дописывает поля в запись за день (остальные поля не трогает)"""
+        raise NotImplementedError
+
+    def put_days(self, days):
+        """Заменяет сразу несколько дней {day_key: data} (пакетная запись)"""
+        for day_key, data in days.items():
+            self.put_day(day_key, data)
+
+    def load_stats(self):
+        """Вся статистика {day_key: data}"""
+        return self.get_days()
+
+    def source_version(self):
+        """
+        Версия данных для обнаружения изменений другим процессом (None - не отслеживается)
+        Свои записи этого же объекта хранилища версию не меняют
+        """
+        return None
+
+    async def refresh(self):
+        """Подгружает изменения других процессов (для хранилищ с кэшем в памяти)"""
+        pass
+
+    async def run(self, method, *args):
+        """
+        Вызов метода хранилища из event loop
+        Здесь - напрямую; StatsCache выполняет его в потоке записи, после уже поставленных записей
+        """
+        return getattr(self, method)(*args)
+
+    def append_event(self, event):
+        """Событие для журнала (toggle/penalty); хранилища без журнала его игнорируют"""
+        pass
+
+    # === Состояния сообщений ===
+
+    def load_message_states(self):
+        """Все состояния {message_id: state}"""
+        raise NotImplementedError
+
+    def get_message_state(self, message_id):
+        """Состояние одного сообщения или None"""
+        return self.load_message_states().get(int(message_id))
+
+    def put_message_state(self, message_id, state):
+        raise NotImplementedError
+
+    def delete_message_state(self, message_id):
+        raise NotImplementedError
+
+    def prune_message_states(self, before_day):
+        """
+        Удаляет состояния, не обновлявшиеся с before_day (поле 'updated', у старых
+        состояний без него - день сообщения); возвращает их число
+        """
+        raise NotImplementedError
+
+    # === Индекс message_id → день сообщения (переживает удаление состояния) ===
+
+    def get_message_day(self, message_id):
+        """День сообщения или None"""
+        raise NotImplementedError
+
+    def put_message_day(self, message_id, day):
+        raise NotImplementedError
+
+    # === Манифесты задач (пишет notifier.py, читает tracker_bot.py) ===
+
+    def get_manifest(self, message_id):
+        """Манифест задач сообщения или None"""
+        raise NotImplementedError
+
+    def put_manifest(self, message_id, manifest):
+        raise NotImplementedError
+
+    # === Каталог текстов задач (см. task_catalog.py) ===
+
+    def get_task_texts(self, task_ids):
+        """{id: текст} для известных id из task_ids"""
+        raise NotImplementedError
+
+    def load_task_texts(self):
+        """Весь каталог {id: текст}"""
+        raise NotImplementedError
+
+    def put_task_texts(self, entries):
+        """Добавляет тексты {id: текст}; уже известные id не меняются"""
+        raise NotImplementedError
+
+    # === Сжатые тексты сообщений (см. message_bodies.py) ===
+
+    def get_body(self, ref):
+        """Сжатый текст (bytes) или None"""
+        raise NotImplementedError
+
+    def put_body(self, ref, data, day):
+        """Сохраняет сжатый текст, если ref ещё нет; day - дата записи"""
+        raise NotImplementedError
+
+    def prune_bodies(self, live_refs, before_day):
+        """Удаляет тексты с датой раньше before_day, которых нет в live_refs; возвращает их число"""
+        raise NotImplementedError
+
+    def message_body_refs(self):
+        """Ссылки на тексты сообщений из записей дней ('_message_ref')"""
+        return {data['_message_ref'] for data in self.load_stats().values() if '_message_ref' in data}
+
+    def close(self):
+        pass
+
+
+class JsonStorage(Storage):
+    """Прежнее хранение в JSON-файлах (каждая запись переписывает файл целиком)"""
+
+    # Манифесты старше стольких дней удаляются при записи нового
+    MANIFEST_KEEP_DAYS = 30
+    # Записи индекса message_id → день старше стольких дней удаляются при записи новой
+    MESSAGE_INDEX_KEEP_DAYS = 90
+
+    def __init__(self, stats_file=DEFAULT_STATS_FILE, message_state_file=DEFAULT_MESSAGE_STATE_FILE,
+                 manifest_file=DEFAULT_MANIFEST_FILE, catalog_file=DEFAULT_CATALOG_FILE,
+                 bodies_file=DEFAULT_BODIES_FILE, message_index_file=DEFAULT_MESSAGE_INDEX_FILE):
+        self.stats_file = stats_file
+        self.message_state_file = message_state_file
+        self.manifest_file = manifest_file
+        self.catalog_file = catalog_file
+        self.bodies_file = bodies_file
+        self.message_index_file = message_index_file
+        self._manifests = None  # ((mtime_ns, size), {message_id: manifest})
+        self._catalog = None    # ((mtime_ns, size), {id: текст})
+        self._bodies = None     # ((mtime_ns, size), {ref: {'day', 'data' (base64)}})
+        self._message_index = None  # ((mtime_ns, size), {message_id: день})
+        self._signature = None  # отпечаток stats.json после последней своей записи/проверки
+        self._generation = 0
+
+    def _read_stats(self):
+        if not os.path.exists(self.stats_file):
+            return {}
+        with open(self.stats_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        # Фильтруем только реальные даты
+        return {k: v for k, v in data.items() if is_day_key(k)}
+
+    def _write_stats(self, stats):
+        write_json(self.stats_file, stats, ensure_ascii=False, indent=2)
+        # Своя запись - не внешнее изменение
+        self._signature = self._file_signature()
+
+    def get_day(self, day_key):
+        return self._read_stats().get(day_key)
+
+    def get_days(self, from_key=None, to_key=None):
+        stats = self._read_stats()
+        return {
+            k: stats[k] for k in sorted(stats)
+            if (from_key is None or k >= from_key) and (to_key is None or k <= to_key)
+        }
+
+    def load_stats(self):
+        return self._read_stats()
+
+    def put_day(self, day_key, data):
+        stats = self._read_stats()
+        stats[day_key] = data
+        self._write_stats(stats)
+
+    def put_days(self, days):
+        stats = self._read_stats()
+        stats.update(days)
+        self._write_stats(stats)
+
+    def update_day(self, day_key, fields):
+        stats = self._read_stats()
+        stats.setdefault(day_key, {}).update(fields)
+        self._write_stats(stats)
+
+    def _stats_signature(self):
+        try:
+            st = os.stat(self.stats_file)
+            return (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _file_signature(self):
+        """Отпечаток файлов, из которых читается статистика"""
+        return self._stats_signature()
+
+    def source_version(self):
+        """Счётчик изменений статистики другими процессами (свои записи отпечаток обновляют сразу)"""
+        signature = self._file_signature()
+        if signature != self._signature:
+            self._signature = signature
+            self._generation += 1
+        return self._generation
+
+    def _read_message_states(self):
+        if not os.path.exists(self.message_state_file):
+            return {}
+        with open(self.message_state_file, 'r', encoding='utf-8') as f:
+            # Преобразуем строковые ключи обратно в int
+            return {int(k): v for k, v in json.load(f).items()}
+
+    def _write_message_states(self, states):
+        # Преобразуем int ключи в строки для JSON
+        data = {str(k): v for k, v in states.items()}
+        write_json(self.message_state_file, data, ensure_ascii=False, indent=2)
+
+    def load_message_states(self):
+        return self._read_message_states()
+
+    def put_message_state(self, message_id, state):
+        states = self._read_message_states()
+        states[int(message_id)] = state
+        self._write_message_states(states)
+
+    def delete_message_state(self, message_id):
+        states = self._read_message_states()
+        if states.pop(int(message_id), None) is not None:
+            self._write_message_states(states)
+
+    def prune_message_states(self, before_day):
+        states = self._read_message_states()
+        # Состояния без дня (записанные до индекса) - по индексу, иначе оставляем
+        kept = {
+            k: v for k, v in states.items()
+            if (v.get('updated') or v.get('day') or self.get_message_day(k) or before_day) >= before_day
+        }
+        removed = len(states) - len(kept)
+        if removed:
+            self._write_message_states(kept)
+        return removed
+
+    def _read_message_index(self):
+        """Индекс из файла; перечитывается только если файл изменился"""
+        try:
+            st = os.stat(self.message_index_file)
+        except FileNotFoundError:
+            return {}
+        version = (st.st_mtime_ns, st.st_size)
+        if self._message_index is None or self._message_index[0] != version:
+            with open(self.message_index_file, 'r', encoding='utf-8') as f:
+                self._message_index = (version, {int(k): v for k, v in json.load(f).items()})
+        return self._message_index[1]
+
+    def get_message_day(self, message_id):
+        return self._read_message_index().get(int(message_id))
+
+    def put_message_day(self, message_id, day):
+        index = self._read_message_index()
+        if index.get(int(message_id)) == day:
+            return
+        oldest = (datetime.now() - timedelta(days=self.MESSAGE_INDEX_KEEP_DAYS)).strftime("%Y-%m-%d")
+        index = {k: v for k, v in index.items() if v >= oldest}
+        index[int(message_id)] = day
+        write_json(self.message_index_file, {str(k): v for k, v in index.items()})
+
+    def _read_manifests(self):
+        """Манифесты из файла; перечитываются только если файл изменился"""
+        try:
+            st = os.stat(self.manifest_file)
+        except FileNotFoundError:
+            return {}
+        version = (st.st_mtime_ns, st.st_size)
+        if self._manifests is None or self._manifests[0] != version:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifests = {int(k): v for k, v in json.load(f).items()}
+            self._manifests = (version, manifests)
+        return self._manifests[1]
+
+    def get_manifest(self, message_id):
+        return self._read_manifests().get(int(message_id))
+
+    def put_manifest(self, message_id, manifest):
+        oldest = (datetime.now() - timedelta(days=self.MANIFEST_KEEP_DAYS)).strftime("%Y-%m-%d")
+        manifests = {
+            k: v for k, v in self._read_manifests().items()
+            if v.get('day', '') >= oldest
+        }
+        manifests[int(message_id)] = manifest
+        write_json(self.manifest_file, {str(k): v for k, v in manifests.items()}, ensure_ascii=False, indent=2)
+
+    def _read_catalog(self):
+        """Каталог из файла; перечитывается только если файл изменился"""
+        try:
+            st = os.stat(self.catalog_file)
+        except FileNotFoundError:
+            return {}
+        version = (st.st_mtime_ns, st.st_size)
+        if self._catalog is None or self._catalog[0] != version:
+            with open(self.catalog_file, 'r', encoding='utf-8') as f:
+                self._catalog = (version, json.load(f))
+        return self._catalog[1]
+
+    def get_task_texts(self, task_ids):
+        catalog = self._read_catalog()
+        return {task_id: catalog[task_id] for task_id in task_ids if task_id in catalog}
+
+    def load_task_texts(self):
+        return dict(self._read_catalog())
+
+    def put_task_texts(self, entries):
+        catalog = dict(self._read_catalog())
+        for task_id, text in entries.items():
+            catalog.setdefault(task_id, text)
+        write_json(self.catalog_file, catalog, ensure_ascii=False, indent=1)
+
+    def _read_bodies(self):
+        """Тексты сообщений из файла; перечитываются только если файл изменился"""
+        try:
+            st = os.stat(self.bodies_file)
+        except FileNotFoundError:
+            return {}
+        version = (st.st_mtime_ns, st.st_size)
+        if self._bodies is None or self._bodies[0] != version:
+            with open(self.bodies_file, 'r', encoding='utf-8') as f:
+                self._bodies = (version, json.load(f))
+        return self._bodies[1]
+
+    def _write_bodies(self, bodies):
+        write_json(self.bodies_file, bodies, indent=1)
+
+    def get_body(self, ref):
+        entry = self._read_bodies().get(ref)
+        return base64.b64decode(entry['data']) if entry else None
+
+    def put_body(self, ref, data, day):
+        bodies = self._read_bodies()
+        if ref in bodies:
+            return
+        bodies = dict(bodies)
+        bodies[ref] = {'day': day, 'data': base64.b64encode(data).decode('ascii')}
+        self._write_bodies(bodies)
+
+    def prune_bodies(self, live_refs, before_day):
+        bodies = self._read_bodies()
+        kept = {ref: entry for ref, entry in bodies.items() if ref in live_refs or entry['day'] >= before_day}
+        removed = len(bodies) - len(kept)
+        if removed:
+            self._write_bodies(kept)
+        return removed
+
+
+class JournalStorage(JsonStorage):
+    """
+    stats.json как снимок + append-only журнал изменений (NDJSON)
+    Каждая запись - одна строка {"seq", "ts", "type", ...} в конец журнала, O(1) I/O
+    Состояние (снимок + журнал) держится в памяти: при чтении дочитываются
+    только новые строки журнала (в том числе чужие - notifier.py), снимок
+    перечитывается, только если его заменили
+    После сбоя - то же самое: снимок + проигрывание журнала
+    Каждые compact_every записей журнал сворачивается в снимок,
+    а старые строки уходят в архив (история изменений)
+    Сворачивает только владелец (owner=True - долгоживущий бот); разовые запуски
+    notifier.py только дописывают. Дозапись, чтение и свёртка - под flock
+    на файле <журнал>.lock, поэтому строки других процессов не теряются
+    при обрезке журнала, а seq продолжает общий журнал
+    
+    Типы записей:
+      day      - полная запись дня (put_day)
+      update   - дописанные поля дня (update_day)
+      snapshot - начало журнала после свёртки
+      toggle, penalty, ... - события для истории, на статистику не влияют
+    """
+
+    def __init__(self, stats_file=DEFAULT_STATS_FILE, message_state_file=DEFAULT_MESSAGE_STATE_FILE,
+                 journal_file=DEFAULT_JOURNAL_FILE, archive_file=DEFAULT_JOURNAL_ARCHIVE_FILE,
+                 compact_every=500, owner=True):
+        if compact_every < 2:
+            raise ValueError(f"compact_every должен быть не меньше 2: {compact_every}")
+        super().__init__(stats_file, message_state_file)
+        self.journal_file = journal_file
+        self.archive_file = archive_file
+        self.compact_every = compact_every
+        self.owner = owner
+        
+        self._lock = threading.RLock()
+        self._lock_file = open(f"{self.journal_file}.lock", 'a') if fcntl else None
+        self._lock_depth = 0
+        self._stats = None              # снимок + применённые строки журнала
+        self._snapshot_version = None
+        self._offset = 0                # сколько байт журнала уже применено
+        self._entries = 0               # записей day/update/событий с последней свёртки
+        self._seq = 0
+        
+        self._journal = open(self.journal_file, 'a', encoding='utf-8')
+        with self._file_lock():
+            if os.path.getsize(self.journal_file) > 0:
+                # Недописанная последняя строка не должна склеиться со следующей
+                with open(self.journal_file, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        self._journal.write('\n')
+                        self._journal.flush()
+            self._refresh()
+        self._signature = self._file_signature()
+
+    def _file_signature(self):
+        try:
+            journal_size = os.stat(self.journal_file).st_size
+        except FileNotFoundError:
+            journal_size = 0
+        return (self._stats_signature(), journal_size)
+
+    @contextmanager
+    def _file_lock(self):
+        """Блокировка журнала между процессами (flock) и потоками; повторный вход не блокирует заново"""
+        with self._lock:
+            if self._lock_depth == 0 and self._lock_file is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_file is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _apply(stats, entry):
+        if entry.get('type') == 'day':
+            stats[entry['day']] = entry['data']
+        elif entry.get('type') == 'update':
+            stats.setdefault(entry['day'], {}).update(entry['fields'])
+
+    def _refresh(self):
+        """Подтягивает изменения с диска: новые строки журнала, а после смены снимка - всё заново"""
+        with self._file_lock():
+            snapshot = self._stats_signature()
+            try:
+                journal_size = os.stat(self.journal_file).st_size
+            except FileNotFoundError:
+                journal_size = 0
+            if self._stats is None or snapshot != self._snapshot_version or journal_size < self._offset:
+                self._stats = super()._read_stats()
+                self._snapshot_version = snapshot
+                self._offset = 0
+                self._entries = 0
+            if journal_size <= self._offset:
+                return
+            
+            with open(self.journal_file, 'rb') as f:
+                f.seek(self._offset)
+                chunk = f.read(journal_size - self._offset)
+            # Только целые строки - недописанный хвост дочитается в следующий раз
+            end = chunk.rfind(b'\n') + 1
+            for line in chunk[:end].decode('utf-8', errors='replace').splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Недописанная строка после сбоя
+                    logger.warning("⚠️ Журнал: повреждённая строка пропущена")
+                    continue
+                self._apply(self._stats, entry)
+                self._seq = max(self._seq, entry.get('seq', 0))
+                if entry.get('type') != 'snapshot':
+                    self._entries += 1
+            self._offset += end
+
+    def _read_stats(self):
+        self._refresh()
+        with self._lock:
+            return copy.deepcopy(self._stats)
+
+    def get_day(self, day_key):
+        self._refresh()
+        with self._lock:
+            return copy.deepcopy(self._stats.get(day_key))
+
+    def get_days(self, from_key=None, to_key=None):
+        self._refresh()
+        with self._lock:
+            return {
+                k: copy.deepcopy(self._stats[k]) for k in sorted(self._stats)
+                if (from_key is None or k >= from_key) and (to_key is None or k <= to_key)
+            }
+
+    def _append(self, entries):
+        with self._file_lock():
+            # Сначала строки других процессов - seq продолжает общий журнал
+            self._refresh()
+            lines = []
+            for entry in entries:
+                self._seq += 1
+                lines.append(json.dumps(
+                    {'seq': self._seq, 'ts': datetime.now().isoformat(timespec='seconds'), **entry},
+                    ensure_ascii=False
+                ))
+            self._journal.write('\n'.join(lines) + '\n')
+            self._journal.flush()
+            if FSYNC_POLICY == 'full':
+                os.fsync(self._journal.fileno())
+            
+            # Свои строки применяются так же, как чужие - дочитыванием журнала
+            self._refresh()
+            if self.owner and self._entries >= self.compact_every:
+                self.compact()
+            self._signature = self._file_signature()
+
+    def put_day(self, day_key, data):
+        self._append([{'type': 'day', 'day': day_key, 'data': data}])
+
+    def put_days(self, days):
+        self._append([{'type': 'day', 'day': day_key, 'data': data} for day_key, data in days.items()])
+
+    def update_day(self, day_key, fields):
+        self._append([{'type': 'update', 'day': day_key, 'fields': fields}])
+
+    def append_event(self, event):
+        self._append([event])
+
+    def compact(self):
+        """Сворачивает журнал в снимок stats.json и начинает журнал заново"""
+        with self._file_lock():
+            self._refresh()
+            write_json(self.stats_file, self._stats, ensure_ascii=False, indent=2)
+            
+            self._journal.close()
+            if self.archive_file and os.path.exists(self.journal_file):
+                with open(self.journal_file, 'r', encoding='utf-8') as src, \
+                        open(self.archive_file, 'a', encoding='utf-8') as dst:
+                    dst.write(src.read())
+            
+            # Сбой между снимком и обрезкой не страшен: записи day/update идемпотентны
+            # Обрезка на месте и дозапись (O_APPEND): у других процессов журнал открыт тем же файлом
+            self._journal = open(self.journal_file, 'a', encoding='utf-8')
+            self._journal.truncate(0)
+            logger.info(f"🗜️ Журнал свёрнут в снимок: {self._entries} записей, seq={self._seq}")
+            # Отметка свёртки в новом журнале на счётчик записей не влияет
+            self._seq += 1
+            self._journal.write(json.dumps({
+                'seq': self._seq, 'ts': datetime.now().isoformat(timespec='seconds'),
+                'type': 'snapshot', 'days': len(self._stats)
+            }, ensure_ascii=False) + '\n')
+            self._journal.flush()
+            self._snapshot_version = self._stats_signature()
+            self._offset = self._journal.tell()
+            self._entries = 0
+            self._signature = self._file_signature()
+
+    def source_version(self):
+        # Свои дозаписи и свёртки обновляют отпечаток сразу - версию меняют только чужие
+        with self._lock:
+            return super().source_version()
+
+    def close(self):
+        if self.owner and self._entries > 1:
+            self.compact()
+        self._journal.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+
+
+class SqliteStorage(Storage):
+    """
+    SQLite в режиме WAL
+    days           - одна строка на день (PRIMARY KEY по дате = индекс для диапазонов)
+    message_states - одна строка на сообщение, индекс по дню
+    message_index  - день сообщения по message_id (остаётся после удаления состояния)
+    task_manifests - манифест задач по message_id
+    task_catalog   - тексты задач по id (каталог)
+    message_bodies - сжатые тексты сообщений по хэшу
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS days (
+            day        TEXT PRIMARY KEY,
+            percentage INTEGER,
+            points     INTEGER,
+            data       TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS message_states (
+            message_id INTEGER PRIMARY KEY,
+            day        TEXT NOT NULL,
+            data       TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_message_states_day ON message_states(day);
+        CREATE TABLE IF NOT EXISTS message_index (
+            message_id INTEGER PRIMARY KEY,
+            day        TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS task_manifests (
+            message_id INTEGER PRIMARY KEY,
+            day        TEXT NOT NULL,
+            data       TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS task_catalog (
+            id         TEXT PRIMARY KEY,
+            text       TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS message_bodies (
+            ref        TEXT PRIMARY KEY,
+            day        TEXT NOT NULL,
+            data       BLOB NOT NULL
+        );
+    """
+
+    def __init__(self, db_file=DEFAULT_DB_FILE):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self.conn.executescript(self.SCHEMA)
+
+    @property
+    def conn(self):
+        """Соединение текущего потока: StatsCache пишет из своего потока, читают из event loop"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS.get(FSYNC_POLICY, 'NORMAL')}")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def is_empty(self):
+        row = self.conn.execute("SELECT 1 FROM days LIMIT 1").fetchone()
+        return row is None
+
+    @staticmethod
+    def _day_row(day_key, data):
+        return (day_key, data.get('percentage'), data.get('points'), json.dumps(data, ensure_ascii=False))
+
+    def get_day(self, day_key):
+        row = self.conn.execute("SELECT data FROM days WHERE day = ?", (day_key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_days(self, from_key=None, to_key=None):
+        query = "SELECT day, data FROM days WHERE 1 = 1"
+        params = []
+        if from_key is not None:
+            query += " AND day >= ?"
+            params.append(from_key)
+        if to_key is not None:
+            query += " AND day <= ?"
+            params.append(to_key)
+        rows = self.conn.execute(query + " ORDER BY day", params)
+        return {day: json.loads(data) for day, data in rows}
+
+    def put_day(self, day_key, data):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO days (day, percentage, points, data) VALUES (?, ?, ?, ?)",
+            self._day_row(day_key, data)
+        )
+
+    def put_days(self, days):
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO days (day, percentage, points, data) VALUES (?, ?, ?, ?)",
+                [self._day_row(day_key, data) for day_key, data in days.items()]
+            )
+
+    def update_day(self, day_key, fields):
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            data = self.get_day(day_key) or {}
+            data.update(fields)
+            self.put_day(day_key, data)
+
+    def source_version(self):
+        # data_version меняется, когда базу изменило ДРУГОЕ соединение (notifier.py);
+        # соединения у потоков свои - сравнивать можно только значения из одного потока
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def load_message_states(self):
+        rows = self.conn.execute("SELECT message_id, data FROM message_states")
+        return {message_id: json.loads(data) for message_id, data in rows}
+
+    def get_message_state(self, message_id):
+        row = self.conn.execute("SELECT data FROM message_states WHERE message_id = ?", (int(message_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_message_state(self, message_id, state):
+        now = datetime.now()
+        self.conn.execute(
+            """INSERT INTO message_states (message_id, day, data, updated_at) VALUES (?, ?, ?, ?)
+               ON CONFLICT(message_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at""",
+            (int(message_id), state.get('day') or now.strftime("%Y-%m-%d"),
+             json.dumps(state, ensure_ascii=False), now.isoformat())
+        )
+
+    def delete_message_state(self, message_id):
+        self.conn.execute("DELETE FROM message_states WHERE message_id = ?", (int(message_id),))
+
+    def prune_message_states(self, before_day):
+        return self.conn.execute(
+            "DELETE FROM message_states WHERE COALESCE(json_extract(data, '$.updated'), day) < ?", (before_day,)
+        ).rowcount
+
+    def get_message_day(self, message_id):
+        row = self.conn.execute("SELECT day FROM message_index WHERE message_id = ?", (int(message_id),)).fetchone()
+        return row[0] if row else None
+
+    def put_message_day(self, message_id, day):
+        oldest = (datetime.now() - timedelta(days=JsonStorage.MESSAGE_INDEX_KEEP_DAYS)).strftime("%Y-%m-%d")
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute("INSERT OR REPLACE INTO message_index (message_id, day) VALUES (?, ?)", (int(message_id), day))
+            self.conn.execute("DELETE FROM message_index WHERE day < ?", (oldest,))
+
+    def get_manifest(self, message_id):
+        row = self.conn.execute("SELECT data FROM task_manifests WHERE message_id = ?", (int(message_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_manifest(self, message_id, manifest):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO task_manifests (message_id, day, data) VALUES (?, ?, ?)",
+            (int(message_id), manifest.get('day', ''), json.dumps(manifest, ensure_ascii=False))
+        )
+
+    def get_task_texts(self, task_ids):
+        task_ids = list(task_ids)
+        texts = {}
+        # Порциями - ограничение SQLite на число параметров
+        for start in range(0, len(task_ids), 500):
+            chunk = task_ids[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT id, text FROM task_catalog WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            )
+            texts.update(rows)
+        return texts
+
+    def load_task_texts(self):
+        return dict(self.conn.execute("SELECT id, text FROM task_catalog"))
+
+    def put_task_texts(self, entries):
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany("INSERT OR IGNORE INTO task_catalog (id, text) VALUES (?, ?)", entries.items())
+
+    def get_body(self, ref):
+        row = self.conn.execute("SELECT data FROM message_bodies WHERE ref = ?", (ref,)).fetchone()
+        return bytes(row[0]) if row else None
+
+    def put_body(self, ref, data, day):
+        self.conn.execute("INSERT OR IGNORE INTO message_bodies (ref, day, data) VALUES (?, ?, ?)", (ref, day, data))
+
+    def message_body_refs(self):
+        rows = self.conn.execute(
+            "SELECT json_extract(data, '$._message_ref') FROM days WHERE json_extract(data, '$._message_ref') IS NOT NULL"
+        )
+        return {ref for ref, in rows}
+
+    def prune_bodies(self, live_refs, before_day):
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            stale = [
+                ref for ref, in self.conn.execute("SELECT ref FROM message_bodies WHERE day < ?", (before_day,))
+                if ref not in live_refs
+            ]
+            self.conn.executemany("DELETE FROM message_bodies WHERE ref = ?", [(ref,) for ref in stale])
+        return len(stale)
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+_DELETED = object()
+
+
+class StatsCache(Storage):
+    """
+    Кэш статистики в памяти поверх любого хранилища (write-behind)
+    - вся статистика и каталог задач читаются с диска один раз
+    - изменённые дни помечаются грязными и пишутся пачкой через flush_delay
+      секунд после последнего изменения, а также при close()
+    - изменения другого процесса (notifier.py) подгружает refresh(): проверка
+      source_version() и перечитывание - в потоке записи, event loop не ждёт диска
+    - подписчики (агрегаты) получают day_changed(day_key, data) на каждую
+      запись дня и reloaded(stats) после (пере)чтения
+
+    Все обращения к хранилищу (записи дней, состояний сообщений, манифестов, каталога
+    задач, текстов сообщений и чтения через run()) идут в один поток записи - по порядку:
+    чтение через run() видит все записи, поставленные до него
+    Синхронные get_* - для кода вне event loop (в нём - run()): читают тоже в потоке
+    записи, а пока запись не дошла до хранилища - отдают её из памяти (_pending)
+    """
+
+    def __init__(self, backend, flush_delay=2.0):
+        self.backend = backend
+        self.flush_delay = flush_delay
+        self._days = None
+        self._dirty = set()
+        self._version = None
+        self._flush_handle = None
+        self._listeners = []
+        
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='storage-writer')
+        self._pending = {}          # {(вид, ключ): (seq, значение)} - ещё не записанное
+        self._pending_lock = threading.Lock()
+        self._seq = 0
+        self._day_seq = {}          # {day_key: seq} - дни, отправленные на запись
+        self._task_texts = {}       # каталог задач целиком (он мал и только растёт)
+
+    def subscribe(self, listener):
+        """Подписывает на изменения и сразу отдаёт текущие данные"""
+        self._listeners.append(listener)
+        listener.reloaded(self.load_stats())
+
+    # === Загрузка и изменения извне ===
+
+    def _read_changes(self, version):
+        # В потоке записи: все поставленные до этого записи уже в хранилище,
+        # поэтому свои записи source_version() не меняют
+        current = self.backend.source_version()
+        if version is not None and current == version:
+            return current, None, None
+        return current, self.backend.load_stats(), self.backend.load_task_texts()
+
+    def _reloaded(self, since, version, days, task_texts):
+        if self._days is not None:
+            logger.info("🔄 Статистика изменена извне, перечитываю")
+            # Своё, чего в прочитанном ещё нет, важнее: грязные дни
+            # и отправленные на запись после начала чтения
+            newer = {day_key for day_key, seq in self._day_seq.items() if seq > since}
+            for day_key in self._dirty | newer:
+                days[day_key] = self._days[day_key]
+        self._day_seq = {day_key: seq for day_key, seq in self._day_seq.items() if seq > since}
+        self._days = days
+        self._task_texts.update(task_texts)
+        self._version = version
+        for listener in self._listeners:
+            listener.reloaded(self._days)
+
+    def _ensure_loaded(self):
+        if self._days is not None:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                pass
+            else:
+                # В event loop изменения извне подгружает refresh()
+                return
+        # Первая загрузка (при запуске) или вызов вне event loop - ждём чтения
+        since = self._seq
+        version, days, task_texts = self._writer.submit(self._read_changes, self._version).result()
+        if days is not None:
+            self._reloaded(since, version, days, task_texts)
+
+    async def refresh(self):
+        """Подгружает изменения другого процесса, не блокируя event loop"""
+        self._ensure_loaded()
+        since = self._seq
+        version, days, task_texts = await asyncio.wrap_future(
+            self._writer.submit(self._read_changes, self._version)
+        )
+        if days is not None:
+            self._reloaded(since, version, days, task_texts)
+
+    async def run(self, method, *args):
+        # В потоке записи - после всех поставленных записей; event loop только ждёт результата
+        return await asyncio.wrap_future(self._writer.submit(getattr(self.backend, method), *args))
+
+    # === Очередь записи ===
+
+    def _submit(self, write, *args, pending=()):
+        """
+        Ставит запись в очередь потока записи
+        pending - [(вид, ключ, значение)], которые до конца записи читаются из памяти
+        """
+        with self._pending_lock:
+            self._seq += 1
+            seq = self._seq
+            for kind, key, value in pending:
+                self._pending[(kind, key)] = (seq, value)
+        future = self._writer.submit(write, *args)
+        future.add_done_callback(lambda f: self._written(f, seq, pending))
+        return future
+
+    def _written(self, future, seq, pending):
+        # Вызывается в потоке записи
+        with self._pending_lock:
+            for kind, key, _ in pending:
+                if self._pending.get((kind, key), (None,))[0] == seq:
+                    del self._pending[(kind, key)]
+        if future.exception() is not None:
+            logger.error(f"❌ Ошибка записи в хранилище: {future.exception()}")
+
+    def _pending_value(self, kind, key):
+        """(есть ли незаписанное значение, значение)"""
+        with self._pending_lock:
+            entry = self._pending.get((kind, key))
+        return (True, entry[1]) if entry else (False, None)
+
+    # === Статистика ===
+
+    def get_day(self, day_key):
+        self._ensure_loaded()
+        data = self._days.get(day_key)
+        # Копия - чтобы правки вызывающего кода не меняли кэш в обход put_day
+        return copy.deepcopy(data) if data is not None else None
+
+    def get_days(self, from_key=None, to_key=None):
+        """Записи за диапазон (только для чтения - это объекты кэша)"""
+        self._ensure_loaded()
+        return {
+            k: self._days[k] for k in sorted(self._days)
+            if (from_key is None or k >= from_key) and (to_key is None or k <= to_key)
+        }
+
+    def load_stats(self):
+        """Вся статистика (только для чтения - это объекты кэша)"""
+        self._ensure_loaded()
+        return self._days
+
+    def put_day(self, day_key, data):
+        self._ensure_loaded()
+        self._days[day_key] = copy.deepcopy(data)
+        self._mark_dirty(day_key)
+
+    def update_day(self, day_key, fields):
+        self._ensure_loaded()
+        self._days.setdefault(day_key, {}).update(copy.deepcopy(fields))
+        self._mark_dirty(day_key)
+
+    def _mark_dirty(self, day_key):
+        self._dirty.add(day_key)
+        for listener in self._listeners:
+            listener.day_changed(day_key, self._days[day_key])
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Вне event loop откладывать некуда - пишем сразу
+            self.flush()
+            return
+        
+        if self._flush_handle:
+            self._flush_handle.cancel()
+        self._flush_handle = loop.call_later(self.flush_delay, self.flush)
+
+    def flush(self):
+        """
+        Отправляет грязные дни в поток записи одной пачкой
+        В event loop не ждёт записи; вне его - дожидается и возвращает результат
+        """
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._dirty:
+            return True
+        
+        # Снимок - поток записи не должен видеть последующие правки кэша
+        days = {day_key: copy.deepcopy(self._days[day_key]) for day_key in self._dirty}
+        self._dirty.clear()
+        future = self._submit(self.backend.put_days, days)
+        for day_key in days:
+            self._day_seq[day_key] = self._seq
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Вне event loop - дожидаемся записи
+            if future.exception() is not None:
+                self._dirty.update(days)
+                return False
+            logger.info(f"💾 Статистика записана: {len(days)} дн.")
+            return True
+        future.add_done_callback(lambda f: self._flushed(f, days, loop))
+        return True
+
+    def _flushed(self, future, days, loop):
+        # Вызывается в потоке записи
+        if future.exception() is None:
+            logger.info(f"💾 Статистика записана: {len(days)} дн.")
+            return
+        try:
+            loop.call_soon_threadsafe(self._retry_flush, days)
+        except RuntimeError:
+            logger.error(f"❌ Статистика не записана ({len(days)} дн.): event loop уже закрыт")
+
+    def _retry_flush(self, days):
+        # Не записанное снова грязное и снова уходит на запись через flush_delay
+        self._dirty.update(days)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_delay, self.flush)
+
+    def source_version(self):
+        return self._version
+
+    def append_event(self, event):
+        self._submit(self.backend.append_event, copy.deepcopy(event))
+
+    # === Состояния сообщений ===
+
+    def load_message_states(self):
+        return self._writer.submit(self.backend.load_message_states).result()
+
+    def get_message_state(self, message_id):
+        found, state = self._pending_value('message_state', int(message_id))
+        if found:
+            return None if state is _DELETED else copy.deepcopy(state)
+        return self._writer.submit(self.backend.get_message_state, message_id).result()
+
+    def put_message_state(self, message_id, state):
+        state = copy.deepcopy(state)
+        self._submit(self.backend.put_message_state, message_id, state,
+                     pending=[('message_state', int(message_id), state)])
+
+    def delete_message_state(self, message_id):
+        self._submit(self.backend.delete_message_state, message_id,
+                     pending=[('message_state', int(message_id), _DELETED)])
+
+    def prune_message_states(self, before_day):
+        return self._writer.submit(self.backend.prune_message_states, before_day).result()
+
+    def get_message_day(self, message_id):
+        found, day = self._pending_value('message_day', int(message_id))
+        return day if found else self._writer.submit(self.backend.get_message_day, message_id).result()
+
+    def put_message_day(self, message_id, day):
+        self._submit(self.backend.put_message_day, message_id, day,
+                     pending=[('message_day', int(message_id), day)])
+
+    # === Манифесты, каталог задач, тексты сообщений ===
+
+    def get_manifest(self, message_id):
+        found, manifest = self._pending_value('manifest', int(message_id))
+        if found:
+            return copy.deepcopy(manifest)
+        return self._writer.submit(self.backend.get_manifest, message_id).result()
+
+    def put_manifest(self, message_id, manifest):
+        manifest = copy.deepcopy(manifest)
+        self._submit(self.backend.put_manifest, message_id, manifest,
+                     pending=[('manifest', int(message_id), manifest)])
+
+    def get_task_texts(self, task_ids):
+        self._ensure_loaded()
+        return {task_id: self._task_texts[task_id] for task_id in task_ids if task_id in self._task_texts}
+
+    def load_task_texts(self):
+        self._ensure_loaded()
+        return dict(self._task_texts)
+
+    def put_task_texts(self, entries):
+        self._ensure_loaded()
+        entries = dict(entries)
+        self._task_texts.update(entries)
+        self._submit(self.backend.put_task_texts, entries)
+
+    def get_body(self, ref):
+        found, data = self._pending_value('body', ref)
+        return data if found else self._writer.submit(self.backend.get_body, ref).result()
+
+    def put_body(self, ref, data, day):
+        self._submit(self.backend.put_body, ref, data, day, pending=[('body', ref, data)])
+
+    def prune_bodies(self, live_refs, before_day):
+        return self._writer.submit(self.backend.prune_bodies, set(live_refs), before_day).result()
+
+    def close(self):
+        self.flush()
+        self._writer.shutdown(wait=True)
+        self.backend.close()
+
+
+def import_json(storage, stats_file=DEFAULT_STATS_FILE, message_state_file=DEFAULT_MESSAGE_STATE_FILE):
+    """Разовый перенос stats.json / message_states.json (и каталога задач) в другое хранилище"""
+    source = JsonStorage(stats_file, message_state_file)
+    # Каталог и тексты сообщений первыми - записи дней и состояния ссылаются на них
+    catalog = source._read_catalog()
+    if catalog:
+        storage.put_task_texts(catalog)
+    for ref, entry in source._read_bodies().items():
+        storage.put_body(ref, base64.b64decode(entry['data']), entry['day'])
+
+    stats = source.load_stats()
+    for day_key, data in stats.items():
+        storage.put_day(day_key, data)
+
+    states = source.load_message_states()
+    for message_id, state in states.items():
+        storage.put_message_state(message_id, state)
+
+    logger.info(f"📦 Импортировано из {stats_file}: дней={len(stats)}, сообщений={len(states)}")
+    return len(stats)
+
+
+def open_storage(backend=None, cache=False):
+    """
+    Создаёт хранилище по STORAGE_BACKEND (по умолчанию json)
+    cache=True - поверх него кэш в памяти с отложенной записью (для долгоживущего бота)
+    """
+    backend = backend or os.getenv('STORAGE_BACKEND', 'json')
+
+    if backend == 'sqlite':
+        storage = SqliteStorage(os.getenv('STORAGE_DB', DEFAULT_DB_FILE))
+        # Первый запуск на пустой базе - подтягиваем историю из stats.json
+        if storage.is_empty() and os.path.exists(DEFAULT_STATS_FILE):
+            import_json(storage)
+        logger.info(f"🗄️ Хранилище: SQLite ({storage.db_file})")
+    elif backend == 'journal':
+        # Сворачивает журнал только долгоживущий бот (cache=True), notifier.py - дописывает
+        storage = JournalStorage(compact_every=int(os.getenv('JOURNAL_COMPACT_EVERY', 500)), owner=cache)
+        logger.info(f"🗄️ Хранилище: stats.json + журнал ({storage.journal_file})")
+    else:
+        storage = JsonStorage()
+
+    if cache:
+        storage = StatsCache(storage, flush_delay=float(os.getenv('STATS_FLUSH_DELAY', 2)))
+    return storage
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if len(sys.argv) < 2 or sys.argv[1] != 'import':
+        print("❌ Использование: python storage.py import [stats.json] [tracker.db]")
+        sys.exit(1)
+    stats_file = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_STATS_FILE
+    db_file = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_DB_FILE
+    storage = SqliteStorage(db_file)
+    import_json(storage, stats_file)
+    storage.close()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Каталог текстов задач: каждый уникальный текст хранится в хранилище один раз
+под стабильным id (хэш текста), а записи дней и состояния сообщений
+ссылаются на id вместо полного HTML-текста задач
+
+Запись дня:          '_task_refs': {'day': ['3f2a9c1e5b7d', ...], 'cant_do': [...], 'evening': [...]}
+Состояние сообщения: 'task_refs':  {'morning': [], 'day': [...], ...}
+Манифест задач:      'task_refs':  {'day': [...], 'cant_do': [...], 'evening': [...]}
+
+Старые записи с текстами ('_tasks' / 'tasks') читаются как раньше
+"""
+
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def text_id(text):
+    """id текста задачи - зависит только от текста"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+
+
+def intern_tasks(storage, tasks):
+    """{секция: [текст]} → {секция: [id]}; новые тексты добавляются в каталог"""
+    refs = {}
+    entries = {}
+    for section, texts in tasks.items():
+        refs[section] = []
+        for text in texts:
+            ref = text_id(text)
+            entries[ref] = text
+            refs[section].append(ref)
+    if entries:
+        known = storage.get_task_texts(entries)
+        new_entries = {ref: text for ref, text in entries.items() if ref not in known}
+        if new_entries:
+            storage.put_task_texts(new_entries)
+    return refs
+
+
+def resolve_tasks(storage, refs):
+    """{секция: [id]} → {секция: [текст]}; None, если какого-то id нет в каталоге"""
+    texts = storage.get_task_texts({ref for section_refs in refs.values() for ref in section_refs})
+    tasks = {}
+    for section, section_refs in refs.items():
+        missing = [ref for ref in section_refs if ref not in texts]
+        if missing:
+            logger.warning(f"⚠️ Каталог задач: нет текстов для {missing}")
+            return None
+        tasks[section] = [texts[ref] for ref in section_refs]
+    return tasks
+
+
+def day_tasks(storage, day_data):
+    """Задачи дня из записи статистики (ссылки на каталог или старые тексты); None если их нет"""
+    if '_task_refs' in day_data:
+        return resolve_tasks(storage, day_data['_task_refs'])
+    return day_data.get('_tasks')
+
+
+def pack_message_state(storage, state):
+    """Состояние сообщения для записи: тексты задач заменяются ссылками"""
+    packed = {key: value for key, value in state.items() if key != 'tasks'}
+    packed['task_refs'] = intern_tasks(storage, state['tasks'])
+    return packed
+
+
+def unpack_message_state(storage, state):
+    """Состояние после чтения: ссылки → тексты; None, если тексты не найдены"""
+    if 'task_refs' not in state:
+        return state
+    tasks = resolve_tasks(storage, state['task_refs'])
+    if tasks is None:
+        return None
+    unpacked = {key: value for key, value in state.items() if key != 'task_refs'}
+    unpacked['tasks'] = tasks
+    return unpacked
+
+
+def pack_manifest(storage, manifest):
+    """Манифест для записи: задачи ({id, текст}) заменяются ссылками на каталог"""
+    packed = {key: value for key, value in manifest.items() if key != 'tasks'}
+    packed['task_refs'] = intern_tasks(storage, {
+        section: [entry['text'] for entry in entries] for section, entries in manifest['tasks'].items()
+    })
+    return packed
+
+
+def unpack_manifest(storage, manifest):
+    """Манифест после чтения: ссылки → задачи {id, текст}; None, если тексты не найдены"""
+    if 'task_refs' not in manifest:
+        return manifest
+    tasks = resolve_tasks(storage, manifest['task_refs'])
+    if tasks is None:
+        return None
+    unpacked = {key: value for key, value in manifest.items() if key != 'task_refs'}
+    unpacked['tasks'] = {
+        section: [{'id': ref, 'text': text} for ref, text in zip(manifest['task_refs'][section], texts)]
+        for section, texts in tasks.items()
+    }
+    return unpacked
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Манифест задач сообщения: notifier.py сохраняет его вместе с message_id,
+tracker_bot.py берёт задачи по message_id вместо разбора HTML-текста
+
+{
+    "version": 1,
+    "day": "2026-02-28",
+    "period": "morning",
+    "tasks": {
+        "day": [{"id": "3f2a9c1e5b7d", "text": "Прими 💊 витамины ..."}, ...],
+        "cant_do": [...],
+        "evening": [...]
+    }
+}
+
+id задачи - id её текста в каталоге задач (task_catalog.text_id): одна и та же
+задача в разных сообщениях и днях имеет один id
+В хранилище манифест пишется со ссылками на каталог (task_catalog.pack_manifest),
+с текстами он только передаётся (POST /tasks)
+"""
+
+from datetime import date
+
+from task_catalog import text_id
+
+MANIFEST_VERSION = 1
+SECTIONS = ('day', 'cant_do', 'evening')
+
+
+def build_manifest(tasks, day_key, period):
+    """tasks - {секция: [текст задачи]} → манифест с id каталога"""
+    manifest_tasks = {
+        section: [{'id': text_id(text), 'text': text} for text in tasks.get(section, [])]
+        for section in SECTIONS
+    }
+    return {'version': MANIFEST_VERSION, 'day': day_key, 'period': period, 'tasks': manifest_tasks}
+
+
+def manifest_tasks(manifest):
+    """Задачи в формате parse_tasks: {'morning': [], 'day': [текст], 'cant_do': [...], 'evening': [...]}"""
+    tasks = {'morning': []}
+    for section in SECTIONS:
+        tasks[section] = [entry['text'] for entry in manifest['tasks'].get(section, [])]
+    return tasks
+
+
+def validate_manifest(manifest):
+    """Проверка манифеста, пришедшего извне (POST /tasks); ValueError при ошибке"""
+    if not isinstance(manifest, dict):
+        raise ValueError("манифест должен быть объектом")
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"неподдерживаемая версия манифеста: {manifest.get('version')}")
+    try:
+        date.fromisoformat(manifest.get('day'))
+    except (TypeError, ValueError):
+        raise ValueError(f"некорректная дата: {manifest.get('day')}")
+    tasks = manifest.get('tasks')
+    if not isinstance(tasks, dict):
+        raise ValueError("нет задач")
+    for section, entries in tasks.items():
+        if section not in SECTIONS or not isinstance(entries, list):
+            raise ValueError(f"некорректная секция: {section}")
+        for entry in entries:
+            if not (isinstance(entry, dict) and isinstance(entry.get('id'), str) and isinstance(entry.get('text'), str)):
+                raise ValueError(f"некорректная задача в секции {section}")
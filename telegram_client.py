@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Общий клиент Telegram Bot API для notifier.py и tracker_bot.py
+Одна долгоживущая aiohttp-сессия с keep-alive и DNS-кэшем вместо
+новой сессии (TCP+TLS+DNS) на каждый запрос
+"""
+
+import asyncio
+import aiohttp
+import hashlib
+import json
+import logging
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramClient:
+    API_URL = "https://api.telegram.org/bot{token}/{method}"
+
+    def __init__(self, token, limit=20, limit_per_host=10, ttl_dns_cache=300,
+                 keepalive_timeout=60, timeout=10):
+        self.token = token
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self._session = None
+        self._lock = asyncio.Lock()
+
+    async def get_session(self):
+        """Возвращает общую сессию, создаёт её при первом обращении"""
+        if self._session is None or self._session.closed:
+            async with self._lock:
+                if self._session is None or self._session.closed:
+                    connector = aiohttp.TCPConnector(
+                        limit=self.limit,
+                        limit_per_host=self.limit_per_host,
+                        ttl_dns_cache=self.ttl_dns_cache,
+                        keepalive_timeout=self.keepalive_timeout
+                    )
+                    self._session = aiohttp.ClientSession(
+                        connector=connector,
+                        timeout=aiohttp.ClientTimeout(total=self.timeout)
+                    )
+                    logger.info(f"🔌 HTTP-сессия создана (limit={self.limit}, per_host={self.limit_per_host})")
+        return self._session
+
+    def method_url(self, method):
+        """URL метода Bot API"""
+        return self.API_URL.format(token=self.token, method=method)
+
+    async def call(self, method, payload=None, timeout=None, http_method='post'):
+        """
+        Вызывает метод Bot API
+        Возвращает (status, data), где data - распарсенный JSON ответа (или {})
+        Сетевые ошибки пробрасываются вызывающему коду
+        """
+        session = await self.get_session()
+        url = self.method_url(method)
+        # Без своего timeout - таймаут сессии (timeout=None в aiohttp значит "без ограничения")
+        kwargs = {'timeout': aiohttp.ClientTimeout(total=timeout)} if timeout else {}
+
+        if http_method == 'get':
+            request = session.get(url, params=payload, **kwargs)
+        else:
+            request = session.post(url, json=payload, **kwargs)
+
+        async with request as response:
+            try:
+                data = await response.json(content_type=None)
+            except (aiohttp.ContentTypeError, ValueError):
+                data = {'description': await response.text()}
+            return response.status, data or {}
+
+    async def close(self):
+        """Закрывает сессию (вызывать при завершении процесса)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("🔌 HTTP-сессия закрыта")
+        self._session = None
+
+    async def __aenter__(self):
+        await self.get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class TokenBucket:
+    """Простой token bucket: rate токенов в секунду, не больше capacity"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = None
+
+    def _refill(self, now):
+        if self.updated is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Ждёт свободный токен и забирает его"""
+        loop = asyncio.get_running_loop()
+        while True:
+            self._refill(loop.time())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class MessageDispatcher:
+    """
+    Очередь исходящих запросов к Bot API с учётом лимитов Telegram
+    - отдельная очередь и bucket на каждый чат (порядок сообщений сохраняется)
+    - общий bucket на весь бот (~30 сообщений/сек)
+    - 429 → ждём retry_after и повторяем, 5xx/сеть → экспоненциальный backoff
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, client, global_rate=30, per_chat_rate=1, per_chat_burst=1,
+                 max_retries=5, base_delay=1, max_delay=60):
+        self.client = client
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        
+        # {chat_id: deque[(method, payload, future)]}
+        self._queues = {}
+        self._buckets = {}
+        self._workers = {}
+
+    def queue_depth(self, chat_id=None):
+        """Количество запросов в очереди (по чату или всего)"""
+        if chat_id is not None:
+            return len(self._queues.get(str(chat_id), ()))
+        return sum(len(queue) for queue in self._queues.values())
+
+    def stats(self):
+        """Глубина очередей по чатам для логов и health check"""
+        return {
+            'total': self.queue_depth(),
+            'chats': {chat_id: len(queue) for chat_id, queue in self._queues.items() if queue}
+        }
+
+    async def send(self, method, payload):
+        """Ставит запрос в очередь чата и ждёт результат (status, data)"""
+        chat_id = str(payload.get('chat_id', ''))
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        queue = self._queues.setdefault(chat_id, deque())
+        queue.append((method, payload, future))
+        
+        depth = self.queue_depth()
+        if depth > 1:
+            logger.info(f"📬 В очереди отправки: {depth} (чат {chat_id}: {len(queue)})")
+        
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.create_task(self._worker(chat_id))
+        
+        return await future
+
+    async def _worker(self, chat_id):
+        """Обрабатывает очередь одного чата строго по порядку"""
+        queue = self._queues[chat_id]
+        bucket = self._buckets.setdefault(chat_id, TokenBucket(self.per_chat_rate, self.per_chat_burst))
+        try:
+            while queue:
+                method, payload, future = queue[0]
+                try:
+                    result = await self._deliver(bucket, method, payload)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+                queue.popleft()
+        finally:
+            del self._workers[chat_id]
+            if not queue:
+                self._queues.pop(chat_id, None)
+
+    async def _deliver(self, bucket, method, payload):
+        """Отправляет один запрос с повторами"""
+        attempt = 0
+        while True:
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            
+            try:
+                status, data = await self.client.call(method, payload)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+                logger.warning(f"⚠️ {method}: сетевая ошибка {e!r}, повтор через {delay}с")
+            else:
+                if status not in self.RETRY_STATUSES or attempt >= self.max_retries:
+                    return status, data
+                
+                retry_after = data.get('parameters', {}).get('retry_after')
+                if status == 429 and retry_after:
+                    delay = retry_after
+                else:
+                    delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+                logger.warning(f"⏳ {method}: {status}, повтор через {delay}с (попытка {attempt + 1}/{self.max_retries})")
+            
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def join(self, timeout=None):
+        """Ждёт пока все очереди опустеют (вызывать перед завершением)"""
+        workers = list(self._workers.values())
+        if not workers:
+            return
+        logger.info(f"📬 Дожидаюсь отправки очереди: {self.queue_depth()}")
+        done, pending = await asyncio.wait(workers, timeout=timeout)
+        if pending:
+            logger.warning(f"⚠️ Не отправлено при завершении: {self.queue_depth()}")
+
+
+class EditCoalescer:
+    """
+    Склеивает частые editMessageText одного сообщения
+    schedule() — отложенная отправка: уходит только последний рендер после
+    паузы quiet_delay (но не позже max_delay от первого изменения)
+    edit_now() — немедленная отправка, отменяет отложенную
+    Одинаковый текст+клавиатура повторно не отправляются
+    (хэши помнятся для max_tracked последних сообщений, блокировки - только пока есть правки)
+    """
+
+    def __init__(self, edit_func, quiet_delay=0.7, max_delay=2.0, max_tracked=500):
+        # edit_func(message_id, text, reply_markup) -> bool
+        self.edit_func = edit_func
+        self.quiet_delay = quiet_delay
+        self.max_delay = max_delay
+        self.max_tracked = max_tracked
+        
+        self._pending = {}      # {message_id: (text, reply_markup)}
+        self._first_change = {} # {message_id: loop.time() первого отложенного изменения}
+        self._timers = {}       # {message_id: task}
+        self._locks = {}        # {message_id: [asyncio.Lock, число ожидающих/держащих]}
+        self._last_sent = OrderedDict()  # {message_id: hash последнего рендера} - LRU
+
+    @staticmethod
+    def render_hash(text, reply_markup):
+        """Хэш текста и клавиатуры для пропуска одинаковых правок"""
+        markup = json.dumps(reply_markup, sort_keys=True, ensure_ascii=False) if reply_markup else ''
+        return hashlib.md5(f"{text}\x00{markup}".encode('utf-8')).hexdigest()
+
+    def schedule(self, message_id, text, reply_markup=None):
+        """Запоминает последний рендер и (пере)запускает таймер тишины"""
+        loop = asyncio.get_running_loop()
+        self._pending[message_id] = (text, reply_markup)
+        first = self._first_change.setdefault(message_id, loop.time())
+        
+        delay = min(self.quiet_delay, max(0, first + self.max_delay - loop.time()))
+        
+        timer = self._timers.pop(message_id, None)
+        if timer:
+            timer.cancel()
+        self._timers[message_id] = asyncio.create_task(self._delayed_flush(message_id, delay))
+
+    async def _delayed_flush(self, message_id, delay):
+        await asyncio.sleep(delay)
+        self._timers.pop(message_id, None)
+        await self._flush_pending(message_id)
+
+    async def _flush_pending(self, message_id):
+        pending = self._pending.pop(message_id, None)
+        self._first_change.pop(message_id, None)
+        if pending:
+            text, reply_markup = pending
+            await self._send(message_id, text, reply_markup)
+
+    async def _send(self, message_id, text, reply_markup):
+        entry = self._locks.setdefault(message_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                render = self.render_hash(text, reply_markup)
+                if self._last_sent.get(message_id) == render:
+                    logger.info(f"⏭️ Сообщение {message_id} не изменилось, правка пропущена")
+                    return True
+                
+                success = await self.edit_func(message_id, text, reply_markup)
+                if success:
+                    self._last_sent[message_id] = render
+                    self._last_sent.move_to_end(message_id)
+                    while len(self._last_sent) > self.max_tracked:
+                        self._last_sent.popitem(last=False)
+                return success
+        finally:
+            # Блокировка нужна, только пока по сообщению идут правки
+            entry[1] -= 1
+            if not entry[1] and self._locks.get(message_id) is entry:
+                del self._locks[message_id]
+
+    async def edit_now(self, message_id, text, reply_markup=None):
+        """Отправляет правку сразу, отменяя отложенную"""
+        timer = self._timers.pop(message_id, None)
+        if timer:
+            timer.cancel()
+        self._pending.pop(message_id, None)
+        self._first_change.pop(message_id, None)
+        return await self._send(message_id, text, reply_markup)
+
+    async def flush(self):
+        """Отправляет все отложенные правки (при завершении)"""
+        for message_id in list(self._pending):
+            timer = self._timers.pop(message_id, None)
+            if timer:
+                timer.cancel()
+            await self._flush_pending(message_id)
+
+    def forget(self, message_id):
+        """Забывает сообщение (после отмены/удаления состояния)"""
+        self._last_sent.pop(message_id, None)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Агрегаты статистики (aggregates.py) против прямого пересчёта по дням"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from aggregates import PrefixSumIndex, StatsAggregates
+
+BASE = date(2026, 1, 1)
+
+
+def brute_range(days, from_day, to_day):
+    values = [days[day] for day in days if from_day <= day <= to_day]
+    total = sum(percentage for percentage, _ in values)
+    return {
+        'avg': int(total / len(values)) if values else 0,
+        'days': len(values),
+        'sum': total,
+        'points': sum(points for _, points in values),
+        'above': {threshold: sum(1 for percentage, _ in values if percentage >= threshold)
+                  for threshold in PrefixSumIndex.THRESHOLDS}
+    }
+
+
+def brute_streak(days, threshold, as_of):
+    streak = 0
+    while as_of in days and days[as_of][0] >= threshold:
+        streak += 1
+        as_of -= timedelta(days=1)
+    return streak
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_range_and_streaks_match_brute_force(seed):
+    rng = random.Random(seed)
+    days = {}
+    aggregates = StatsAggregates()
+    aggregates.recompute({})
+
+    # Новые дни, правки старых и дозаливка пропусков в случайном порядке
+    for _ in range(300):
+        day = BASE + timedelta(days=rng.randrange(90))
+        days[day] = (rng.randrange(101), rng.randrange(50))
+        aggregates.day_changed(day.isoformat(), {'percentage': days[day][0], 'points': days[day][1]})
+
+        from_day = BASE + timedelta(days=rng.randrange(-5, 95))
+        to_day = from_day + timedelta(days=rng.randrange(-3, 40))
+        assert aggregates.range(from_day, to_day) == brute_range(days, from_day, to_day)
+
+        as_of = BASE + timedelta(days=rng.randrange(90))
+        for threshold in StatsAggregates.THRESHOLDS:
+            assert aggregates.streak(threshold, as_of) == brute_streak(days, threshold, as_of)
+
+
+def test_recompute_equals_incremental():
+    rng = random.Random(42)
+    stats = {}
+    incremental = StatsAggregates()
+    incremental.recompute({})
+    for _ in range(200):
+        day_key = (BASE + timedelta(days=rng.randrange(60))).isoformat()
+        stats[day_key] = {'percentage': rng.randrange(101), 'points': rng.randrange(10)}
+        incremental.day_changed(day_key, stats[day_key])
+
+    rebuilt = StatsAggregates()
+    rebuilt.recompute(stats)
+    assert rebuilt.index.days == incremental.index.days
+    assert rebuilt.index.prefix == incremental.index.prefix
+    assert rebuilt.runs == incremental.runs
+
+
+def test_days_without_progress_are_ignored():
+    aggregates = StatsAggregates()
+    aggregates.recompute({
+        '2026-01-01': {'percentage': 80},
+        '2026-01-02': {'_task_refs': {'day': ['3f2a9c1e5b7d']}},
+    })
+    aggregates.day_changed('2026-01-03', {'_task_refs': {'day': []}})
+
+    assert aggregates.percentage('2026-01-02') is None
+    assert aggregates.range('2026-01-01', '2026-01-03')['days'] == 1
+    assert aggregates.streak(70, '2026-01-01') == 1
+
+    aggregates.day_changed('2026-01-02', {'percentage': 90})
+    assert aggregates.range('2026-01-01', '2026-01-03') == {
+        'avg': 85, 'days': 2, 'sum': 170, 'points': 0, 'above': {70: 2, 80: 2, 90: 1}
+    }
+    assert aggregates.streak(70, '2026-01-02') == 2
+
+
+def test_empty_range():
+    aggregates = StatsAggregates()
+    aggregates.recompute({'2026-01-05': {'percentage': 100}})
+    assert aggregates.range('2026-01-06', '2026-01-10')['days'] == 0
+    assert aggregates.range('2026-01-10', '2026-01-01')['avg'] == 0
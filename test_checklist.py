@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Чек-лист tracker_bot.py: открытие, отметки и сохранение прогресса по callback'ам"""
+
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from task_catalog import intern_tasks
+from task_manifest import build_manifest
+
+DAY = '2026-10-17'
+TASKS = {
+    'day': ['🏃 Зарядка', '📚 Чтение'],
+    'cant_do': ['🍬 Сладкое'],
+    'evening': ['🧘 Растяжка'],
+}
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('TELEGRAM_TOKEN', 'test')
+    monkeypatch.setenv('TELEGRAM_CHAT_ID', '1')
+    monkeypatch.setenv('STORAGE_BACKEND', 'json')
+    import tracker_bot
+    bot = tracker_bot.TaskTrackerBot()
+    bot.calls = []
+
+    async def call(method, payload=None, **kwargs):
+        bot.calls.append((method, payload))
+        return 200, {'ok': True, 'result': {}}
+    bot.telegram.call = call
+    yield bot
+    bot.storage.close()
+
+
+def run_callbacks(bot, message_id, *callbacks):
+    async def main():
+        for callback_data in callbacks:
+            await bot.process_callback(callback_data, 'q', message_id, 'Доброе утро!', answer=False)
+        await bot.edit_coalescer.flush()
+        await bot.dispatcher.join()
+    asyncio.run(main())
+
+
+def test_toggle_and_save(bot):
+    bot.storage.put_manifest(42, build_manifest(TASKS, DAY, 'morning'))
+    bot.storage.put_message_day(42, DAY)
+    run_callbacks(bot, 42, 'update_progress', 'toggle_day_1', 'toggle_evening_0', 'toggle_day_0',
+                  'toggle_day_0', 'save_progress')
+
+    day = bot.storage.get_day(DAY)
+    assert (day['day']['mask'], day['evening']['mask'], day['cant_do']['mask']) == (0b10, 0b1, 0)
+    assert (day['points'], day['percentage']) == (2, 66)
+
+
+@pytest.mark.parametrize('callback_data', [
+    'toggle_day_-1', 'toggle_day_2', 'toggle_day_20000', 'toggle_cant_do_1',
+    'toggle_night_0', 'toggle_morning_0', 'toggle_day_x', 'toggle_day',
+])
+def test_toggle_rejects_unknown_task(bot, callback_data):
+    bot.storage.put_manifest(42, build_manifest(TASKS, DAY, 'morning'))
+    bot.storage.put_message_day(42, DAY)
+    run_callbacks(bot, 42, 'update_progress', 'toggle_day_0', callback_data, 'save_progress')
+
+    # Неверная отметка пропущена, остальное записано как обычно
+    day = bot.storage.get_day(DAY)
+    assert [day[section]['mask'] for section in ('morning', 'day', 'cant_do', 'evening')] == [0, 1, 0, 0]
+    bot.storage.flush()
+    assert bot.storage.backend.get_day(DAY) == day
+
+
+@pytest.mark.parametrize('with_manifest', [True, False])
+def test_checklist_for_message_older_than_ttl(bot, with_manifest):
+    # Состояние удалено по сроку (MESSAGE_STATE_TTL_DAYS=7), сообщение 9 дней назад
+    day = (datetime.now() - timedelta(days=9)).strftime("%Y-%m-%d")
+    if with_manifest:
+        bot.storage.put_manifest(42, build_manifest(TASKS, day, 'morning'))
+    else:
+        bot.storage.update_day(day, {'_task_refs': intern_tasks(bot.storage, TASKS)})
+    bot.storage.put_message_day(42, day)
+    run_callbacks(bot, 42, 'update_progress', 'toggle_day_0', 'toggle_evening_0', 'save_progress')
+
+    assert (bot.storage.get_day(day)['points'], bot.storage.get_day(day)['percentage']) == (2, 66)
+    assert bot.message_state.get(42)['completed']['day'] == 1
+
+
+def test_no_storage_reads_on_event_loop(bot, monkeypatch):
+    bot.storage.put_manifest(42, build_manifest(TASKS, DAY, 'morning'))
+    bot.storage.put_message_day(42, DAY)
+    bot.storage.flush()
+
+    # Чтения бэкенда - только в потоке записи StatsCache (event loop - в главном потоке)
+    loop_reads = []
+    for name in ('load_stats', 'get_day', 'get_days', 'load_message_states', 'get_message_state',
+                 'get_message_day', 'get_manifest', 'get_task_texts', 'load_task_texts', 'get_body'):
+        def read(*args, _read=getattr(bot.storage.backend, name), _name=name):
+            if threading.current_thread() is threading.main_thread():
+                loop_reads.append(_name)
+            return _read(*args)
+        monkeypatch.setattr(bot.storage.backend, name, read)
+
+    # Первое открытие чек-листа, отметка, сохранение и callback по неизвестному сообщению
+    run_callbacks(bot, 42, 'update_progress', 'toggle_day_0', 'save_progress', 'cancel_update')
+    run_callbacks(bot, 43, 'toggle_day_0', 'save_progress', 'update_progress')
+    assert loop_reads == []
+    assert bot.storage.get_day(DAY)['day']['mask'] == 1
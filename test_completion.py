@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Битовые маски отметок (completion.py) и чтение старых записей со списками индексов"""
+
+import random
+
+import pytest
+
+from completion import SECTIONS, count, empty, indices, is_done, normalize, section_count, section_mask, to_mask, toggle
+
+
+@pytest.mark.parametrize('legacy,mask', [
+    (None, 0),
+    ([], 0),
+    ([0], 1),
+    ([0, 2], 5),
+    (['1', '3'], 10),
+    ([2, 0, 2], 5),
+    ([40], 1 << 40),
+    (6, 6),
+])
+def test_to_mask_from_legacy_list(legacy, mask):
+    assert to_mask(legacy) == mask
+
+
+def test_indices_round_trip():
+    rng = random.Random(0)
+    for _ in range(200):
+        legacy = sorted(rng.sample(range(30), rng.randrange(10)))
+        mask = to_mask(legacy)
+        assert indices(mask) == legacy
+        assert count(mask) == len(legacy)
+        assert all(is_done(mask, idx) == (idx in legacy) for idx in range(32))
+
+
+def test_toggle_as_list_did():
+    mask = 0
+    completed = []
+    for idx in [3, 0, 3, 5, 0, 1]:
+        mask = toggle(mask, idx)
+        if idx in completed:
+            completed.remove(idx)
+        else:
+            completed.append(idx)
+        assert indices(mask) == sorted(completed)
+
+
+def test_normalize_mixed_sections():
+    assert empty() == {section: 0 for section in SECTIONS}
+    assert normalize(None) == empty()
+    assert normalize({'morning': [0, 1], 'day': 4, 'unknown': [7]}) == {
+        'morning': 3, 'day': 4, 'cant_do': 0, 'evening': 0
+    }
+
+
+def test_section_mask_legacy_and_new_day_records():
+    legacy = {'completed': [0, 2], 'total': 4}
+    current = {'mask': 5, 'total': 4}
+    assert section_mask(legacy) == section_mask(current) == 5
+    assert section_count(legacy) == section_count(current) == 2
+    # 'mask' важнее списка, если в записи есть оба
+    assert section_mask({'mask': 1, 'completed': [0, 1]}) == 1
+    assert section_mask(None) == section_mask({}) == 0
+    assert section_count({'total': 3}) == 0
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Календарь событий (event_calendar.py) против прежней проверки по monthcalendar"""
+
+from calendar import monthcalendar
+from datetime import date, timedelta
+
+import pytest
+
+from event_calendar import REMINDER_OFFSETS, EventCalendar, nth_weekday, occurrences
+
+EVENTS = {
+    'tarelka': {'file': 'tarelka.txt', 'rule': 'last_saturday'},
+    'chronos': {'file': 'chronos.txt', 'rule': 'third_saturday'},
+    'new': {'file': 'new.txt', 'rule': 'second_saturday'},
+}
+
+
+def legacy_event_day(rule, year, month):
+    """Как считал notifier.py до календаря: субботы месяца из monthcalendar"""
+    saturdays = [week[5] for week in monthcalendar(year, month) if week[5]]
+    return date(year, month, {'last_saturday': saturdays[-1],
+                              'third_saturday': saturdays[2],
+                              'second_saturday': saturdays[1]}[rule])
+
+
+def legacy_reminders(day):
+    """Прежние напоминания: только событие своего месяца"""
+    reminders = set()
+    for key, event in EVENTS.items():
+        offset = (legacy_event_day(event['rule'], day.year, day.month) - day).days
+        if offset in REMINDER_OFFSETS:
+            reminders.add((key, REMINDER_OFFSETS[offset]))
+    return reminders
+
+
+def test_reminders_match_legacy_check():
+    calendar = EventCalendar(EVENTS)
+    day = date(2025, 1, 1)
+    while day < date(2028, 1, 1):
+        found = {(r['key'], r['type']) for r in calendar.reminders_for(day)}
+        # Всё, что напоминалось раньше, напоминается и сейчас; лишними могут быть
+        # только напоминания о событии следующего месяца (раньше их не было)
+        assert legacy_reminders(day) <= found, day
+        offsets = {reminder_type: offset for offset, reminder_type in REMINDER_OFFSETS.items()}
+        for key, reminder_type in found - legacy_reminders(day):
+            assert (day + timedelta(days=offsets[reminder_type])).month != day.month, (day, key)
+        day += timedelta(days=1)
+
+
+@pytest.mark.parametrize('year,month', [(2026, m) for m in range(1, 13)] + [(2027, 2), (2028, 2)])
+def test_nth_weekday(year, month):
+    for weekday in range(7):
+        days = [week[weekday] for week in monthcalendar(year, month) if week[weekday]]
+        for n, expected in enumerate(days, start=1):
+            assert nth_weekday(year, month, weekday, n) == date(year, month, expected)
+        assert nth_weekday(year, month, weekday, -1) == date(year, month, days[-1])
+        assert nth_weekday(year, month, weekday, len(days) + 1) is None
+
+
+def test_interval_and_dates_rules():
+    interval = {'type': 'interval', 'start': '2026-01-03', 'weeks': 2}
+    found = list(occurrences(interval, date(2026, 10, 1), date(2026, 11, 1)))
+    assert found == [date(2026, 10, 10), date(2026, 10, 24)]
+    assert all((day - date(2026, 1, 3)).days % 14 == 0 for day in found)
+
+    dates = {'type': 'dates', 'dates': ['2027-03-08', '2026-12-31', '2025-01-01']}
+    assert list(occurrences(dates, date(2026, 1, 1), date(2027, 12, 31))) == [date(2026, 12, 31), date(2027, 3, 8)]
+
+
+def test_invalid_rules():
+    with pytest.raises(ValueError):
+        list(occurrences('sixth_saturday', date(2026, 1, 1), date(2026, 2, 1)))
+    with pytest.raises(ValueError):
+        list(occurrences({'type': 'interval', 'start': '2026-01-01', 'days': 0}, date(2026, 1, 1), date(2026, 2, 1)))
+
+    # Событие с плохим правилом пропускается, остальные работают
+    calendar = EventCalendar({**EVENTS, 'broken': {'file': 'x', 'rule': 'someday'}})
+    assert [key for _, key in calendar.upcoming(date(2026, 10, 1), date(2026, 10, 31))] == ['new', 'chronos', 'tarelka']
+
+
+def test_index_rebuilds_past_horizon():
+    calendar = EventCalendar(EVENTS, months=1)
+    calendar.reminders_for(date(2026, 1, 1))
+    first_end = calendar.end
+    assert calendar.upcoming(date(2026, 3, 1), date(2026, 3, 31)) == [
+        (date(2026, 3, 14), 'new'), (date(2026, 3, 21), 'chronos'), (date(2026, 3, 28), 'tarelka')
+    ]
+    assert calendar.end > first_end
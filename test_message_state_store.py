@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Состояния сообщений (message_state_store.py): вытеснение из памяти, срок жизни, индекс дней"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from message_state_store import MessageStateStore
+from storage import JsonStorage, SqliteStorage, StatsCache
+
+
+def days_ago(n):
+    return (datetime.now() - timedelta(days=n)).strftime("%Y-%m-%d")
+
+
+@pytest.fixture(params=['json', 'sqlite', 'cache'])
+def storage(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    if request.param == 'json':
+        storage = JsonStorage()
+    elif request.param == 'sqlite':
+        storage = SqliteStorage()
+    else:
+        storage = StatsCache(JsonStorage(), flush_delay=0)
+    yield storage
+    storage.close()
+
+
+def put(store, message_id, state):
+    """Как tracker_bot.py: состояние в память, затем запись"""
+    store[message_id] = state
+    store.save(message_id)
+
+
+def test_evicted_state_is_reloaded(storage):
+    store = MessageStateStore(storage, max_entries=2)
+    for message_id in (1, 2, 3):
+        put(store, message_id, {'mask': message_id})
+    assert list(store._states) == [2, 3]
+
+    # get() и `in` - только память; вытесненное читает load() и снова кладёт в память
+    assert store.get(1) is None and 1 not in store
+    assert asyncio.run(store.load(1)) == {'mask': 1, 'day': days_ago(0), 'updated': days_ago(0)}
+    assert list(store._states) == [3, 1]
+    assert asyncio.run(store.load('2'))['mask'] == 2
+    assert list(store._states) == [1, 2]
+    assert store.get(2)['mask'] == 2 and 2 in store
+    assert asyncio.run(store.load(4)) is None
+    with pytest.raises(KeyError):
+        store[4]
+
+
+def test_state_not_updated_within_ttl_is_not_returned(storage):
+    store = MessageStateStore(storage, ttl_days=7)
+    storage.put_message_state(1, {'day': days_ago(9), 'updated': days_ago(8)})
+    storage.put_message_state(2, {'day': days_ago(9), 'updated': days_ago(7)})
+    # Старое состояние без 'updated' - по дню сообщения
+    storage.put_message_state(3, {'day': days_ago(8)})
+
+    assert asyncio.run(store.load(1, 'нет')) == 'нет'
+    assert 1 not in store._states
+    assert asyncio.run(store.load(2)) == {'day': days_ago(9), 'updated': days_ago(7)}
+    assert asyncio.run(store.load(3)) is None
+
+
+def test_state_rebuilt_for_old_message_is_kept(storage):
+    # Сообщение 9 дней назад при ttl 7: состояние удалили, чек-лист восстанавливает его
+    store = MessageStateStore(storage, ttl_days=7)
+    state = {'day': days_ago(9), 'mask': 0}
+    store[42] = state
+    store.save(42)
+    store[42]['mask'] = 1
+    store.save(42)
+
+    assert store.get(42) is state
+    assert asyncio.run(store.expire()) == 0
+    assert asyncio.run(MessageStateStore(storage, ttl_days=7).load(42)) == {
+        'day': days_ago(9), 'updated': days_ago(0), 'mask': 1
+    }
+
+
+def test_expire_removes_from_memory_and_storage(storage):
+    store = MessageStateStore(storage, max_entries=2, ttl_days=7)
+    storage.put_message_state(1, {'day': days_ago(30), 'updated': days_ago(30)})
+    storage.put_message_state(2, {'day': days_ago(10)})
+    storage.put_message_state(3, {'day': days_ago(10), 'updated': days_ago(1)})
+    put(store, 4, {'day': days_ago(20)})
+    for message_id, day in ((1, days_ago(30)), (2, days_ago(10)), (4, days_ago(20))):
+        storage.put_message_day(message_id, day)
+    # Прочитанное до истечения срока лежит в памяти - удаляется и оттуда
+    store._states[2] = storage.get_message_state(2)
+
+    assert asyncio.run(store.expire()) == 2
+    assert 2 not in store._states
+    assert set(storage.load_message_states()) == {3, 4}
+    assert [state['day'] for state in asyncio.run(store.values())] == [days_ago(10), days_ago(20)]
+
+    # День удалённого сообщения остаётся в индексе
+    assert asyncio.run(store.day_of(1)) == days_ago(30)
+    assert asyncio.run(store.day_of(4)) == days_ago(20)
+    assert asyncio.run(store.day_of(5)) is None
+
+
+def test_legacy_state_gets_day_from_index(storage):
+    storage.put_message_state(1, {'mask': 3})
+    storage.put_message_day(1, days_ago(2))
+    storage.put_message_state(2, {'mask': 1})
+
+    decoded = []
+    store = MessageStateStore(storage, decode=lambda message_id, state: decoded.append(message_id) or state)
+    assert asyncio.run(store.load(1)) == {'mask': 3, 'day': days_ago(2)}
+    # Без дня и без индекса - решает decode (tracker_bot.py ставит сегодняшний)
+    assert asyncio.run(store.load(2)) == {'mask': 1}
+    assert decoded == [1, 2]
+
+
+def test_decode_can_reject_state(storage):
+    store = MessageStateStore(storage, decode=lambda message_id, state: None)
+    storage.put_message_state(1, {'day': days_ago(0), 'task_refs': {'day': ['000000000000']}})
+    assert asyncio.run(store.load(1)) is None
+    assert store.get(1) is None
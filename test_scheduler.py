@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Планировщик по таймерам (scheduler.py): расписание и догонялки после простоя"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from scheduler import ScheduledJob, TimerScheduler, local_timezone
+
+MSK = ZoneInfo('Europe/Moscow')
+BERLIN = ZoneInfo('Europe/Berlin')
+
+
+def run_catch_up(scheduler):
+    """start() + дать запущенным задачам отработать"""
+    async def main():
+        scheduler.start()
+        await asyncio.sleep(0.05)
+        await scheduler.stop(timeout=1)
+    asyncio.run(main())
+
+
+def recording_job(name, at, runs, tz=MSK, **kwargs):
+    async def callback(due):
+        runs.append((name, due))
+    return ScheduledJob(name, at, callback, tz=tz, **kwargs)
+
+
+def test_next_and_last_run_with_day_filter():
+    job = ScheduledJob('weekly', '23:01', None, tz=MSK, when=lambda day: day.weekday() == 6)
+    wednesday = datetime(2026, 10, 14, 12, 0, tzinfo=MSK)
+    assert job.next_run(wednesday) == datetime(2026, 10, 18, 23, 1, tzinfo=MSK)
+    assert job.last_run(wednesday) == datetime(2026, 10, 11, 23, 1, tzinfo=MSK)
+
+
+def test_local_time_follows_dst():
+    job = ScheduledJob('daily', '23:00', None, tz=BERLIN)
+    before = job.next_run(datetime(2026, 10, 24, 12, 0, tzinfo=BERLIN))
+    after = job.next_run(datetime(2026, 10, 25, 12, 0, tzinfo=BERLIN))
+    assert before.utcoffset() == timedelta(hours=2)
+    assert after.utcoffset() == timedelta(hours=1)
+    assert (after.hour, after.minute) == (before.hour, before.minute) == (23, 0)
+
+
+def test_default_timezone_is_zoneinfo(monkeypatch):
+    monkeypatch.setenv('TZ', 'Europe/Berlin')
+    assert local_timezone() == BERLIN
+    assert ScheduledJob('daily', '23:00', None).tz == BERLIN
+
+
+def test_catch_up_by_done_hook_on_first_start(tmp_path):
+    now = datetime.now(MSK)
+    runs = []
+    done = set()
+    scheduler = TimerScheduler(state_file=str(tmp_path / 'scheduler_state.json'))
+    scheduler.add(recording_job(
+        'summary', (now - timedelta(minutes=5)).strftime('%H:%M'), runs,
+        done=lambda due: due.date() in done
+    ))
+
+    # Первый старт без state_file: данных об итогах нет - запуск догоняется
+    run_catch_up(scheduler)
+    assert len(runs) == 1
+    done.add(runs[0][1].date())
+
+    # Перезапуск с пропавшим state_file: итоги уже отмечены - повтора нет
+    (tmp_path / 'scheduler_state.json').unlink()
+    scheduler = TimerScheduler(state_file=str(tmp_path / 'scheduler_state.json'))
+    scheduler.add(recording_job(
+        'summary', (now - timedelta(minutes=5)).strftime('%H:%M'), runs,
+        done=lambda due: due.date() in done
+    ))
+    run_catch_up(scheduler)
+    assert len(runs) == 1
+
+
+def test_catch_up_without_hook_uses_state_file(tmp_path):
+    now = datetime.now(MSK)
+    at = (now - timedelta(minutes=5)).strftime('%H:%M')
+    state_file = tmp_path / 'scheduler_state.json'
+    runs = []
+
+    # Первый старт - только точка отсчёта
+    scheduler = TimerScheduler(state_file=str(state_file))
+    scheduler.add(recording_job('cleanup', at, runs))
+    run_catch_up(scheduler)
+    assert runs == []
+
+    # Последний запуск был сутки назад - сегодняшний пропущен и догоняется
+    due = scheduler.jobs['cleanup'].last_run(now)
+    state_file.write_text(json.dumps({'cleanup': (due - timedelta(days=1)).isoformat()}))
+    scheduler = TimerScheduler(state_file=str(state_file))
+    scheduler.add(recording_job('cleanup', at, runs))
+    run_catch_up(scheduler)
+    assert runs == [('cleanup', due)]
+    assert json.loads(state_file.read_text())['cleanup'] == due.isoformat()
+
+
+def test_missed_run_outside_window_is_skipped(tmp_path):
+    now = datetime.now(MSK)
+    runs = []
+    scheduler = TimerScheduler(state_file=None, catch_up_window=60)
+    scheduler.add(recording_job(
+        'summary', (now - timedelta(minutes=5)).strftime('%H:%M'), runs, done=lambda due: False
+    ))
+    run_catch_up(scheduler)
+    assert runs == []
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Бэкенды хранилища (storage.py): общий интерфейс, внешние изменения, перенос JSON → SQLite"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from storage import JournalStorage, JsonStorage, SqliteStorage, import_json
+
+BACKENDS = {
+    'json': JsonStorage,
+    'journal': lambda: JournalStorage(compact_every=3),
+    'sqlite': SqliteStorage,
+}
+
+
+def days_ago(n):
+    return (datetime.now() - timedelta(days=n)).strftime("%Y-%m-%d")
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # Все бэкенды пишут в файлы по умолчанию в текущем каталоге
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture(params=list(BACKENDS))
+def backend(request):
+    return request.param
+
+
+@pytest.fixture
+def storage(backend):
+    storage = BACKENDS[backend]()
+    yield storage
+    storage.close()
+
+
+def test_days(storage):
+    storage.put_day('2026-10-01', {'percentage': 50, 'points': 3})
+    storage.put_days({'2026-10-02': {'percentage': 70}, '2026-10-03': {'percentage': 90}})
+    storage.update_day('2026-10-01', {'_message_ref': 'abc'})
+    storage.update_day('2026-10-04', {'percentage': 10})
+    # Полная замена дня убирает старые поля
+    storage.put_day('2026-10-02', {'percentage': 75})
+
+    assert storage.get_day('2026-10-01') == {'percentage': 50, 'points': 3, '_message_ref': 'abc'}
+    assert storage.get_day('2026-09-30') is None
+    assert list(storage.get_days('2026-10-02', '2026-10-03')) == ['2026-10-02', '2026-10-03']
+    assert storage.get_days('2026-10-02', '2026-10-02') == {'2026-10-02': {'percentage': 75}}
+    assert list(storage.load_stats()) == ['2026-10-01', '2026-10-02', '2026-10-03', '2026-10-04']
+    assert storage.message_body_refs() == {'abc'}
+
+    # Возвращается копия - правка результата не меняет хранилище
+    storage.get_day('2026-10-03')['percentage'] = 0
+    assert storage.get_day('2026-10-03') == {'percentage': 90}
+
+
+def test_days_survive_reopen(backend):
+    storage = BACKENDS[backend]()
+    for n in range(7):
+        storage.put_day(f'2026-10-{n + 1:02d}', {'percentage': n * 10})
+    storage.update_day('2026-10-07', {'points': 5})
+    storage.close()
+
+    storage = BACKENDS[backend]()
+    assert len(storage.load_stats()) == 7
+    assert storage.get_day('2026-10-07') == {'percentage': 60, 'points': 5}
+    storage.close()
+
+
+def test_message_states_and_index(storage):
+    storage.put_message_state(1, {'day': days_ago(10), 'completed': [0]})
+    storage.put_message_state(2, {'day': days_ago(1), 'completed': []})
+    storage.put_message_day(1, days_ago(10))
+    storage.put_message_day(2, days_ago(1))
+
+    assert storage.get_message_state('1') == {'day': days_ago(10), 'completed': [0]}
+    assert set(storage.load_message_states()) == {1, 2}
+
+    assert storage.prune_message_states(days_ago(7)) == 1
+    assert storage.get_message_state(1) is None
+    # Индекс переживает удаление состояния
+    assert storage.get_message_day(1) == days_ago(10)
+
+    storage.delete_message_state(2)
+    assert storage.load_message_states() == {}
+    assert storage.get_message_day(3) is None
+
+
+def test_manifests_catalog_and_bodies(storage):
+    manifest = {'day': days_ago(0), 'sections': {'day': ['3f2a9c1e5b7d']}}
+    storage.put_manifest(10, manifest)
+    assert storage.get_manifest('10') == manifest
+    assert storage.get_manifest(11) is None
+
+    storage.put_task_texts({'a1': 'Зарядка', 'b2': 'Чтение'})
+    # Известный id не перезаписывается
+    storage.put_task_texts({'a1': 'Другое', 'c3': 'Прогулка'})
+    assert storage.get_task_texts(['a1', 'c3', 'zz']) == {'a1': 'Зарядка', 'c3': 'Прогулка'}
+    assert storage.load_task_texts() == {'a1': 'Зарядка', 'b2': 'Чтение', 'c3': 'Прогулка'}
+
+    storage.put_body('old', b'\x00old', days_ago(5))
+    storage.put_body('live', b'live', days_ago(5))
+    storage.put_body('today', b'today', days_ago(0))
+    storage.put_body('live', b'changed', days_ago(0))
+    assert storage.get_body('live') == b'live'
+
+    assert storage.prune_bodies({'live'}, days_ago(0)) == 1
+    assert storage.get_body('old') is None
+    assert storage.get_body('today') == b'today'
+
+
+def test_own_writes_keep_source_version(backend):
+    storage = BACKENDS[backend]()
+    other = BACKENDS[backend]()
+    version = storage.source_version()
+    if version is None:
+        pytest.skip("бэкенд не отслеживает внешние изменения")
+
+    storage.put_day('2026-10-01', {'percentage': 50})
+    storage.update_day('2026-10-01', {'points': 1})
+    storage.put_days({'2026-10-02': {'percentage': 60}, '2026-10-03': {'percentage': 70}})
+    assert storage.source_version() == version
+
+    # Запись другого процесса (notifier.py) - версия меняется, данные видны
+    other.update_day('2026-10-04', {'_message_ref': 'x'})
+    assert storage.source_version() != version
+    assert storage.get_day('2026-10-04') == {'_message_ref': 'x'}
+    other.close()
+    storage.close()
+
+
+def test_journal_compaction(workdir):
+    storage = JournalStorage(compact_every=3)
+    for n in range(5):
+        storage.put_day(f'2026-10-{n + 1:02d}', {'percentage': n})
+    storage.append_event({'type': 'toggle', 'day': '2026-10-05', 'task': 0})
+
+    # Два сворачивания: снимок содержит первые дни, в архиве - вся история
+    assert set(json.loads((workdir / 'stats.json').read_text())) >= {'2026-10-01', '2026-10-03'}
+    archived = [json.loads(line) for line in (workdir / 'stats.journal.archive.ndjson').read_text().splitlines()]
+    assert [entry['type'] for entry in archived].count('day') == 5
+    assert len(storage.load_stats()) == 5
+    storage.close()
+
+    # Недописанная строка после сбоя пропускается
+    with open(workdir / 'stats.journal.ndjson', 'a', encoding='utf-8') as f:
+        f.write('{"seq": 99, "type": "day", "day": "2026-10-09"')
+    storage = JournalStorage(compact_every=3)
+    assert list(storage.load_stats()) == [f'2026-10-{n + 1:02d}' for n in range(5)]
+    storage.put_day('2026-10-06', {'percentage': 6})
+    assert storage.get_day('2026-10-06') == {'percentage': 6}
+    storage.close()
+
+
+def test_journal_compact_every_must_be_at_least_two():
+    with pytest.raises(ValueError):
+        JournalStorage(compact_every=1)
+
+
+def test_import_json_to_sqlite(workdir):
+    source = JsonStorage()
+    source.put_days({days_ago(2): {'percentage': 80, '_message_ref': 'r1'}, days_ago(1): {'percentage': 40}})
+    source.put_message_state(7, {'day': days_ago(1), 'mask': 5})
+    source.put_task_texts({'a1': 'Зарядка'})
+    source.put_body('r1', b'body', days_ago(2))
+
+    target = SqliteStorage('tracker.db')
+    assert target.is_empty()
+    assert import_json(target) == 2
+    assert target.load_stats() == source.load_stats()
+    assert target.get_message_state(7) == {'day': days_ago(1), 'mask': 5}
+    assert target.load_task_texts() == {'a1': 'Зарядка'}
+    assert target.get_body('r1') == b'body'
+    assert target.message_body_refs() == {'r1'}
+    assert not target.is_empty()
+    target.close()
+
+
+def test_journal_not_compacted_by_other_process(workdir):
+    bot = JournalStorage(compact_every=3)
+    notifier = JournalStorage(compact_every=3, owner=False)
+
+    # Разовый запуск notifier.py: дописывает и закрывается без свёртки
+    for n in range(4):
+        notifier.update_day(f'2026-10-0{n + 1}', {'_message_ref': str(n)})
+    notifier.close()
+    assert not (workdir / 'stats.json').exists()
+    assert not (workdir / 'stats.journal.archive.ndjson').exists()
+
+    # Строки обоих процессов - в одном журнале с общей нумерацией
+    notifier = JournalStorage(compact_every=3, owner=False)
+    bot.put_day('2026-10-05', {'percentage': 50})
+    notifier.update_day('2026-10-05', {'_message_ref': 'x'})
+    bot.update_day('2026-10-05', {'points': 2})
+    lines = (workdir / 'stats.journal.ndjson').read_text().splitlines()
+    seqs = [json.loads(line)['seq'] for line in lines]
+    assert seqs == sorted(set(seqs))
+
+    # Свёртку при записи делает владелец - чужие строки попадают в снимок
+    bot.put_day('2026-10-06', {'percentage': 60})
+    snapshot = json.loads((workdir / 'stats.json').read_text())
+    assert snapshot['2026-10-05'] == {'percentage': 50, '_message_ref': 'x', 'points': 2}
+    assert len(snapshot) == 6
+    notifier.close()
+    bot.close()
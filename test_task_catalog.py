@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Каталог текстов задач (task_catalog.py) поверх JSON и SQLite"""
+
+import pytest
+
+from storage import JsonStorage, SqliteStorage
+from task_catalog import (day_tasks, intern_tasks, pack_manifest, pack_message_state, resolve_tasks, text_id,
+                          unpack_manifest, unpack_message_state)
+from task_manifest import build_manifest, manifest_tasks
+
+TASKS = {
+    'morning': [],
+    'day': ['🏃 Зарядка', '📚 Чтение <b>30 мин</b>'],
+    'cant_do': ['🍬 Сладкое'],
+    'evening': ['🏃 Зарядка'],
+}
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def storage(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    storage = JsonStorage() if request.param == 'json' else SqliteStorage()
+    yield storage
+    storage.close()
+
+
+def test_text_id_is_stable():
+    assert text_id('🏃 Зарядка') == text_id('🏃 Зарядка')
+    assert text_id('🏃 Зарядка') != text_id('🏃 Зарядка ')
+    assert len(text_id('x')) == 12
+
+
+def test_intern_and_resolve(storage):
+    refs = intern_tasks(storage, TASKS)
+    assert refs['morning'] == []
+    assert refs['day'][0] == refs['evening'][0] == text_id('🏃 Зарядка')
+    # Одинаковые тексты хранятся один раз
+    assert len(storage.load_task_texts()) == 3
+    assert resolve_tasks(storage, refs) == TASKS
+
+    # Повторное добавление ничего не меняет
+    assert intern_tasks(storage, TASKS) == refs
+    assert len(storage.load_task_texts()) == 3
+
+
+def test_missing_id_resolves_to_none(storage):
+    refs = intern_tasks(storage, TASKS)
+    refs['day'].append('000000000000')
+    assert resolve_tasks(storage, refs) is None
+
+
+def test_day_tasks_new_and_legacy_records(storage):
+    refs = intern_tasks(storage, {'day': TASKS['day'], 'cant_do': TASKS['cant_do']})
+    assert day_tasks(storage, {'percentage': 50, '_task_refs': refs}) == {
+        'day': TASKS['day'], 'cant_do': TASKS['cant_do']
+    }
+    assert day_tasks(storage, {'percentage': 50, '_tasks': {'day': ['старый текст']}}) == {'day': ['старый текст']}
+    assert day_tasks(storage, {'percentage': 50}) is None
+
+
+def test_pack_and_unpack_message_state(storage):
+    state = {'day': '2026-10-17', 'tasks': TASKS, 'completed': {'day': 1}}
+    packed = pack_message_state(storage, state)
+    assert 'tasks' not in packed
+    assert set(packed['task_refs']) == set(TASKS)
+    assert unpack_message_state(storage, packed) == state
+
+    # Старое состояние с текстами читается как есть
+    assert unpack_message_state(storage, state) is state
+
+    packed['task_refs']['day'] = ['000000000000']
+    assert unpack_message_state(storage, packed) is None
+
+
+def test_manifest_uses_catalog_ids(storage):
+    manifest = build_manifest(TASKS, '2026-10-17', 'morning')
+    assert [entry['id'] for entry in manifest['tasks']['day']] == [text_id(text) for text in TASKS['day']]
+
+    packed = pack_manifest(storage, manifest)
+    assert 'tasks' not in packed
+    assert packed['task_refs'] == {section: [text_id(text) for text in TASKS[section]] for section in ('day', 'cant_do', 'evening')}
+    assert packed['day'] == '2026-10-17' and packed['period'] == 'morning'
+    assert unpack_manifest(storage, packed) == manifest
+    assert manifest_tasks(unpack_manifest(storage, packed)) == TASKS
+
+    # Старый манифест с текстами читается как есть
+    assert unpack_manifest(storage, manifest) is manifest
+    packed['task_refs']['day'] = ['000000000000']
+    assert unpack_manifest(storage, packed) is None
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""POST /tasks (tracker_bot.py): приём манифестов задач от notifier.py"""
+
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from task_catalog import unpack_manifest
+from task_manifest import build_manifest
+
+TOKEN = 'secret-token'
+TASKS = {
+    'day': ['🏃 Зарядка', '📚 Чтение'],
+    'cant_do': ['🍬 Сладкое'],
+    'evening': ['🧘 Растяжка'],
+}
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('TELEGRAM_TOKEN', 'test')
+    monkeypatch.setenv('TELEGRAM_CHAT_ID', '1')
+    monkeypatch.setenv('STORAGE_BACKEND', 'json')
+    monkeypatch.setenv('TASKS_INGEST_TOKEN', TOKEN)
+    import tracker_bot
+    bot = tracker_bot.TaskTrackerBot()
+    yield bot
+    bot.storage.close()
+
+
+def ingest(bot, check):
+    """Поднимает приложение с /tasks и выполняет check(client)"""
+    async def main():
+        app = web.Application()
+        app.router.add_post('/tasks', bot.tasks_ingest_handler)
+        async with TestClient(TestServer(app)) as client:
+            await check(client)
+        await bot.telegram.close()
+    asyncio.run(main())
+
+
+def auth(token=TOKEN):
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.mark.parametrize('headers', [{}, auth('wrong'), auth(''), {'Authorization': TOKEN}])
+def test_rejects_bad_token(bot, headers):
+    async def check(client):
+        response = await client.post('/tasks', json={
+            'message_id': 1, 'manifest': build_manifest(TASKS, '2026-10-17', 'morning')
+        }, headers=headers)
+        assert response.status == 401
+        assert (await response.json())['ok'] is False
+        assert await bot.storage.run('get_manifest', 1) is None
+    ingest(bot, check)
+
+
+@pytest.mark.parametrize('payload', [
+    {'manifest': build_manifest(TASKS, '2026-10-17', 'morning')},
+    {'message_id': 'abc', 'manifest': build_manifest(TASKS, '2026-10-17', 'morning')},
+    {'message_id': 1},
+    {'message_id': 1, 'manifest': {**build_manifest(TASKS, '2026-10-17', 'morning'), 'version': 99}},
+    {'message_id': 1, 'manifest': {**build_manifest(TASKS, '2026-10-17', 'morning'), 'day': '17.10.2026'}},
+    {'message_id': 1, 'manifest': {**build_manifest(TASKS, '2026-10-17', 'morning'), 'tasks': {'night': []}}},
+    {'message_id': 1, 'manifest': {**build_manifest(TASKS, '2026-10-17', 'morning'), 'tasks': {'day': ['x']}}},
+    {'message_id': 1, 'manifest': 'manifest'},
+])
+def test_rejects_malformed_manifest(bot, payload):
+    async def check(client):
+        response = await client.post('/tasks', json=payload, headers=auth())
+        assert response.status == 400
+        assert await bot.storage.run('get_manifest', 1) is None
+    ingest(bot, check)
+
+
+def test_rejects_invalid_json(bot):
+    async def check(client):
+        response = await client.post('/tasks', data='{"message_id": 1', headers=auth())
+        assert response.status == 400
+    ingest(bot, check)
+
+
+def test_stores_manifest_day_and_task_refs(bot):
+    manifest = build_manifest(TASKS, '2026-10-17', 'morning')
+
+    async def check(client):
+        response = await client.post('/tasks', json={
+            'message_id': 42, 'manifest': manifest, 'message': 'Доброе утро!'
+        }, headers=auth())
+        assert response.status == 200
+        assert await response.json() == {'ok': True}
+
+        # Манифест хранится со ссылками на каталог задач, без текстов
+        stored = await bot.storage.run('get_manifest', 42)
+        assert 'tasks' not in stored
+        assert unpack_manifest(bot.storage, stored) == manifest
+        assert await bot.storage.run('get_message_day', 42) == '2026-10-17'
+        assert await bot.resolve_tasks(42, '') == {'morning': [], **TASKS}
+
+        day = bot.storage.get_day('2026-10-17')
+        assert day['_task_refs'] == stored['task_refs']
+        assert bot.load_tasks_from_stats('2026-10-17') == {'morning': [], **TASKS}
+        assert await bot.message_bodies.get(day['_message_ref']) == 'Доброе утро!'
+    ingest(bot, check)
@@ -9,13 +9,24 @@ Telegram бот для отслеживания выполнения задач
 """
 
 import asyncio
-import aiohttp
 from aiohttp import web
-import json
+import hmac
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
 import os
-import re
+
+from telegram_client import TelegramClient, MessageDispatcher, EditCoalescer
+from update_dispatcher import UpdateDispatcher
+from storage import open_storage
+from aggregates import StatsAggregates
+from notifier import PersonalScheduleNotifier
+from scheduler import ScheduledJob, TimerScheduler
+from task_manifest import manifest_tasks, validate_manifest
+import completion
+from task_catalog import text_id, day_tasks, pack_manifest, unpack_manifest, pack_message_state, unpack_message_state
+from message_bodies import MessageBodies
+from message_state_store import MessageStateStore
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -30,13 +41,60 @@ class TaskTrackerBot:
         if not self.chat_id:
             raise ValueError("❌ TELEGRAM_CHAT_ID не найден в переменных окружения!")
         
-        self.stats_file = "stats.json"
-        self.message_state_file = "message_states.json"
+        # Общий HTTP-клиент Telegram (keep-alive, DNS-кэш)
+        self.telegram = TelegramClient(self.telegram_token)
+        # Очередь исходящих сообщений с лимитами Telegram и повторами при 429
+        self.dispatcher = MessageDispatcher(self.telegram)
+        # Склейка частых правок чек-листа (быстрые нажатия → одна правка)
+        self.edit_coalescer = EditCoalescer(self.edit_message)
+        
+        # Хранилище статистики и состояний сообщений (STORAGE_BACKEND=json|journal|sqlite)
+        # Статистика кэшируется в памяти и пишется на диск пачками
+        self.storage = open_storage(cache=True)
+        
+        # Серии и окна 7/30 дней обновляются при каждой записи дня
+        self.aggregates = StatsAggregates()
+        self.storage.subscribe(self.aggregates)
         self.last_update_id = 0
         
+        # Быстрый webhook-ответ: answerCallbackQuery уходит в теле ответа,
+        # а сама обработка - в фоновую очередь
+        self.webhook_fast_reply = os.getenv('WEBHOOK_FAST_REPLY', '1') == '1'
+        
+        # Очередь callback'ов: по одному сообщению - строго по порядку,
+        # разные сообщения - параллельно
+        self.update_dispatcher = UpdateDispatcher(
+            self.process_callback,
+            workers=int(os.getenv('UPDATE_WORKERS', 4)),
+            max_pending=int(os.getenv('UPDATE_QUEUE_SIZE', 1000))
+        )
+        
+        # Тексты сообщений - сжатые, по одному экземпляру; в состояниях только ссылки
+        self.message_bodies = MessageBodies(self.storage)
+        
         # Хранилище текущего состояния для каждого сообщения
-        # {message_id: {'morning': [0,1,2], 'day': [0], 'evening': [], 'original_text': '...'}}
-        self.message_state = self.load_message_states()
+        # {message_id: {'day': '2026-02-28', 'updated': '2026-02-28', 'tasks': {...}, 'completed': {'day': 0b101, ...}, 'original_ref': '...', 'clean_ref': '...'}}
+        # В памяти - последние MESSAGE_STATE_MAX, не обновлявшиеся MESSAGE_STATE_TTL_DAYS дней - удаляются
+        self.message_state = MessageStateStore(
+            self.storage,
+            decode=self.decode_message_state,
+            encode=lambda state: pack_message_state(self.storage, state),
+            max_entries=int(os.getenv('MESSAGE_STATE_MAX', 100)),
+            ttl_days=int(os.getenv('MESSAGE_STATE_TTL_DAYS', 7))
+        )
+        
+        # Приём манифестов задач от notifier.py (POST /tasks, Authorization: Bearer <токен>)
+        # Без токена маршрут не регистрируется
+        self.tasks_ingest_token = os.getenv('TASKS_INGEST_TOKEN', '')
+        
+        # Итоги дня/недели/месяца по таймерам в часовом поясе чата (CHAT_TIMEZONE, по умолчанию - сервера)
+        chat_timezone = os.getenv('CHAT_TIMEZONE')
+        self.chat_timezone = ZoneInfo(chat_timezone) if chat_timezone else None
+        self.scheduler = TimerScheduler(
+            state_file=os.getenv('SCHEDULER_STATE_FILE', 'scheduler_state.json'),
+            catch_up_window=int(os.getenv('SCHEDULER_CATCH_UP', 24 * 3600))
+        )
+        self.setup_schedule()
         
     def parse_tasks(self, message_text):
         """Парсит задачи из сообщения notifier.py"""
@@ -87,6 +145,23 @@ class TaskTrackerBot:
         logger.info(f"📋 Распарсено задач: день={len(tasks['day'])}, нельзя={len(tasks['cant_do'])}, вечер={len(tasks['evening'])}")
         return tasks
     
+    async def resolve_tasks(self, message_id, message_text):
+        """
+        Задачи сообщения: манифест notifier.py по message_id (без разбора текста),
+        для сообщений без манифеста - parse_tasks
+        """
+        manifest = None
+        if message_id:
+            try:
+                manifest = await self.storage.run('get_manifest', message_id)
+                # Тексты задач манифеста - из каталога
+                manifest = unpack_manifest(self.storage, manifest) if manifest else None
+            except Exception as e:
+                logger.error(f"❌ Ошибка загрузки манифеста {message_id}: {e}")
+        if manifest:
+            return manifest_tasks(manifest)
+        return self.parse_tasks(message_text)
+    
     def create_checklist_keyboard(self, tasks, completed):
         """Создаёт inline-клавиатуру с задачами"""
         keyboard = []
@@ -95,7 +170,7 @@ class TaskTrackerBot:
         if tasks['day']:
             keyboard.append([{'text': '☀️ ДНЕВНЫЕ ЗАДАЧИ', 'callback_data': 'header'}])
             for idx, task in enumerate(tasks['day']):
-                is_done = idx in completed.get('day', [])
+                is_done = completion.is_done(completed.get('day', 0), idx)
                 emoji = '⭐' if is_done else '☆'
                 # Обрезаем длинный текст для кнопки
                 short_task = task[:35] + '...' if len(task) > 35 else task
@@ -108,7 +183,7 @@ class TaskTrackerBot:
         if tasks['cant_do']:
             keyboard.append([{'text': '⛔ НЕЛЬЗЯ ДЕЛАТЬ', 'callback_data': 'header'}])
             for idx, task in enumerate(tasks['cant_do']):
-                is_done = idx in completed.get('cant_do', [])
+                is_done = completion.is_done(completed.get('cant_do', 0), idx)
                 emoji = '⭐' if is_done else '☆'
                 short_task = task[:32] + '...' if len(task) > 32 else task
                 keyboard.append([{
@@ -120,7 +195,7 @@ class TaskTrackerBot:
         if tasks['evening']:
             keyboard.append([{'text': '🌙 ВЕЧЕРНИЕ ЗАДАЧИ', 'callback_data': 'header'}])
             for idx, task in enumerate(tasks['evening']):
-                is_done = idx in completed.get('evening', [])
+                is_done = completion.is_done(completed.get('evening', 0), idx)
                 emoji = '⭐' if is_done else '☆'
                 short_task = task[:35] + '...' if len(task) > 35 else task
                 keyboard.append([{
@@ -146,28 +221,31 @@ class TaskTrackerBot:
         if tasks['day']:
             msg += "\n☀️ <b>ДНЕВНЫЕ:</b>\n"
             for idx, task in enumerate(tasks['day']):
-                emoji = '⭐' if idx in completed.get('day', []) else '☆'
+                is_done = completion.is_done(completed.get('day', 0), idx)
+                emoji = '⭐' if is_done else '☆'
                 msg += f"{emoji} {task}\n"
                 total_tasks += 1
-                if idx in completed.get('day', []):
+                if is_done:
                     total_done += 1
         
         if tasks['cant_do']:
             msg += "\n⛔ <b>НЕЛЬЗЯ ДЕЛАТЬ:</b>\n"
             for idx, task in enumerate(tasks['cant_do']):
-                emoji = '⭐' if idx in completed.get('cant_do', []) else '☆'
+                is_done = completion.is_done(completed.get('cant_do', 0), idx)
+                emoji = '⭐' if is_done else '☆'
                 msg += f"{emoji} {task}\n"
                 total_tasks += 1
-                if idx in completed.get('cant_do', []):
+                if is_done:
                     total_done += 1
         
         if tasks['evening']:
             msg += "\n🌙 <b>ВЕЧЕРНИЕ:</b>\n"
             for idx, task in enumerate(tasks['evening']):
-                emoji = '⭐' if idx in completed.get('evening', []) else '☆'
+                is_done = completion.is_done(completed.get('evening', 0), idx)
+                emoji = '⭐' if is_done else '☆'
                 msg += f"{emoji} {task}\n"
                 total_tasks += 1
-                if idx in completed.get('evening', []):
+                if is_done:
                     total_done += 1
         
         # Прогресс
@@ -231,7 +309,7 @@ class TaskTrackerBot:
                 
                 for section in ['morning', 'day', 'evening']:
                     if len(tasks[section]) > 0:
-                        total_done += len(completed.get(section, []))
+                        total_done += completion.count(completed.get(section, 0))
                         total_tasks += len(tasks[section])
                 
                 if total_tasks > 0:
@@ -246,7 +324,7 @@ class TaskTrackerBot:
             # Обрабатываем задачи
             if current_section and line.startswith('•'):
                 idx = task_counters[current_section]
-                is_done = idx in completed.get(current_section, [])
+                is_done = completion.is_done(completed.get(current_section, 0), idx)
                 
                 # Получаем чистый текст задачи (без • и звёздочек)
                 task_text = line[1:].strip()  # Убираем •
@@ -268,56 +346,67 @@ class TaskTrackerBot:
         return '\n'.join(updated_lines)
     
     def load_stats(self):
-        """Загружает статистику из файла"""
+        """Загружает всю статистику"""
         try:
-            if os.path.exists(self.stats_file):
-                with open(self.stats_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # Убираем _info и _format если они есть
-                    data = json.loads(content)
-                    # Фильтруем только реальные даты
-                    stats = {k: v for k, v in data.items() if k not in ['_info', '_format'] and '-' in k}
-                    return stats
-            return {}
+            return self.storage.load_stats()
         except Exception as e:
             logger.error(f"❌ Ошибка загрузки статистики: {e}")
             return {}
     
-    def save_stats(self, stats):
-        """Сохраняет статистику в файл"""
+    def load_day_stats(self, day_key):
+        """Загружает статистику за один день (None если нет)"""
         try:
-            with open(self.stats_file, 'w', encoding='utf-8') as f:
-                json.dump(stats, f, ensure_ascii=False, indent=2)
+            return self.storage.get_day(day_key)
+        except Exception as e:
+            logger.error(f"❌ Ошибка загрузки статистики за {day_key}: {e}")
+            return None
+    
+    def save_day_stats(self, day_key, data):
+        """Сохраняет статистику за один день"""
+        try:
+            self.storage.put_day(day_key, data)
             logger.info("✅ Статистика сохранена")
             return True
         except Exception as e:
             logger.error(f"❌ Ошибка сохранения статистики: {e}")
             return False
     
-    def load_message_states(self):
-        """Загружает состояния сообщений из файла"""
+    def decode_message_state(self, message_id, state):
+        """Состояние сообщения из хранилища → рабочее (None - не восстановить)"""
         try:
-            if os.path.exists(self.message_state_file):
-                with open(self.message_state_file, 'r', encoding='utf-8') as f:
-                    # Преобразуем строковые ключи обратно в int
-                    data = json.load(f)
-                    return {int(k): v for k, v in data.items()}
-            return {}
+            # Ссылки на каталог задач → тексты
+            state = unpack_message_state(self.storage, state)
+            if state is None:
+                logger.warning(f"⚠️ Состояние сообщения {message_id} пропущено: задачи не найдены в каталоге")
+                return None
+            # Старые состояния со списками индексов → маски
+            state['completed'] = completion.normalize(state.get('completed'))
+            # Старые состояния с полными текстами → ссылки на тексты сообщений
+            if 'original_text' in state:
+                original_text = state.pop('original_text')
+                state['original_ref'] = self.message_bodies.put(original_text)
+                state['clean_ref'] = self.message_bodies.put(state.pop('clean_original', original_text))
+            # id задач манифеста - теперь это id каталога из task_refs
+            state.pop('task_ids', None)
+            # Старые состояния без дня и без записи в индексе - сегодня
+            if not state.get('day'):
+                state['day'] = self.get_today_key()
+            return state
         except Exception as e:
-            logger.error(f"❌ Ошибка загрузки состояний сообщений: {e}")
-            return {}
+            logger.error(f"❌ Ошибка загрузки состояния сообщения {message_id}: {e}")
+            return None
     
-    def load_tasks_from_stats(self):
+    def load_tasks_from_stats(self, day_key=None):
         """
-        Загружает задачи из stats.json (сохранённые notifier.py)
+        Загружает задачи из stats (сохранённые notifier.py) за day_key (по умолчанию сегодня)
         Используется как fallback когда message_state потерян
         """
         try:
-            today_key = self.get_today_key()
-            stats = self.load_stats()
+            today_key = day_key or self.get_today_key()
+            today_data = self.load_day_stats(today_key)
             
-            if today_key in stats and '_tasks' in stats[today_key]:
-                tasks = stats[today_key]['_tasks']
+            tasks = day_tasks(self.storage, today_data) if today_data else None
+            if tasks:
                 # Добавляем morning если его нет
                 if 'morning' not in tasks:
                     tasks['morning'] = []
@@ -329,28 +418,32 @@ class TaskTrackerBot:
             logger.error(f"❌ Ошибка загрузки задач из stats: {e}")
             return {'morning': [], 'day': [], 'cant_do': [], 'evening': []}
     
-    def save_message_states(self):
-        """Сохраняет состояния сообщений в файл"""
+    def save_message_state(self, message_id):
+        """Сохраняет состояние одного сообщения (удалённое уже удалено из хранилища)"""
         try:
-            # Преобразуем int ключи в строки для JSON
-            data = {str(k): v for k, v in self.message_state.items()}
-            with open(self.message_state_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.message_state.save(message_id)
             logger.info("✅ Состояния сообщений сохранены")
             return True
         except Exception as e:
             logger.error(f"❌ Ошибка сохранения состояний сообщений: {e}")
             return False
     
+    def record_event(self, event_type, **fields):
+        """Пишет событие (toggle/penalty) в журнал хранилища, если он есть"""
+        try:
+            self.storage.append_event({'type': event_type, 'day': self.get_today_key(), **fields})
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи события {event_type}: {e}")
+    
     def get_today_key(self):
         """Возвращает ключ для сегодняшнего дня"""
         return datetime.now().strftime("%Y-%m-%d")
     
     def calculate_percentage(self, completed, total):
-        """Вычисляет процент выполнения"""
+        """Вычисляет процент выполнения (completed - маска выполненных)"""
         if total == 0:
             return 0
-        return int((len(completed) / total) * 100)
+        return int((completion.count(completion.to_mask(completed)) / total) * 100)
     
     def get_progress_bar(self, percentage, length=8):
         """Создаёт прогресс-бар"""
@@ -419,40 +512,23 @@ class TaskTrackerBot:
         else:
             return "⬜⬜⬜⬜⬜⬜⬜"
     
-    def calculate_streak_90(self, stats):
+    def calculate_streak_90(self, as_of=None):
         """
-        Считает текущий streak дней с ≥90%
+        Текущий streak дней с ≥90% (из агрегатов, без ограничения по длине)
         Для получения Black level нужно 7 дней подряд
         """
-        today = datetime.now()
-        streak = 0
-        
-        # Идём назад от сегодня
-        for i in range(30):  # Максимум 30 дней назад
-            day = today - timedelta(days=i)
-            day_key = day.strftime("%Y-%m-%d")
-            
-            if day_key in stats:
-                percentage = stats[day_key].get('percentage', 0)
-                if percentage >= 90:
-                    streak += 1
-                else:
-                    break  # Streak прервался
-            else:
-                break  # Нет данных = streak прервался
-        
-        return streak
+        return self.aggregates.streak(90, as_of)
     
-    def is_black_level(self, stats):
+    def is_black_level(self):
         """Проверяет достигнут ли Black level (7 дней ≥90%)"""
-        return self.calculate_streak_90(stats) >= 7
+        return self.calculate_streak_90() >= 7
     
-    def get_level_display(self, percentage, stats):
+    def get_level_display(self, percentage, as_of=None):
         """
         Формирует полное отображение уровня с визуализацией
         """
         level = self.get_level(percentage)
-        streak_90 = self.calculate_streak_90(stats)
+        streak_90 = self.calculate_streak_90(as_of)
         is_black = streak_90 >= 7
         
         # Визуальная шкала уровней
@@ -480,75 +556,49 @@ class TaskTrackerBot:
         
         return status
     
-    def get_week_stats(self, stats):
-        """Считает статистику за неделю"""
-        today = datetime.now()
-        total = 0
-        count = 0
+    def get_range_stats(self, from_day, to_day):
+        """Статистика за диапазон дат включительно (неделя, месяц, квартал...) по индексу агрегатов"""
+        range_stats = self.aggregates.range(from_day, to_day)
+        range_stats['level'] = self.get_level(range_stats['avg'])
+        return range_stats
+    
+    def get_week_stats(self, as_of=None):
+        """Статистика за неделю до as_of включительно"""
+        today = as_of or date.today()
+        week = self.get_range_stats(today - timedelta(days=6), today)
+        
+        # Лучшая серия ≥70% внутри недели (дни без данных пропускаются)
         streak_70 = 0
         current_streak = 0
-        days_above_90 = 0
-        
         for i in range(7):
-            day = today - timedelta(days=i)
-            day_key = day.strftime("%Y-%m-%d")
-            
-            if day_key in stats:
-                percentage = stats[day_key].get('percentage', 0)
-                total += percentage
-                count += 1
-                
-                if percentage >= 90:
-                    days_above_90 += 1
-                
-                if percentage >= 70:
-                    current_streak += 1
-                    streak_70 = max(streak_70, current_streak)
-                else:
-                    current_streak = 0
+            percentage = self.aggregates.percentage(today - timedelta(days=i))
+            if percentage is None:
+                continue
+            if percentage >= 70:
+                current_streak += 1
+                streak_70 = max(streak_70, current_streak)
+            else:
+                current_streak = 0
         
-        avg = int(total / count) if count > 0 else 0
         return {
-            'avg': avg,
-            'days': count,
+            'avg': week['avg'],
+            'days': week['days'],
             'streak_70': streak_70,
-            'days_above_90': days_above_90,
-            'level': self.get_level(avg)
+            'days_above_90': week['above'][90],
+            'level': week['level']
         }
     
-    def get_month_stats(self, stats):
-        """Считает статистику за месяц"""
-        today = datetime.now()
-        total = 0
-        count = 0
-        days_above_90 = 0
-        days_above_80 = 0
-        days_above_70 = 0
-        
-        for i in range(30):
-            day = today - timedelta(days=i)
-            day_key = day.strftime("%Y-%m-%d")
-            
-            if day_key in stats:
-                percentage = stats[day_key].get('percentage', 0)
-                total += percentage
-                count += 1
-                
-                if percentage >= 90:
-                    days_above_90 += 1
-                if percentage >= 80:
-                    days_above_80 += 1
-                if percentage >= 70:
-                    days_above_70 += 1
-        
-        avg = int(total / count) if count > 0 else 0
+    def get_month_stats(self, as_of=None):
+        """Статистика за 30 дней до as_of включительно"""
+        today = as_of or date.today()
+        month = self.get_range_stats(today - timedelta(days=29), today)
         return {
-            'avg': avg,
-            'days': count,
-            'days_above_90': days_above_90,
-            'days_above_80': days_above_80,
-            'days_above_70': days_above_70,
-            'level': self.get_level(avg)
+            'avg': month['avg'],
+            'days': month['days'],
+            'days_above_90': month['above'][90],
+            'days_above_80': month['above'][80],
+            'days_above_70': month['above'][70],
+            'level': month['level']
         }
     
     def get_section_emoji(self, percentage):
@@ -589,17 +639,17 @@ class TaskTrackerBot:
         except Exception as e:
             logger.error(f"❌ Ошибка отправки штрафного сообщения: {e}")
     
-    async def send_daily_summary(self):
-        """ЭТАП 4: Отправляет итоги дня в 23:00 - НОВЫЙ ДИЗАЙН"""
-        stats = self.load_stats()
-        today_key = self.get_today_key()
-        
-        if today_key not in stats:
+    async def send_daily_summary(self, as_of=None):
+        """ЭТАП 4: Отправляет итоги дня в 23:00 - НОВЫЙ ДИЗАЙН (as_of - дата итогов, по умолчанию сегодня)"""
+        today_key = as_of.isoformat() if as_of else self.get_today_key()
+        await self.storage.refresh()
+        today_data = self.load_day_stats(today_key)
+        
+        # Одни отметки об итогах - не данные дня
+        if not today_data or not set(today_data) - {'_summaries'}:
             logger.info("📊 Нет данных за сегодня для итогов")
             return
         
-        today_data = stats[today_key]
-        
         # ОТЛАДКА: Логируем что приходит в today_data
         logger.info(f"📊 DEBUG today_data: {today_data}")
         logger.info(f"📊 DEBUG points={today_data.get('points')}, max_points={today_data.get('max_points')}")
@@ -611,16 +661,16 @@ class TaskTrackerBot:
         cant_do = today_data.get('cant_do', {})
         
         # ОТЛАДКА: Логируем каждую секцию
-        logger.info(f"📊 DEBUG morning: completed={morning.get('completed', [])}, total={morning.get('total', 0)}")
-        logger.info(f"📊 DEBUG day: completed={day.get('completed', [])}, total={day.get('total', 0)}")
-        logger.info(f"📊 DEBUG evening: completed={evening.get('completed', [])}, total={evening.get('total', 0)}")
-        logger.info(f"📊 DEBUG cant_do: completed={cant_do.get('completed', [])}, total={cant_do.get('total', 0)}")
+        logger.info(f"📊 DEBUG morning: completed={completion.indices(completion.section_mask(morning))}, total={morning.get('total', 0)}")
+        logger.info(f"📊 DEBUG day: completed={completion.indices(completion.section_mask(day))}, total={day.get('total', 0)}")
+        logger.info(f"📊 DEBUG evening: completed={completion.indices(completion.section_mask(evening))}, total={evening.get('total', 0)}")
+        logger.info(f"📊 DEBUG cant_do: completed={completion.indices(completion.section_mask(cant_do))}, total={cant_do.get('total', 0)}")
         
         # НОВАЯ ЛОГИКА: Считаем ТОЛЬКО полезные задачи (без НЕЛЬЗЯ)
-        day_done = len(day.get('completed', []))
+        day_done = completion.section_count(day)
         day_total = day.get('total', 0)
         
-        evening_done = len(evening.get('completed', []))
+        evening_done = completion.section_count(evening)
         evening_total = evening.get('total', 0)
         
         # ИТОГО: День + Вечер (БЕЗ "НЕЛЬЗЯ"!)
@@ -629,12 +679,12 @@ class TaskTrackerBot:
         overall_perc = int((overall_done / overall_total * 100)) if overall_total > 0 else 0
         
         # Срывы в НЕЛЬЗЯ считаем отдельно
-        cant_do_fails = len(cant_do.get('completed', []))
+        cant_do_fails = completion.section_count(cant_do)
         
         logger.info(f"📊 CALCULATED: day={day_done}/{day_total}, evening={evening_done}/{evening_total}, total={overall_done}/{overall_total} ({overall_perc}%)")
         
         # === ФОРМИРУЕМ СООБЩЕНИЕ ===
-        message = f"📊 <b>ИТОГИ ДНЯ — {datetime.now().strftime('%d.%m.%Y')}</b>\n\n"
+        message = f"📊 <b>ИТОГИ ДНЯ — {(as_of or datetime.now()).strftime('%d.%m.%Y')}</b>\n\n"
         
         # ДЕНЬ
         if day_total > 0:
@@ -663,25 +713,26 @@ class TaskTrackerBot:
         message += "\n━━━━━━━━━━━━━━━━━━━━━\n\n"
         
         # LEVEL DISPLAY
-        level_display = self.get_level_display(overall_perc, stats)
+        level_display = self.get_level_display(overall_perc, as_of)
         message += level_display + "\n\n"
         
         # МОТИВАЦИЯ (с детальной градацией)
         message += self.get_motivation(overall_perc)
         
         # Отправляем
-        await self.send_telegram_message(message)
+        if await self.send_telegram_message(message):
+            self.mark_summary_sent('daily', date.fromisoformat(today_key))
         logger.info(f"📊 Итоги дня отправлены: {overall_perc}% (day={day_done}/{day_total}, evening={evening_done}/{evening_total})")
     
-    async def send_weekly_summary(self):
+    async def send_weekly_summary(self, as_of=None):
         """Отправляет итоги недели с Level System"""
-        stats = self.load_stats()
-        week_stats = self.get_week_stats(stats)
-        streak_90 = self.calculate_streak_90(stats)
+        await self.storage.refresh()
+        week_stats = self.get_week_stats(as_of)
+        streak_90 = self.calculate_streak_90(as_of)
         is_black = streak_90 >= 7
         
         # Получаем последние 7 дней
-        today = datetime.now()
+        today = as_of or datetime.now()
         week_data = []
         
         for i in range(6, -1, -1):
@@ -689,8 +740,8 @@ class TaskTrackerBot:
             day_key = day.strftime("%Y-%m-%d")
             day_name = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс'][day.weekday()]
             
-            if day_key in stats:
-                percentage = stats[day_key].get('percentage', 0)
+            percentage = self.aggregates.percentage(day_key)
+            if percentage is not None:
                 level = self.get_level(percentage)
                 week_data.append({
                     'name': day_name,
@@ -749,16 +800,17 @@ class TaskTrackerBot:
         else:
             message += "📈 Есть над чем работать!\nСледующая неделя будет лучше! 💪"
         
-        await self.send_telegram_message(message)
+        if await self.send_telegram_message(message):
+            self.mark_summary_sent('weekly', as_of or date.today())
         logger.info(f"📊 Итоги недели отправлены: средний {week_stats['avg']}%, уровень {avg_level['name']}")
     
-    async def send_monthly_summary(self):
+    async def send_monthly_summary(self, as_of=None):
         """Отправляет итоги месяца с Level System"""
-        stats = self.load_stats()
-        month_stats = self.get_month_stats(stats)
-        streak_90 = self.calculate_streak_90(stats)
+        await self.storage.refresh()
+        month_stats = self.get_month_stats(as_of)
+        streak_90 = self.calculate_streak_90(as_of)
         
-        today = datetime.now()
+        today = as_of or datetime.now()
         
         # Получаем данные за последние 30 дней
         month_data = []
@@ -766,10 +818,7 @@ class TaskTrackerBot:
             day = today - timedelta(days=i)
             day_key = day.strftime("%Y-%m-%d")
             
-            if day_key in stats:
-                percentage = stats[day_key].get('percentage', 0)
-            else:
-                percentage = 0
+            percentage = self.aggregates.percentage(day_key) or 0
             month_data.append(percentage)
         
         message = f"📅 <b>ИТОГИ МЕСЯЦА</b>\n"
@@ -824,48 +873,83 @@ class TaskTrackerBot:
         else:
             message += "📈 Есть куда расти!\nСледующий месяц будет лучше! 💪"
         
-        await self.send_telegram_message(message)
+        if await self.send_telegram_message(message):
+            self.mark_summary_sent('monthly', as_of or date.today())
         logger.info(f"📊 Итоги месяца отправлены: средний {month_stats['avg']}%")
     
-    async def check_schedule(self):
-        """Проверяет расписание для отправки итогов"""
-        now = datetime.now()
-        
-        # Итоги дня в 23:00
-        if now.hour == 23 and now.minute == 0:
-            logger.info("⏰ Время для итогов дня")
-            await self.send_daily_summary()
-            
-            # Итоги недели в воскресенье
-            if now.weekday() == 6:  # Воскресенье
-                logger.info("⏰ Время для итогов недели")
-                await asyncio.sleep(60)  # Подождём минуту после итогов дня
-                await self.send_weekly_summary()
-            
-            # Итоги месяца 1-го числа
-            if now.day == 1:
-                logger.info("⏰ Время для итогов месяца")
-                await asyncio.sleep(120)  # Подождём 2 минуты
-                await self.send_monthly_summary()
+    def setup_schedule(self):
+        """
+        Итоги по таймерам: день - 23:00, неделя - воскресенье 23:01, месяц - 1-го числа 23:02
+        Каждый запуск - отдельная задача, итоги строятся на дату планового запуска
+        Отправленные итоги отмечаются в записи дня ('_summaries') - по этим отметкам
+        после перезапуска догоняются пропущенные итоги
+        Очистка устаревших состояний и неиспользуемых текстов сообщений - ежедневно в 03:00
+        """
+        self.scheduler.add(ScheduledJob(
+            'daily_summary', '23:00',
+            lambda due: self.send_daily_summary(due.date()),
+            tz=self.chat_timezone, done=lambda due: self.summary_sent('daily', due.date())
+        ))
+        self.scheduler.add(ScheduledJob(
+            'weekly_summary', '23:01',
+            lambda due: self.send_weekly_summary(due.date()),
+            tz=self.chat_timezone, when=lambda day: day.weekday() == 6,
+            done=lambda due: self.summary_sent('weekly', due.date())
+        ))
+        self.scheduler.add(ScheduledJob(
+            'monthly_summary', '23:02',
+            lambda due: self.send_monthly_summary(due.date()),
+            tz=self.chat_timezone, when=lambda day: day.day == 1,
+            done=lambda due: self.summary_sent('monthly', due.date())
+        ))
+        self.scheduler.add(ScheduledJob(
+            'daily_cleanup', '03:00',
+            lambda due: self.daily_cleanup(),
+            tz=self.chat_timezone
+        ))
+    
+    def summary_sent(self, kind, day):
+        """Отправлены ли итоги kind (daily/weekly/monthly) за день"""
+        data = self.load_day_stats(day.isoformat()) or {}
+        return kind in data.get('_summaries', {})
+    
+    def mark_summary_sent(self, kind, day):
+        data = self.load_day_stats(day.isoformat()) or {}
+        summaries = {**data.get('_summaries', {}), kind: datetime.now().isoformat(timespec='seconds')}
+        self.storage.update_day(day.isoformat(), {'_summaries': summaries})
+    
+    async def daily_cleanup(self):
+        """Удаляет состояния сообщений, не обновлявшиеся MESSAGE_STATE_TTL_DAYS дней, затем тексты без ссылок"""
+        await self.message_state.expire()
+        await self.prune_message_bodies()
+    
+    async def prune_message_bodies(self):
+        """Удаляет тексты сообщений, на которые больше не ссылаются ни состояния, ни записи дней"""
+        live_refs = {
+            state[key] for state in await self.message_state.values()
+            for key in ('original_ref', 'clean_ref') if key in state
+        }
+        # Ссылки из записей дней собирает поток записи - после отправленных следом изменённых дней
+        self.storage.flush()
+        live_refs.update(await self.storage.run('message_body_refs'))
+        await self.message_bodies.prune(live_refs)
     
     async def send_telegram_message(self, message):
         """Отправляет сообщение в Telegram"""
         try:
-            url = f"https://api.telegram.org/bot{self.telegram_token}/sendMessage"
             payload = {
                 'chat_id': self.chat_id,
                 'text': message,
                 'parse_mode': 'HTML'
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload, timeout=10) as response:
-                    if response.status == 200:
-                        logger.info("✅ Сообщение отправлено")
-                        return True
-                    else:
-                        logger.error(f"❌ Ошибка отправки: {response.status}")
-                        return False
+            status, data = await self.dispatcher.send('sendMessage', payload)
+            if status == 200:
+                logger.info("✅ Сообщение отправлено")
+                return True
+            else:
+                logger.error(f"❌ Ошибка отправки: {status} - {data.get('description', data)}")
+                return False
         except Exception as e:
             logger.error(f"❌ Ошибка: {e}")
             return False
@@ -873,7 +957,6 @@ class TaskTrackerBot:
     async def edit_message(self, message_id, text, reply_markup=None):
         """Редактирует сообщение"""
         try:
-            url = f"https://api.telegram.org/bot{self.telegram_token}/editMessageText"
             payload = {
                 'chat_id': self.chat_id,
                 'message_id': message_id,
@@ -884,15 +967,13 @@ class TaskTrackerBot:
             if reply_markup:
                 payload['reply_markup'] = reply_markup
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload, timeout=10) as response:
-                    if response.status == 200:
-                        logger.info("✅ Сообщение обновлено")
-                        return True
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"❌ Ошибка обновления: {response.status} - {error_text}")
-                        return False
+            status, data = await self.telegram.call('editMessageText', payload)
+            if status == 200:
+                logger.info("✅ Сообщение обновлено")
+                return True
+            else:
+                logger.error(f"❌ Ошибка обновления: {status} - {data.get('description', data)}")
+                return False
         except Exception as e:
             logger.error(f"❌ Ошибка: {e}")
             return False
@@ -900,57 +981,64 @@ class TaskTrackerBot:
     async def answer_callback_query(self, callback_query_id, text=None):
         """Отвечает на callback query"""
         try:
-            url = f"https://api.telegram.org/bot{self.telegram_token}/answerCallbackQuery"
             payload = {'callback_query_id': callback_query_id}
             
             if text:
                 payload['text'] = text
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload, timeout=10) as response:
-                    return response.status == 200
+            status, data = await self.telegram.call('answerCallbackQuery', payload)
+            return status == 200
         except Exception as e:
             logger.error(f"❌ Ошибка: {e}")
             return False
     
-    async def process_callback(self, callback_data, callback_query_id, message_id, message_text):
-        """Обрабатывает callback от кнопок"""
+    def get_callback_answer(self, callback_data):
+        """Текст всплывающего ответа на callback (None - без текста)"""
+        if callback_data == 'update_progress':
+            return "Отметь выполненные задачи ✅"
+        elif callback_data == 'save_progress':
+            return "✅ Прогресс сохранён!"
+        elif callback_data == 'cancel_update':
+            return "❌ Отменено"
+        return None
+    
+    async def process_callback(self, callback_data, callback_query_id, message_id, message_text, answer=True):
+        """
+        Обрабатывает callback от кнопок
+        answer=False - ответ на callback уже отдан в теле webhook-ответа
+        """
         logger.info(f"📞 Получен callback: {callback_data}")
         
+        # Изменения notifier.py и состояние сообщения - в память заранее, хранилище читается вне event loop
+        await self.storage.refresh()
+        await self.message_state.load(message_id)
+        
         if callback_data == 'update_progress':
             # Показываем чек-лист
             await self.show_checklist(message_id, message_text)
-            await self.answer_callback_query(callback_query_id, "Отметь выполненные задачи ✅")
         
         elif callback_data.startswith('toggle_'):
             # Переключаем задачу
             # Формат: toggle_day_0, toggle_evening_5, toggle_cant_do_1
-            if '_cant_do_' in callback_data:
-                # Обрабатываем cant_do отдельно (два подчёркивания)
-                task_idx = int(callback_data.split('_')[-1])
-                period = 'cant_do'
+            period, _, task_idx = callback_data[len('toggle_'):].rpartition('_')
+            try:
+                task_idx = int(task_idx)
+            except ValueError:
+                logger.warning(f"⚠️ Некорректный callback: {callback_data}")
             else:
-                # Обычный формат: toggle_day_0
-                parts = callback_data.split('_')
-                period = parts[1]  # day/evening
-                task_idx = int(parts[2])
-            
-            await self.toggle_task(message_id, period, task_idx)
-            await self.answer_callback_query(callback_query_id)
+                await self.toggle_task(message_id, period, task_idx)
         
         elif callback_data == 'save_progress':
             # Сохраняем прогресс
             await self.save_progress(message_id)
-            await self.answer_callback_query(callback_query_id, "✅ Прогресс сохранён!")
         
         elif callback_data == 'cancel_update':
             # Отменяем обновление
             await self.cancel_update(message_id)
-            await self.answer_callback_query(callback_query_id, "❌ Отменено")
         
-        elif callback_data == 'header':
-            # Заголовки не кликабельны
-            await self.answer_callback_query(callback_query_id)
+        # Заголовки ('header') не кликабельны - только снимаем "часики"
+        if answer:
+            await self.answer_callback_query(callback_query_id, self.get_callback_answer(callback_data))
     
     async def show_checklist(self, message_id, original_message):
         """Показывает чек-лист для отметки задач"""
@@ -961,17 +1049,21 @@ class TaskTrackerBot:
             state = self.message_state[message_id]
             text = self.format_checklist_message(state['tasks'], state['completed'])
             keyboard = self.create_checklist_keyboard(state['tasks'], state['completed'])
-            await self.edit_message(message_id, text, keyboard)
+            await self.edit_coalescer.edit_now(message_id, text, keyboard)
             return
         
-        # Первый вызов - парсим задачи из оригинального сообщения
-        tasks = self.parse_tasks(original_message)
+        # Первый вызов - задачи из манифеста (или из текста оригинального сообщения)
+        tasks = await self.resolve_tasks(message_id, original_message)
+        
+        # День сообщения - из индекса message_id → день (пишется при отправке), иначе сегодня
+        # По нему состояние вытесненного/потерянного сообщения восстанавливается из статистики того дня
+        message_day = await self.message_state.day_of(message_id) or self.get_today_key()
         
         # ПРОВЕРКА: если задач нет - пробуем загрузить из stats.json
         total_tasks = len(tasks['morning']) + len(tasks['day']) + len(tasks['cant_do']) + len(tasks['evening'])
         if total_tasks == 0:
             # Пробуем загрузить из stats.json (сохраняется в notifier.py)
-            tasks = self.load_tasks_from_stats()
+            tasks = self.load_tasks_from_stats(message_day)
             total_tasks = len(tasks.get('day', [])) + len(tasks.get('cant_do', [])) + len(tasks.get('evening', []))
             
             if total_tasks > 0:
@@ -986,44 +1078,41 @@ class TaskTrackerBot:
                         [{'text': '❌ Закрыть', 'callback_data': 'cancel_update'}]
                     ]
                 }
-                await self.edit_message(message_id, error_text, keyboard)
+                await self.edit_coalescer.edit_now(message_id, error_text, keyboard)
                 return
         
-        # Загружаем существующий прогресс за сегодня
-        today_key = self.get_today_key()
-        stats = self.load_stats()
+        # Загружаем существующий прогресс за день сообщения
+        today_key = message_day
+        existing = self.load_day_stats(today_key)
         
         # Проверяем есть ли уже данные за сегодня
-        if today_key in stats:
+        if existing:
             # Загружаем существующие выполненные задачи
-            existing = stats[today_key]
-            completed = {
-                'morning': existing.get('morning', {}).get('completed', []),
-                'day': existing.get('day', {}).get('completed', []),
-                'cant_do': existing.get('cant_do', {}).get('completed', []),
-                'evening': existing.get('evening', {}).get('completed', [])
-            }
+            completed = {section: completion.section_mask(existing.get(section)) for section in completion.SECTIONS}
             logger.info(f"📊 Загружен существующий прогресс за {today_key}")
         else:
             # Новый день, начинаем с нуля
-            completed = {'morning': [], 'day': [], 'cant_do': [], 'evening': []}
+            completed = completion.empty()
         
-        # Сохраняем состояние
-        self.message_state[message_id] = {
+        # Сохраняем состояние (текст сообщения - один раз, в хранилище текстов)
+        original_ref = self.message_bodies.put(original_message)
+        state = {
+            'day': message_day,
             'tasks': tasks,
             'completed': completed,
-            'original_text': original_message,  # Сохраняем ЧИСТЫЙ оригинал
-            'clean_original': original_message  # Дублируем для безопасности
+            'original_ref': original_ref,  # Текст для отображения (потом - с прогрессом)
+            'clean_ref': original_ref      # ЧИСТЫЙ оригинал
         }
+        self.message_state[message_id] = state
         
         # Сохраняем в файл
-        self.save_message_states()
+        self.save_message_state(message_id)
         
         # Формируем сообщение и клавиатуру
-        text = self.format_checklist_message(tasks, completed)
-        keyboard = self.create_checklist_keyboard(tasks, completed)
+        text = self.format_checklist_message(state['tasks'], state['completed'])
+        keyboard = self.create_checklist_keyboard(state['tasks'], state['completed'])
         
-        await self.edit_message(message_id, text, keyboard)
+        await self.edit_coalescer.edit_now(message_id, text, keyboard)
     
     async def toggle_task(self, message_id, period, task_idx):
         """Переключает статус задачи"""
@@ -1032,23 +1121,33 @@ class TaskTrackerBot:
             return
         
         state = self.message_state[message_id]
-        completed = state['completed'][period]
         
-        # Переключаем
-        if task_idx in completed:
-            completed.remove(task_idx)
-            logger.info(f"☐ Задача {period}[{task_idx}] снята")
-        else:
-            completed.append(task_idx)
+        # Только существующие задачи: иначе отрицательный сдвиг или огромная маска,
+        # которую не запишет json.dumps (и вместе с ней - остальные дни пачки)
+        if period not in completion.SECTIONS or not 0 <= task_idx < len(state['tasks'].get(period, [])):
+            logger.warning(f"⚠️ Нет задачи {period}[{task_idx}] в сообщении {message_id}")
+            return
+        
+        # Переключаем бит задачи
+        completed = completion.toggle(state['completed'].get(period, 0), task_idx)
+        state['completed'][period] = completed
+        done = completion.is_done(completed, task_idx)
+        if done:
             logger.info(f"☑ Задача {period}[{task_idx}] отмечена")
+        else:
+            logger.info(f"☐ Задача {period}[{task_idx}] снята")
+        
+        # task_id - id текста задачи в каталоге (как в манифесте и в записях дней)
+        self.record_event('toggle', message_id=message_id, period=period, idx=task_idx, done=done,
+                          task_id=text_id(state['tasks'][period][task_idx]))
         
         # Сохраняем в файл
-        self.save_message_states()
+        self.save_message_state(message_id)
         
-        # Обновляем сообщение
+        # Обновляем сообщение (отложенно: при серии нажатий уйдёт только последний вид)
         text = self.format_checklist_message(state['tasks'], state['completed'])
         keyboard = self.create_checklist_keyboard(state['tasks'], state['completed'])
-        await self.edit_message(message_id, text, keyboard)
+        self.edit_coalescer.schedule(message_id, text, keyboard)
     
     async def save_progress(self, message_id):
         """Сохраняет прогресс в stats.json"""
@@ -1057,38 +1156,29 @@ class TaskTrackerBot:
             return
         
         state = self.message_state[message_id]
-        today_key = self.get_today_key()
+        # Прогресс относится к дню сообщения
+        today_key = state.get('day') or self.get_today_key()
         
-        # Загружаем статистику
-        stats = self.load_stats()
+        # Загружаем статистику за сегодня
+        existing = self.load_day_stats(today_key)
         
         # ЗАПОМИНАЕМ старое количество срывов ДО объединения (для проверки дублирования штрафов)
         previous_cant_do_count = 0
-        if today_key in stats and 'cant_do' in stats[today_key]:
-            previous_cant_do_count = len(stats[today_key]['cant_do'].get('completed', []))
+        if existing and 'cant_do' in existing:
+            previous_cant_do_count = completion.section_count(existing['cant_do'])
         
         # ВАЖНО: Объединяем с существующими данными за сегодня!
-        if today_key in stats:
+        if existing:
             # Уже есть данные за сегодня - объединяем
-            existing = stats[today_key]
-            
-            # Объединяем выполненные задачи (убираем дубликаты)
-            for period in ['morning', 'day', 'cant_do', 'evening']:
-                existing_completed = set(existing.get(period, {}).get('completed', []))
-                new_completed = set(state['completed'][period])
-                # Объединяем множества
-                combined_completed = list(existing_completed | new_completed)
-                
-                # Обновляем
-                state['completed'][period] = combined_completed
+            # Объединяем выполненные задачи (OR масок)
+            for period in completion.SECTIONS:
+                state['completed'][period] = completion.section_mask(existing.get(period)) | state['completed'].get(period, 0)
                 
             logger.info(f"📊 Объединены данные за {today_key}")
         
         # Считаем общие показатели (ТОЛЬКО день + вечер, БЕЗ morning и cant_do!)
-        total_completed = (
-            len(state['completed']['day']) +
-            len(state['completed']['evening'])
-        )
+        done = {section: completion.count(state['completed'].get(section, 0)) for section in completion.SECTIONS}
+        total_completed = done['day'] + done['evening']
         total_tasks = (
             len(state['tasks']['day']) +
             len(state['tasks']['evening'])
@@ -1096,39 +1186,39 @@ class TaskTrackerBot:
         
         percentage = int((total_completed / total_tasks * 100)) if total_tasks > 0 else 0
         
-        logger.info(f"📊 ПОДСЧЁТ: day={len(state['completed']['day'])}/{len(state['tasks']['day'])}, evening={len(state['completed']['evening'])}/{len(state['tasks']['evening'])}, total={total_completed}/{total_tasks} ({percentage}%)")
+        logger.info(f"📊 ПОДСЧЁТ: day={done['day']}/{len(state['tasks']['day'])}, evening={done['evening']}/{len(state['tasks']['evening'])}, total={total_completed}/{total_tasks} ({percentage}%)")
         
-        stats[today_key] = {
+        day_stats = {
             'morning': {
-                'completed': state['completed']['morning'],
+                'mask': state['completed'].get('morning', 0),
                 'total': len(state['tasks']['morning'])
             },
             'day': {
-                'completed': state['completed']['day'],
+                'mask': state['completed'].get('day', 0),
                 'total': len(state['tasks']['day'])
             },
             'cant_do': {
-                'completed': state['completed']['cant_do'],
+                'mask': state['completed'].get('cant_do', 0),
                 'total': len(state['tasks']['cant_do'])
             },
             'evening': {
-                'completed': state['completed']['evening'],
+                'mask': state['completed'].get('evening', 0),
                 'total': len(state['tasks']['evening'])
             },
             'percentage': percentage,
             'points': total_completed,
             'max_points': total_tasks,
-            'penalty': len(state['completed']['cant_do']) > 0,
-            'penalty_pushups': len(state['completed']['cant_do']) * 30  # НОВОЕ: количество отжиманий для утра
+            'penalty': done['cant_do'] > 0,
+            'penalty_pushups': done['cant_do'] * 30  # НОВОЕ: количество отжиманий для утра
         }
         
         # Сохраняем в файл
-        save_success = self.save_stats(stats)
+        save_success = self.save_day_stats(today_key, day_stats)
         logger.info(f"💾 Save stats result: {save_success}")
         
         if save_success:
             # НОВОЕ: Отправляем штрафное сообщение ТОЛЬКО если количество срывов УВЕЛИЧИЛОСЬ
-            current_cant_do_count = len(state['completed']['cant_do'])
+            current_cant_do_count = done['cant_do']
             
             logger.info(f"⚠️ Штрафы: было={previous_cant_do_count}, стало={current_cant_do_count}")
             
@@ -1136,7 +1226,9 @@ class TaskTrackerBot:
             if current_cant_do_count > previous_cant_do_count:
                 # Получаем названия задач НЕЛЬЗЯ
                 cant_do_tasks = state['tasks']['cant_do']
-                failed_tasks = [cant_do_tasks[i] for i in state['completed']['cant_do']]
+                failed_tasks = [cant_do_tasks[i] for i in completion.indices(state['completed']['cant_do']) if i < len(cant_do_tasks)]
+                
+                self.record_event('penalty', count=current_cant_do_count, pushups=current_cant_do_count * 30)
                 
                 # Отправляем штрафное сообщение
                 await self.send_penalty_message(current_cant_do_count, failed_tasks)
@@ -1145,12 +1237,15 @@ class TaskTrackerBot:
                 logger.info(f"⏭️ Штраф уже отправлен ранее ({current_cant_do_count} срывов = {previous_cant_do_count}), пропускаем")
             
             # ЭТАП 3: Обновляем исходное сообщение с прогресс-барами
-            # ВАЖНО: используем clean_original, а НЕ original_text!
-            clean_text = state.get('clean_original', state['original_text'])
+            # ВАЖНО: используем чистый оригинал (clean_ref), а НЕ текст с прогрессом!
+            clean_text = await self.message_bodies.get(state['clean_ref'])
+            if clean_text is None:
+                logger.error(f"❌ Нет исходного текста сообщения {message_id}, прогресс в сообщении не обновлён")
+                return
             
-            # КРИТИЧНО: парсим задачи ИЗ ТЕКУЩЕГО СООБЩЕНИЯ (не из state!)
+            # КРИТИЧНО: задачи ТЕКУЩЕГО СООБЩЕНИЯ (не из state!)
             # Потому что вечернее сообщение содержит только вечерние задачи
-            current_tasks = self.parse_tasks(clean_text)
+            current_tasks = await self.resolve_tasks(message_id, clean_text)
             
             updated_text = self.update_original_message_with_progress(
                 clean_text,
@@ -1167,14 +1262,16 @@ class TaskTrackerBot:
                 ]
             }
             
-            await self.edit_message(message_id, updated_text, keyboard)
+            await self.edit_coalescer.edit_now(message_id, updated_text, keyboard)
             
-            # НЕ перезаписываем clean_original - он остаётся чистым!
-            # Обновляем только original_text для отображения
-            self.message_state[message_id]['original_text'] = updated_text
+            # НЕ перезаписываем clean_ref - он остаётся чистым!
+            # Обновляем только original_ref для отображения
+            state['original_ref'] = self.message_bodies.put(updated_text)
+            # Пока шли правки, состояние могли вытеснить из памяти - возвращаем его
+            self.message_state[message_id] = state
             
             # Сохраняем в файл
-            self.save_message_states()
+            self.save_message_state(message_id)
             
             # Логируем (без отправки нового сообщения)
             logger.info(f"💾 Прогресс сохранён: {percentage}%")
@@ -1182,7 +1279,7 @@ class TaskTrackerBot:
     async def cancel_update(self, message_id):
         """Отменяет обновление, возвращает исходное сообщение"""
         if message_id in self.message_state:
-            original_text = self.message_state[message_id]['original_text']
+            original_text = await self.message_bodies.get(self.message_state[message_id]['original_ref'])
             
             # Создаём клавиатуру с ОБЕИМИ кнопками
             keyboard = {
@@ -1193,29 +1290,28 @@ class TaskTrackerBot:
                 ]
             }
             
-            await self.edit_message(message_id, original_text, keyboard)
+            if original_text is not None:
+                await self.edit_coalescer.edit_now(message_id, original_text, keyboard)
             
             # При отмене - очищаем состояние
+            self.edit_coalescer.forget(message_id)
             if message_id in self.message_state:
                 del self.message_state[message_id]
                 # Сохраняем в файл
-                self.save_message_states()
+                self.save_message_state(message_id)
     
     async def get_updates(self):
         """Получает обновления от Telegram (long polling)"""
         try:
-            url = f"https://api.telegram.org/bot{self.telegram_token}/getUpdates"
             params = {
                 'offset': self.last_update_id + 1,
                 'timeout': 30
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, timeout=40) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data.get('result', [])
-                    return []
+            status, data = await self.telegram.call('getUpdates', params, timeout=40, http_method='get')
+            if status == 200:
+                return data.get('result', [])
+            return []
         except Exception as e:
             logger.error(f"❌ Ошибка получения обновлений: {e}")
             return []
@@ -1224,6 +1320,46 @@ class TaskTrackerBot:
         """HTTP endpoint для Railway health check"""
         return web.Response(text="OK", status=200)
     
+    async def tasks_ingest_handler(self, request):
+        """
+        POST /tasks - манифест задач от notifier.py (GitHub Actions → Render)
+        {"message_id": 123, "manifest": {...}, "message": "первые 1000 символов текста"}
+        """
+        auth = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(auth.encode('utf-8'), f"Bearer {self.tasks_ingest_token}".encode('utf-8')):
+            logger.warning(f"⚠️ /tasks: отказ в доступе ({request.remote})")
+            return web.json_response({'ok': False, 'error': 'unauthorized'}, status=401)
+        
+        try:
+            payload = await request.json()
+            message_id = int(payload['message_id'])
+            manifest = payload['manifest']
+            validate_manifest(manifest)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"⚠️ /tasks: некорректный запрос: {e}")
+            return web.json_response({'ok': False, 'error': str(e)}, status=400)
+        
+        try:
+            # Тексты задач - в каталог, в манифесте только их id
+            packed = pack_manifest(self.storage, manifest)
+            self.storage.put_manifest(message_id, packed)
+            self.storage.put_message_day(message_id, manifest['day'])
+            
+            # Задачи дня - для load_tasks_from_stats, если сообщение без манифеста
+            fields = {
+                '_task_refs': packed['task_refs'],
+                '_updated': datetime.now().isoformat()
+            }
+            if isinstance(payload.get('message'), str):
+                fields['_message_ref'] = self.message_bodies.put(payload['message'])
+            self.storage.update_day(manifest['day'], fields)
+        except Exception as e:
+            logger.error(f"❌ /tasks: ошибка сохранения манифеста {message_id}: {e}", exc_info=True)
+            return web.json_response({'ok': False, 'error': 'storage error'}, status=500)
+        
+        logger.info(f"📥 Манифест задач принят: сообщение {message_id}, {manifest['day']} ({manifest.get('period')})")
+        return web.json_response({'ok': True})
+    
     async def webhook_handler(self, request):
         """Обработчик webhook от Telegram"""
         try:
@@ -1253,8 +1389,8 @@ class TaskTrackerBot:
                     if any(keyword in message_text for keyword in ['☀️', '📋', '⛔', '🌙', 'Дневн', 'Нельзя', 'Вечерн']):
                         logger.info("📨 Получено сообщение с задачами")
                         
-                        # Парсим задачи
-                        tasks = self.parse_tasks(message_text)
+                        # Задачи из манифеста или из текста
+                        tasks = await self.resolve_tasks(message.get('message_id'), message_text)
                         
                         # Создаём клавиатуру
                         keyboard = self.create_checklist_keyboard(tasks, {})
@@ -1279,7 +1415,21 @@ class TaskTrackerBot:
                 message_text = message.get('text', '')
                 
                 logger.info(f"📞 Получен callback: {callback_data}")
-                await self.process_callback(callback_data, callback_query_id, message_id, message_text)
+                
+                # Ключ очереди - сообщение: нажатия в одном чек-листе не гоняются друг с другом
+                key = (str(message.get('chat', {}).get('id', self.chat_id)), message_id)
+                
+                if self.webhook_fast_reply:
+                    # Сразу отвечаем Telegram, тяжёлая работа - в фоне
+                    await self.update_dispatcher.submit(key, callback_data, callback_query_id, message_id, message_text, False)
+                    
+                    reply = {'method': 'answerCallbackQuery', 'callback_query_id': callback_query_id}
+                    answer_text = self.get_callback_answer(callback_data)
+                    if answer_text:
+                        reply['text'] = answer_text
+                    return web.json_response(reply)
+                
+                await (await self.update_dispatcher.submit(key, callback_data, callback_query_id, message_id, message_text))
             
             return web.Response(text='OK')
         except Exception as e:
@@ -1291,11 +1441,29 @@ class TaskTrackerBot:
         logger.info("🤖 Tracker Bot запущен!")
         logger.info("📊 Слушаю обновления...")
         
+        # Устаревшие состояния сообщений - сразу при запуске, дальше - daily_cleanup
+        await self.message_state.expire()
+        
+        # Воркеры обработки callback'ов
+        self.update_dispatcher.start()
+        
+        # Утренние/вечерние сообщения из этого же процесса (вместо cron-запусков notifier.py)
+        notifier = None
+        if os.getenv('NOTIFIER_EMBEDDED', '0') == '1':
+            notifier = PersonalScheduleNotifier(
+                telegram=self.telegram, dispatcher=self.dispatcher, storage=self.storage
+            )
+            notifier.start()
+        
         # Запускаем HTTP сервер для Railway
         app = web.Application()
         app.router.add_get('/', self.health_check)
         app.router.add_get('/health', self.health_check)
         app.router.add_post('/webhook', self.webhook_handler)  # ← WEBHOOK!
+        if self.tasks_ingest_token:
+            app.router.add_post('/tasks', self.tasks_ingest_handler)
+        else:
+            logger.info("ℹ️ TASKS_INGEST_TOKEN не задан - приём манифестов (/tasks) выключен")
         
         port = int(os.environ.get('PORT', 8080))
         runner = web.AppRunner(app)
@@ -1308,32 +1476,29 @@ class TaskTrackerBot:
         railway_domain = os.environ.get('RAILWAY_PUBLIC_DOMAIN')
         if railway_domain:
             webhook_url = f"https://{railway_domain}/webhook"
-            async with aiohttp.ClientSession() as session:
-                url = f"https://api.telegram.org/bot{self.telegram_token}/setWebhook"
-                payload = {'url': webhook_url}
-                async with session.post(url, json=payload) as response:
-                    result = await response.json()
-                    if result.get('ok'):
-                        logger.info(f"✅ Webhook установлен: {webhook_url}")
-                    else:
-                        logger.error(f"❌ Ошибка webhook: {result}")
+            payload = {'url': webhook_url}
+            status, result = await self.telegram.call('setWebhook', payload)
+            if result.get('ok'):
+                logger.info(f"✅ Webhook установлен: {webhook_url}")
+            else:
+                logger.error(f"❌ Ошибка webhook: {result}")
         
-        last_schedule_check = datetime.now()
+        # Итоги по таймерам (пропущенные во время сна сервиса догоняются)
+        self.scheduler.start()
         
-        # Основной цикл - только для проверки расписания
-        while True:
-            try:
-                # Проверяем расписание каждую минуту
-                now = datetime.now()
-                if (now - last_schedule_check).seconds >= 60:
-                    await self.check_schedule()
-                    last_schedule_check = now
-                
-                await asyncio.sleep(60)  # Спим минуту
-                
-            except Exception as e:
-                logger.error(f"❌ Ошибка в главном цикле: {e}")
-                await asyncio.sleep(5)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            # Корректно закрываем HTTP сервер и пул соединений
+            await runner.cleanup()
+            await self.scheduler.stop(timeout=30)
+            if notifier is not None:
+                await notifier.stop()
+            await self.update_dispatcher.stop(timeout=30)
+            await self.edit_coalescer.flush()
+            await self.dispatcher.join(timeout=30)
+            await self.telegram.close()
+            self.storage.close()
 
 if __name__ == "__main__":
     bot = TaskTrackerBot()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Диспетчер входящих обновлений для tracker_bot.py
+Обновления с одним ключом (message_id) обрабатываются строго по очереди,
+обновления разных сообщений - параллельно несколькими воркерами
+"""
+
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDispatcher:
+    def __init__(self, handler, workers=4, max_pending=1000):
+        # handler(*args) - корутина обработки одного обновления
+        self.handler = handler
+        self.workers = workers
+        self.max_pending = max_pending
+
+        self._pending = {}                  # {key: deque[(args, future)]}
+        self._ready = asyncio.Queue()       # ключи, готовые к обработке (каждый не более одного раза)
+        self._slots = asyncio.Semaphore(max_pending)
+        self._tasks = []
+
+    def qsize(self):
+        """Сколько обновлений ждут обработки"""
+        return sum(len(queue) for queue in self._pending.values())
+
+    def start(self):
+        """Запускает воркеры"""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+            logger.info(f"⚙️ Диспетчер обновлений запущен: воркеров={self.workers}, очередь≤{self.max_pending}")
+
+    async def submit(self, key, *args):
+        """
+        Ставит обновление в очередь ключа
+        Возвращает future с результатом обработки (ждать его не обязательно)
+        Если очередь заполнена - ждёт освобождения места
+        """
+        await self._slots.acquire()
+        future = asyncio.get_running_loop().create_future()
+
+        queue = self._pending.get(key)
+        if queue is None:
+            # Ключ свободен - ставим в очередь готовых
+            self._pending[key] = deque([(args, future)])
+            self._ready.put_nowait(key)
+        else:
+            # Ключ уже в работе - обработается после предыдущих
+            queue.append((args, future))
+        return future
+
+    async def _worker(self, worker_id):
+        while True:
+            key = await self._ready.get()
+            queue = self._pending[key]
+            args, future = queue[0]
+            try:
+                result = await self.handler(*args)
+            except Exception as e:
+                logger.error(f"❌ Воркер {worker_id}: ошибка обработки {key}: {e}", exc_info=True)
+                if not future.done():
+                    future.set_exception(e)
+                    # Исключение уже залогировано - не ругаемся "never retrieved"
+                    future.exception()
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                queue.popleft()
+                self._slots.release()
+                if queue:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._pending[key]
+                self._ready.task_done()
+
+    async def join(self, timeout=None):
+        """Ждёт обработки всех поставленных обновлений"""
+        try:
+            await asyncio.wait_for(self._ready.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Необработанных обновлений: {self.qsize()}")
+
+    async def stop(self, timeout=None):
+        """Дожидается очереди и останавливает воркеры"""
+        await self.join(timeout)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Дисковый кэш погоды для notifier.py
+- ключ: координаты (округлённые до ~1 км) + час
+- свежая запись (моложе ttl) отдаётся без запроса к API
+- устаревшая (моложе stale_ttl) отдаётся сразу, а обновление идёт в фоне
+- одновременные запросы одной точки ждут один общий запрос к API
+
+В GitHub Actions файл переносится между запусками через actions/cache, но между
+утренним и вечерним запуском 12 часов - больше ttl и stale_ttl: там кэш выручает
+только повторные ручные запуски, основной выигрыш - в режиме демона
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class WeatherCache:
+    def __init__(self, cache_file='weather_cache.json', ttl=1800, stale_ttl=6 * 3600, precision=2):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.precision = precision
+
+        self.entries = {}    # {'55.76,37.62': {'hour': '2026-10-17T08', 'data': {...}, 'fetched_at': ts}}
+        self._inflight = {}  # {ключ часа: task} - общий запрос для одной точки
+        self._refreshes = set()
+        self._load()
+
+    def _load(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Не удалось прочитать {self.cache_file}: {e}")
+            self.entries = {}
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        tmp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            logger.warning(f"⚠️ Не удалось сохранить {self.cache_file}: {e}")
+
+    def location_key(self, latitude, longitude):
+        return f"{round(latitude, self.precision)},{round(longitude, self.precision)}"
+
+    @staticmethod
+    def hour_key(now=None):
+        return (now or datetime.now()).strftime("%Y-%m-%dT%H")
+
+    def lookup(self, latitude, longitude, now=None):
+        """
+        Запись для точки: (data, fresh) или (None, False)
+        Свежая - того же часа и моложе ttl; устаревшая - моложе stale_ttl
+        """
+        entry = self.entries.get(self.location_key(latitude, longitude))
+        if not entry:
+            return None, False
+        age = time.time() - entry['fetched_at']
+        if entry['hour'] == self.hour_key(now) and age < self.ttl:
+            return entry['data'], True
+        if age < self.stale_ttl:
+            return entry['data'], False
+        return None, False
+
+    def store(self, latitude, longitude, data, now=None):
+        self.entries[self.location_key(latitude, longitude)] = {
+            'hour': self.hour_key(now),
+            'data': data,
+            'fetched_at': time.time()
+        }
+        self._save()
+
+    async def get(self, latitude, longitude, fetch):
+        """
+        Погода для точки
+        fetch() - корутина запроса к API: данные или None при ошибке
+        Возвращает данные (возможно устаревшие) или None, если их нет совсем
+        """
+        data, fresh = self.lookup(latitude, longitude)
+        if fresh:
+            logger.info(f"📦 Погода из кэша ({self.location_key(latitude, longitude)})")
+            return data
+
+        if data is not None:
+            # stale-while-revalidate: отвечаем сразу, обновляем в фоне
+            logger.info("📦 Погода из кэша (устарела), обновляю в фоне")
+            refresh = asyncio.ensure_future(self._fetch_shared(latitude, longitude, fetch))
+            self._refreshes.add(refresh)
+            refresh.add_done_callback(self._refreshes.discard)
+            return data
+
+        return await self._fetch_shared(latitude, longitude, fetch)
+
+    def _fetch_shared(self, latitude, longitude, fetch):
+        """Один запрос к API на точку и час, остальные ждут его результат"""
+        key = f"{self.location_key(latitude, longitude)}:{self.hour_key()}"
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_store(latitude, longitude, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return asyncio.shield(task)
+
+    async def _fetch_and_store(self, latitude, longitude, fetch):
+        data = await fetch()
+        if data is not None:
+            self.store(latitude, longitude, data)
+        return data
+
+    async def join(self, timeout=None):
+        """Дожидается фоновых обновлений (перед завершением процесса)"""
+        pending = list(self._refreshes) + list(self._inflight.values())
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)